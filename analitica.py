@@ -0,0 +1,170 @@
+"""Métricas de ranking alternativas calculadas con NumPy.
+
+:func:`cargar` lee ``respuesta_detalle`` y ``ponderacion_admin`` en dos
+matrices respuesta × factor: ``valores`` como ``uint8`` y ``pesos`` como
+``float32`` con ``NaN`` donde falta la ponderación.
+:func:`calcular` obtiene a partir de ellas, sin bucles por respuesta:
+
+* conteo de Borda: cada respuesta da ``valor - 1`` puntos a cada factor;
+* rango medio (1 = más importante) con intervalo de confianza bootstrap;
+* coeficiente de concordancia W de Kendall entre las respuestas;
+* distribución de los rangos de cada factor;
+* media de ``peso_admin * valor_usuario`` en las respuestas ponderadas.
+
+Solo se usan las respuestas con los 10 factores contestados.
+"""
+
+import numpy as np
+
+TAM_LOTE = 50000
+REMUESTREOS = 2000
+CONFIANZA = 0.95
+SEMILLA = 0
+
+VALORES_QUERY = "SELECT id_respuesta, id_factor, valor_usuario FROM respuesta_detalle"
+PESOS_QUERY = "SELECT id_respuesta, id_factor, peso_admin FROM ponderacion_admin"
+
+
+class Matriz:
+    """Valores y pesos de las respuestas completas, una fila por respuesta."""
+
+    def __init__(self, factores, valores, pesos, incompletas):
+        self.factores = factores
+        self.valores = valores
+        self.pesos = pesos
+        self.incompletas = incompletas
+
+
+def _leer(cursor, query, dtype):
+    """Lee ``query`` por lotes en un arreglo de ``dtype`` con una fila por registro."""
+    cursor.execute(query)
+    lotes = []
+    while True:
+        lote = cursor.fetchmany(TAM_LOTE)
+        if not lote:
+            break
+        lotes.append(np.array(lote, dtype=dtype))
+    if not lotes:
+        return np.zeros((0, 3), dtype)
+    return np.concatenate(lotes)
+
+
+def cargar(cursor, factores):
+    """Lee las respuestas en una :class:`Matriz` con columnas en el orden de ``factores``.
+
+    ``cursor`` debe devolver tuplas: convertir lotes de tuplas a un arreglo se
+    hace en C, mientras que un diccionario por fila domina el tiempo de carga.
+    Los valores y los pesos se leen en dos recorridos (sin ``JOIN``) y se
+    alinean por ``(id_respuesta, id_factor)``.
+    """
+    n_factores = len(factores)
+    ids_factor = np.array([factor["id"] for factor in factores], np.int64)
+    # id_factor -> columna; la última casilla (-1) recibe los ids desconocidos
+    tabla = np.full(int(ids_factor.max(initial=0)) + 2, -1, np.int64)
+    tabla[ids_factor] = np.arange(n_factores)
+
+    def columnas(filas):
+        return tabla[np.clip(filas[:, 1].astype(np.int64), 0, len(tabla) - 1)]
+
+    valores = _leer(cursor, VALORES_QUERY, np.int64)
+    valores = valores[columnas(valores) >= 0]
+    respuestas, fila = np.unique(valores[:, 0], return_inverse=True)
+    total = len(respuestas)
+    matriz_valores = np.zeros((total, n_factores), np.uint8)
+    matriz_valores[fila, columnas(valores)] = valores[:, 2]
+
+    matriz_pesos = np.full((total, n_factores), np.nan, np.float32)
+    pesos = _leer(cursor, PESOS_QUERY, np.float64)
+    if len(pesos) and total:
+        fila_peso = np.minimum(np.searchsorted(respuestas, pesos[:, 0]), total - 1)
+        columna_peso = columnas(pesos)
+        validos = (respuestas[fila_peso] == pesos[:, 0]) & (columna_peso >= 0)
+        matriz_pesos[fila_peso[validos], columna_peso[validos]] = pesos[validos, 2]
+
+    completas = np.bincount(fila, minlength=total) == n_factores
+    return Matriz(
+        factores,
+        matriz_valores[completas],
+        matriz_pesos[completas],
+        int(total - completas.sum()),
+    )
+
+
+def _intervalo_bootstrap(distribucion, remuestreos, confianza, semilla):
+    """Percentiles bootstrap del rango medio de cada factor.
+
+    Remuestrear las respuestas y mirar un solo factor equivale a sacar ``n``
+    rangos de su distribución empírica, así que cada remuestreo es una
+    multinomial sobre los conteos por rango: el costo depende del número de
+    factores y no del de respuestas.
+    """
+    n = int(distribucion[0].sum())
+    rng = np.random.default_rng(semilla)
+    probabilidades = distribucion / n
+    muestras = rng.multinomial(
+        n, probabilidades, size=(remuestreos, len(distribucion))
+    )
+    rangos = np.arange(1, distribucion.shape[1] + 1)
+    medias = muestras @ rangos / n
+    alfa = (1 - confianza) / 2
+    inferior, superior = np.quantile(medias, [alfa, 1 - alfa], axis=0)
+    return inferior, superior
+
+
+def kendall_w(rangos):
+    """Coeficiente W de Kendall para una matriz evaluador × objeto sin empates."""
+    m, n = rangos.shape
+    if m < 2 or n < 2:
+        return None
+    sumas = rangos.sum(axis=0, dtype=np.float64)
+    s = ((sumas - sumas.mean()) ** 2).sum()
+    return float(12 * s / (m ** 2 * (n ** 3 - n)))
+
+
+def calcular(matriz, remuestreos=REMUESTREOS, confianza=CONFIANZA, semilla=SEMILLA):
+    """Devuelve las métricas por factor (ordenadas por Borda) y las globales."""
+    n_factores = len(matriz.factores)
+    n = len(matriz.valores)
+    resultado = {
+        "respuestas": n,
+        "incompletas": matriz.incompletas,
+        "ponderadas": 0,
+        "kendall_w": None,
+        "confianza": confianza,
+        "factores": [],
+    }
+    if n == 0:
+        return resultado
+
+    # valor_usuario 10 es el factor más importante: rango 1
+    rangos = (n_factores + 1) - matriz.valores.astype(np.int16)
+    borda = (matriz.valores.astype(np.int64) - 1).sum(axis=0)
+    rango_medio = rangos.mean(axis=0)
+
+    indices = np.arange(n_factores, dtype=np.int64) * n_factores + (rangos - 1)
+    distribucion = np.bincount(
+        indices.ravel(), minlength=n_factores * n_factores
+    ).reshape(n_factores, n_factores)
+    inferior, superior = _intervalo_bootstrap(distribucion, remuestreos, confianza, semilla)
+
+    ponderadas = ~np.isnan(matriz.pesos).any(axis=1)
+    resultado["ponderadas"] = int(ponderadas.sum())
+    if resultado["ponderadas"]:
+        ponderado = (matriz.pesos[ponderadas] * matriz.valores[ponderadas]).mean(axis=0)
+    else:
+        ponderado = np.full(n_factores, np.nan)
+
+    resultado["kendall_w"] = kendall_w(rangos)
+    porcentajes = distribucion / n * 100
+    for i in np.argsort(-borda, kind="stable"):
+        resultado["factores"].append({
+            "id_factor": matriz.factores[i]["id"],
+            "nombre": matriz.factores[i]["nombre"],
+            "borda": int(borda[i]),
+            "rango_medio": float(rango_medio[i]),
+            "ic_inferior": float(inferior[i]),
+            "ic_superior": float(superior[i]),
+            "distribucion": [float(p) for p in porcentajes[i]],
+            "ponderado_medio": None if np.isnan(ponderado[i]) else float(ponderado[i]),
+        })
+    return resultado
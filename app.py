@@ -1,87 +1,552 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, g
+from flask import (
+    Flask,
+    Response,
+    abort,
+    current_app,
+    flash,
+    g,
+    jsonify,
+    redirect,
+    render_template,
+    request,
+    session,
+    url_for,
+)
+import hashlib
+import io
 import os
-import mysql.connector
+import time
+from datetime import datetime
 from decimal import Decimal, InvalidOperation
 from dotenv import load_dotenv
-import bleach
+import click
+from flask.cli import AppGroup
 from flask_caching import Cache
+from markupsafe import Markup
 from werkzeug.security import check_password_hash
 
+# Las variables de .env deben existir antes de leer la configuración de este
+# módulo y antes de importar metricas (PROMETHEUS_MULTIPROC_DIR)
 load_dotenv()
 
-from db import get_connection
+import assets
+import compresion
+import datos_sinteticos
+import db
+import exportacion
+import importacion
+import metricas
+import ponderaciones
+import ranking
+from db import (
+    ERRORES_INTEGRIDAD,
+    PoolAgotado,
+    cursor_diccionario,
+    estadisticas_pool,
+    get_connection,
+)
+from generaciones import Generaciones, cubeta_usuario
+from instrumentacion import CursorInstrumentado, server_timing
+from paginacion import codificar_cursor, decodificar_cursor
+from singleflight import SingleFlight
 
 ADMIN_PASSWORD_HASH = os.getenv("ADMIN_PASSWORD_HASH")
+# Clave de sesión por defecto de las instalaciones existentes; en producción
+# se define SECRET_KEY
+SECRET_KEY_POR_DEFECTO = "clave-secreta-sencilla"
 
 
-app = Flask(__name__)
-app.secret_key = "clave-secreta-sencilla"
+class Registro:
+    """Rutas, hooks, manejadores de error y comandos que instala :func:`create_app`.
 
-# Configuración de caché compartido
-CACHE_TTL = int(os.getenv("RANKING_CACHE_TTL", 300))
-cache = Cache(
-    app,
-    config={
-        "CACHE_TYPE": os.getenv("CACHE_TYPE", "SimpleCache"),
-        "CACHE_DEFAULT_TIMEOUT": CACHE_TTL,
-    },
-)
+    Hace lo mismo que un ``Blueprint`` pero sin prefijar los endpoints, así que
+    ``url_for("index")`` y las etiquetas de las métricas no cambian.
+    """
+
+    def __init__(self):
+        self._pendientes = []
+        self.cli = AppGroup()
+
+    def _diferir(self, metodo, *args, **kwargs):
+        def decorador(funcion):
+            self._pendientes.append((metodo, args, kwargs, funcion))
+            return funcion
+
+        return decorador
+
+    def route(self, regla, **opciones):
+        return self._diferir("route", regla, **opciones)
+
+    def errorhandler(self, codigo_o_excepcion):
+        return self._diferir("errorhandler", codigo_o_excepcion)
+
+    def before_request(self, funcion):
+        return self._diferir("before_request")(funcion)
+
+    def after_request(self, funcion):
+        return self._diferir("after_request")(funcion)
+
+    def teardown_appcontext(self, funcion):
+        return self._diferir("teardown_appcontext")(funcion)
+
+    def registrar(self, app):
+        for metodo, args, kwargs, funcion in self._pendientes:
+            if args or kwargs:
+                getattr(app, metodo)(*args, **kwargs)(funcion)
+            else:
+                getattr(app, metodo)(funcion)
+        for comando in self.cli.commands.values():
+            app.cli.add_command(comando)
+
+
+vistas = Registro()
+
+# Configuración de caché compartido. Las claves incluyen un contador de
+# generación compartido entre workers, por lo que el TTL puede ser largo: una
+# invalidación en cualquier worker se ve de inmediato en todos los demás.
+CACHE_TTL = int(os.getenv("RANKING_CACHE_TTL", 3600))
+cache = Cache()
+generaciones = Generaciones()
 RANKING_CACHE_KEY = "ranking_cache"
+ranking_singleflight = SingleFlight(
+    cache,
+    directorio=os.getenv("SINGLEFLIGHT_DIR"),
+    espera=float(os.getenv("RANKING_ESPERA", 10)),
+    gracia=float(os.getenv("RANKING_GRACIA", 5)),
+)
+
+
+def create_app(config=None):
+    """Crea una aplicación con sus rutas, caché, assets y compresión.
+
+    ``config`` se aplica sobre los valores leídos del entorno. No abre
+    conexiones ni archivos: el pool se crea en cada worker (``post_fork`` de
+    gunicorn o el primer ``get_connection``), de modo que la aplicación se
+    puede importar en el maestro con ``preload_app``.
+    """
+    app = Flask(__name__)
+    app.config.from_mapping(
+        SECRET_KEY=os.getenv("SECRET_KEY") or SECRET_KEY_POR_DEFECTO,
+        CACHE_TYPE=os.getenv("CACHE_TYPE", "SimpleCache"),
+        CACHE_DEFAULT_TIMEOUT=CACHE_TTL,
+        COMPRESION_MINIMO=int(os.getenv("COMPRESION_MINIMO", compresion.MINIMO)),
+    )
+    app.config.update(config or {})
+    if app.secret_key == SECRET_KEY_POR_DEFECTO and not (app.debug or app.testing):
+        app.logger.warning(
+            "SECRET_KEY no está definida: la sesión se firma con la clave fija "
+            "por defecto, que no es segura en producción"
+        )
+    app.config.setdefault(
+        "VERSION_DESPLIEGUE",
+        os.getenv("VERSION_DESPLIEGUE") or _version_despliegue(app),
+    )
+    anterior = getattr(cache, "app", None)
+    cache.init_app(app)
+    if anterior is not None:
+        # Flask-Caching usa la última aplicación iniciada fuera de un contexto;
+        # se conserva la que ya tenía
+        cache.app = anterior
+    assets.registrar(app)
+    app.wsgi_app = compresion.Compresion(
+        app.wsgi_app, minimo=app.config["COMPRESION_MINIMO"]
+    )
+    vistas.registrar(app)
+    return app
+
+
+_app = None
+
+
+def __getattr__(nombre):
+    """``app.app`` se crea al pedirlo por primera vez (``gunicorn app:app``)."""
+    global _app
+    if nombre != "app":
+        raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+    if _app is None:
+        _app = create_app()
+        # El caché usado fuera de un contexto (CLI, pruebas) es el de esta app
+        cache.app = _app
+    return _app
+
+
+def precargar():
+    """Importa los módulos que las vistas cargan bajo demanda.
+
+    gunicorn lo llama en el maestro con ``preload_app`` para que los workers
+    compartan esas páginas de memoria en lugar de importarlos cada uno.
+    """
+    import analitica  # noqa: F401
+    import bleach  # noqa: F401
+
+
+def iniciar_worker():
+    """Prepara un proceso recién creado con ``fork()`` antes de atender peticiones.
+
+    Descarta el pool y el descriptor de generaciones que pudiera haber heredado
+    del maestro y abre el pool propio.
+    """
+    generaciones.tras_fork()
+    db.reiniciar_pool()
 
 
 def sanitize(texto: str) -> str:
     """Sanitize user-provided text by stripping HTML tags and scripts."""
+    import bleach
+
     return bleach.clean(texto or "", tags=[], attributes={}, strip=True)
 
 
+def ranking_cache_key():
+    """Clave del ranking para la generación vigente."""
+    return generaciones.clave(RANKING_CACHE_KEY, "ranking")
+
+
 def invalidate_ranking_cache():
-    """Reset ranking cache to force recomputation on next request."""
-    cache.delete(RANKING_CACHE_KEY)
+    """Reset ranking cache in every worker to force recomputation on next request."""
+    cache.delete(ranking_cache_key())
+    generaciones.incrementar("ranking")
+
+
+def calcular_ranking():
+    """Consulta conteos, ranking e incompletas (sin caché)."""
+    # Generación leída antes de consultar: si cambia durante el cálculo, el
+    # ETag de este resultado ya no coincidirá con la vigente
+    generacion = generaciones.actual("ranking")
+    # Siempre en el primario (no get_db_lectura): el resultado se guarda con
+    # la generación vigente y, leído de una réplica atrasada, quedaría viejo
+    # en la caché hasta la siguiente escritura
+    get_db()
+    # Contar formularios asignados y formularios con respuesta
+    g.cursor.execute("SELECT COUNT(*) AS total FROM asignacion")
+    total_asignados = g.cursor.fetchone()["total"]
+
+    g.cursor.execute("SELECT COUNT(*) AS total FROM respuesta")
+    total_respuestas = g.cursor.fetchone()["total"]
+
+    # Lectura O(#factores) desde las tablas resumen
+    ranking_factores, incompletas = ranking.obtener_ranking(g.cursor)
+    return {
+        "ranking": ranking_factores,
+        "incompletas": incompletas,
+        "total_asignados": total_asignados,
+        "total_respuestas": total_respuestas,
+        "generacion": generacion,
+    }
+
+
+def obtener_ranking_cacheado():
+    """Devuelve el ranking cacheado; solo una petición lo recalcula a la vez."""
+    return ranking_singleflight.obtener(
+        "ranking",
+        ranking_cache_key(),
+        calcular_ranking,
+        clave_anterior=f"{RANKING_CACHE_KEY}:anterior",
+        timeout=CACHE_TTL,
+    )
+
+
+# Métricas alternativas del ranking (Borda, rango medio, W de Kendall). Cambian
+# con cualquier respuesta guardada, no solo con las que mueven el ranking.
+ANALITICA_CACHE_KEY = "analitica_cache"
+
+
+def version_analitica():
+    """Generaciones de las que depende la analítica del ranking."""
+    return tuple(
+        generaciones.actual(nombre) for nombre in ("ranking", "respuestas", "factores")
+    )
+
+
+def calcular_analitica():
+    """Carga la matriz de respuestas y calcula la analítica (sin caché)."""
+    # NumPy solo se importa la primera vez que se pide la analítica
+    import analitica
+
+    version = version_analitica()
+    get_db()
+    factores = get_factores()
+    cursor = cursor_tuplas()
+    try:
+        matriz = analitica.cargar(cursor, factores)
+    finally:
+        cursor.close()
+    resultado = analitica.calcular(matriz)
+    resultado["version"] = version
+    return resultado
+
+
+def obtener_analitica_cacheada():
+    """Devuelve la analítica cacheada; solo una petición la recalcula a la vez."""
+    version = version_analitica()
+    return ranking_singleflight.obtener(
+        "analitica",
+        ":".join(str(parte) for parte in (ANALITICA_CACHE_KEY,) + version),
+        calcular_analitica,
+        clave_anterior=f"{ANALITICA_CACHE_KEY}:anterior",
+        timeout=CACHE_TTL,
+    )
 
 
 # Cache para los factores
 FACTORES_CACHE_KEY = "factores_cache"
-FACTORES_CACHE_TTL = int(os.getenv("FACTORES_CACHE_TTL", 300))
+FACTORES_CACHE_TTL = int(os.getenv("FACTORES_CACHE_TTL", 3600))
+
+
+def factores_cache_key():
+    """Clave de los factores para la generación vigente."""
+    return generaciones.clave(FACTORES_CACHE_KEY, "factores")
 
 
 def get_factores():
     """Obtiene la lista de factores usando caché en memoria."""
-    factores = cache.get(FACTORES_CACHE_KEY)
+    clave = factores_cache_key()
+    factores = cache.get(clave)
+    metricas.CACHE.labels("factores", "miss" if factores is None else "hit").inc()
     if factores is None:
         g.cursor.execute("SELECT * FROM factor")
         factores = g.cursor.fetchall()
-        cache.set(FACTORES_CACHE_KEY, factores, timeout=FACTORES_CACHE_TTL)
+        cache.set(clave, factores, timeout=FACTORES_CACHE_TTL)
     return factores
 
 
+# Tabla de factores de formulario.html ya renderizada (igual para todos)
+TABLA_FACTORES_CACHE_KEY = "tabla_factores"
+
+
+def render_tabla_factores():
+    """Devuelve la tabla de factores renderizada para la generación vigente.
+
+    Las selecciones previas de cada usuario se aplican en el navegador, así
+    que el fragmento solo cambia cuando cambian los factores.
+    """
+    clave = generaciones.clave(TABLA_FACTORES_CACHE_KEY, "factores")
+    html = cache.get(clave)
+    metricas.CACHE.labels("tabla_factores", "miss" if html is None else "hit").inc()
+    if html is None:
+        html = render_template("_tabla_factores.html", factores=get_factores())
+        cache.set(clave, html, timeout=FACTORES_CACHE_TTL)
+    return Markup(html)
+
+
 def invalidate_factores_cache():
-    """Reinicia el caché de factores."""
-    cache.delete(FACTORES_CACHE_KEY)
+    """Reinicia el caché de factores (y su tabla renderizada) en todos los workers."""
+    cache.delete(factores_cache_key())
+    cache.delete(generaciones.clave(TABLA_FACTORES_CACHE_KEY, "factores"))
+    generaciones.incrementar("factores")
+
+
+# Caché por usuario del formulario asignado que muestra /formulario/<id>
+ASIGNACION_CACHE_KEY = "asignacion_usuario"
+ASIGNACION_CACHE_TTL = int(os.getenv("ASIGNACION_CACHE_TTL", 300))
+
+
+def asignacion_cache_key(id_usuario):
+    """Clave del formulario asignado a ``id_usuario`` para las generaciones vigentes."""
+    return (
+        f"{ASIGNACION_CACHE_KEY}:{id_usuario}"
+        f":{generaciones.actual('asignaciones')}"
+        f":{generaciones.actual(cubeta_usuario(id_usuario))}"
+    )
+
+
+def invalidate_asignacion_cache(id_usuario=None):
+    """Invalida el formulario asignado de un usuario o, sin argumento, de todos."""
+    if id_usuario is None:
+        generaciones.incrementar("asignaciones")
+        return
+    cache.delete(asignacion_cache_key(id_usuario))
+    generaciones.incrementar(cubeta_usuario(id_usuario))
+
+
+# GET condicional: las vistas calculan su ETag a partir de contadores de
+# generación y marcas de tiempo, sin consultar ni renderizar nada pesado.
+def _version_despliegue(app):
+    """Huella de las plantillas y del manifest de assets al arrancar."""
+    huella = hashlib.sha1()
+    plantillas = os.path.join(app.root_path, app.template_folder)
+    rutas = [
+        os.path.join(carpeta, archivo)
+        for carpeta, _, archivos in os.walk(plantillas)
+        for archivo in archivos
+    ]
+    for ruta in sorted(rutas) + [assets.MANIFEST]:
+        if os.path.isfile(ruta):
+            with open(ruta, "rb") as contenido:
+                huella.update(contenido.read())
+    return huella.hexdigest()[:12]
+
+
+def calcular_etag(*partes):
+    """ETag de una vista para la versión de datos ``partes``.
+
+    Devuelve ``None`` si hay mensajes flash pendientes: la página los mostraría
+    una sola vez y no debe reutilizarse desde la caché del navegador.
+    """
+    if "_flashes" in session:
+        return None
+    version = current_app.config["VERSION_DESPLIEGUE"]
+    datos = ":".join(str(parte) for parte in (version,) + partes)
+    return hashlib.sha1(datos.encode()).hexdigest()[:20]
+
+
+def no_modificado(etag):
+    """Respuesta 304 si el cliente ya tiene ``etag``; ``None`` en otro caso."""
+    # Comparación débil: la compresión convierte el ETag en W/"..."
+    if etag is None or not request.if_none_match.contains_weak(etag):
+        return None
+    respuesta = Response(status=304)
+    respuesta.set_etag(etag)
+    return respuesta
+
+
+def con_etag(html, etag):
+    """Respuesta con ``html`` que el navegador puede guardar y revalidar."""
+    respuesta = current_app.make_response(html)
+    if etag is not None:
+        respuesta.set_etag(etag)
+        respuesta.cache_control.private = True
+        respuesta.cache_control.no_cache = True
+    return respuesta
+
+
+def etag_formulario(id_usuario, ultima_respuesta):
+    """ETag de /formulario/<id>: factores, asignaciones y última respuesta."""
+    return calcular_etag(
+        "formulario",
+        id_usuario,
+        generaciones.actual("factores"),
+        generaciones.actual("asignaciones"),
+        generaciones.actual(cubeta_usuario(id_usuario)),
+        ultima_respuesta,
+    )
+
+
+# Instrumentación de SQL por petición (SQL_INSTRUMENTACION=0 la desactiva)
+SQL_INSTRUMENTACION = os.getenv("SQL_INSTRUMENTACION", "1") != "0"
+SQL_LENTA_MS = float(os.getenv("SQL_LENTA_MS", 200))
+
+
+def _instrumentar(cursor):
+    if SQL_INSTRUMENTACION:
+        return CursorInstrumentado(cursor, g.setdefault("consultas", []), SQL_LENTA_MS)
+    return cursor
 
 
 def get_db():
-    """Obtain a database connection and cursor lazily."""
+    """Obtain a database connection and cursor lazily.
+
+    Con ``DB_PREPARADAS=1`` el cursor usa sentencias preparadas en el servidor
+    que cada conexión del pool conserva entre peticiones.
+    """
     if "conn" not in g:
         g.conn = get_connection()
-        g.cursor = g.conn.cursor(dictionary=True)
+        g.cursor = _instrumentar(cursor_diccionario(g.conn))
     return g.conn, g.cursor
 
 
-@app.teardown_appcontext
+# Segundos que las lecturas de una sesión que escribió siguen yendo al
+# primario: el retraso máximo tolerado de la réplica
+REPLICA_RETRASO_MAX = float(os.getenv("DB_REPLICA_RETRASO_MAX", 5))
+ESCRITURA_SESION = "escritura_hasta"
+
+
+def get_db_lectura():
+    """Conexión y cursor para consultas de reportes que no escriben.
+
+    Van a la réplica salvo que la petición ya use el primario o que la sesión
+    haya escrito hace menos de ``DB_REPLICA_RETRASO_MAX`` segundos (leer lo
+    propio); si la réplica no responde se usa el primario. Sin réplica
+    configurada equivale a :func:`get_db`.
+    """
+    if "conn_lectura" in g:
+        return g.conn_lectura, g.cursor_lectura
+    if "conn" in g or not db.hay_replica():
+        return get_db()
+    if session.get(ESCRITURA_SESION, 0) > time.time():
+        metricas.LECTURAS.labels("primario").inc()
+        return get_db()
+    conexion = get_connection(solo_lectura=True)
+    if not conexion.solo_lectura:
+        metricas.LECTURAS.labels("respaldo").inc()
+        g.conn = conexion
+        g.cursor = _instrumentar(cursor_diccionario(conexion))
+        return g.conn, g.cursor
+    metricas.LECTURAS.labels("replica").inc()
+    g.conn_lectura = conexion
+    g.cursor_lectura = _instrumentar(cursor_diccionario(conexion))
+    return g.conn_lectura, g.cursor_lectura
+
+
+def cursor_tuplas():
+    """Cursor adicional que devuelve tuplas, para lecturas masivas.
+
+    Usa la conexión de la petición; quien lo pide debe cerrarlo.
+    """
+    conn, _ = get_db()
+    return _instrumentar(conn.cursor())
+
+
+@vistas.before_request
+def iniciar_medicion():
+    g.inicio_peticion = time.perf_counter()
+
+
+@vistas.after_request
+def recordar_escritura(response):
+    """Tras confirmar una escritura, las lecturas de la sesión van al primario."""
+    conn = g.get("conn")
+    if conn is not None and getattr(conn, "escribio", False) and db.hay_replica():
+        session[ESCRITURA_SESION] = time.time() + REPLICA_RETRASO_MAX
+    return response
+
+
+@vistas.teardown_appcontext
 def teardown_db(exception):
-    cursor = g.pop("cursor", None)
-    if cursor is not None:
-        cursor.close()
-    conn = g.pop("conn", None)
-    if conn is not None:
-        conn.close()
+    for nombre_cursor, nombre_conn in (("cursor", "conn"), ("cursor_lectura", "conn_lectura")):
+        cursor = g.pop(nombre_cursor, None)
+        if cursor is not None:
+            cursor.close()
+        conn = g.pop(nombre_conn, None)
+        if conn is not None:
+            conn.close()
+    # Después de devolver las conexiones, para que el indicador "en_uso" no
+    # cuente la de esta misma petición
+    metricas.sincronizar(estadisticas_pool(), ranking_singleflight.estadisticas())
+
+
+@vistas.after_request
+def add_server_timing(response):
+    """Expone el tiempo de base de datos de la petición en Server-Timing."""
+    if SQL_INSTRUMENTACION and "inicio_peticion" in g:
+        response.headers["Server-Timing"] = server_timing(
+            g.get("consultas", []), time.perf_counter() - g.inicio_peticion
+        )
+    return response
 
 
-@app.after_request
+@vistas.after_request
+def registrar_metricas(response):
+    """Registra la latencia de la petición por endpoint y código de estado."""
+    if "inicio_peticion" in g:
+        metricas.LATENCIA.labels(
+            request.endpoint or "desconocido", str(response.status_code)
+        ).observe(time.perf_counter() - g.inicio_peticion)
+    return response
+
+
+@vistas.after_request
 def add_no_cache_headers(response):
-    """Evita el cacheo de páginas protegidas para rutas de administrador."""
+    """Evita el cacheo de páginas protegidas para rutas de administrador.
+
+    Las respuestas con ETag se pueden guardar solo en la caché privada del
+    navegador y siempre se revalidan (la sesión se comprueba antes del 304).
+    """
     if request.path.startswith("/admin"):
-        response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate"
+        if response.get_etag()[0]:
+            response.headers["Cache-Control"] = "private, no-cache, must-revalidate"
+        else:
+            response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate"
         response.headers["Pragma"] = "no-cache"
         response.headers["Expires"] = "0"
     return response
@@ -92,12 +557,12 @@ def add_no_cache_headers(response):
 # ==============================
 
 
-@app.route("/")
+@vistas.route("/")
 def index():
     return render_template("index.html")
 
 
-@app.route("/formulario_redirect", methods=["POST"])
+@vistas.route("/formulario_redirect", methods=["POST"])
 def formulario_redirect():
     usuario_id = request.form["usuario_id"]
     return redirect(url_for("mostrar_formulario", id_usuario=usuario_id))
@@ -108,7 +573,7 @@ def formulario_redirect():
 # ==============================
 
 
-@app.route("/formulario/<int:id_usuario>")
+@vistas.route("/formulario/<int:id_usuario>")
 def mostrar_formulario(id_usuario):
     """Muestra el formulario asignado al usuario.
 
@@ -118,56 +583,102 @@ def mostrar_formulario(id_usuario):
     """
     get_db()
 
-    g.cursor.execute(
-        """
-        SELECT a.id_formulario, f.nombre AS nombre_formulario
-        FROM asignacion a
-        JOIN formulario f ON a.id_formulario = f.id
-        LEFT JOIN respuesta r
-            ON r.id_usuario = a.id_usuario AND r.id_formulario = a.id_formulario
-        WHERE a.id_usuario = %s
-        ORDER BY r.id IS NOT NULL, a.id_formulario
-        LIMIT 1
-        """,
-        (id_usuario,),
-    )
-    asignacion = g.cursor.fetchone()
+    if request.if_none_match:
+        # Revalidación: solo la marca de la última respuesta del usuario
+        g.cursor.execute(
+            "SELECT MAX(fecha_respuesta) AS ultima_respuesta FROM respuesta"
+            " WHERE id_usuario = %s",
+            (id_usuario,),
+        )
+        ultima = g.cursor.fetchone()["ultima_respuesta"]
+        respuesta = no_modificado(etag_formulario(id_usuario, ultima))
+        if respuesta is not None:
+            return respuesta
+
+    clave = asignacion_cache_key(id_usuario)
+    asignacion = cache.get(clave)
+    metricas.CACHE.labels("asignacion", "miss" if asignacion is None else "hit").inc()
+    if asignacion is None:
+        # Usuario, primer formulario asignado sin respuesta (o el primero si
+        # todos la tienen) y sus respuestas previas en una sola consulta
+        g.cursor.execute(
+            """
+            SELECT u.id, u.nombre, u.apellidos, u.cargo, u.dependencia,
+                   a.id_formulario, f.nombre AS nombre_formulario,
+                   rd.id_factor, rd.valor_usuario,
+                   (SELECT MAX(fecha_respuesta) FROM respuesta
+                    WHERE id_usuario = u.id) AS ultima_respuesta
+            FROM usuario u
+            JOIN asignacion a
+                ON a.id_usuario = u.id
+                AND a.id_formulario = (
+                    SELECT a2.id_formulario
+                    FROM asignacion a2
+                    LEFT JOIN respuesta r2
+                        ON r2.id_usuario = a2.id_usuario
+                        AND r2.id_formulario = a2.id_formulario
+                    WHERE a2.id_usuario = u.id
+                    ORDER BY r2.id IS NOT NULL, a2.id_formulario
+                    LIMIT 1
+                )
+            JOIN formulario f ON f.id = a.id_formulario
+            LEFT JOIN respuesta r
+                ON r.id_usuario = u.id AND r.id_formulario = a.id_formulario
+            LEFT JOIN respuesta_detalle rd ON rd.id_respuesta = r.id
+            WHERE u.id = %s
+            """,
+            (id_usuario,),
+        )
+    else:
+        g.cursor.execute(
+            """
+            SELECT u.id, u.nombre, u.apellidos, u.cargo, u.dependencia,
+                   rd.id_factor, rd.valor_usuario,
+                   (SELECT MAX(fecha_respuesta) FROM respuesta
+                    WHERE id_usuario = u.id) AS ultima_respuesta
+            FROM usuario u
+            LEFT JOIN respuesta r
+                ON r.id_usuario = u.id AND r.id_formulario = %s
+            LEFT JOIN respuesta_detalle rd ON rd.id_respuesta = r.id
+            WHERE u.id = %s
+            """,
+            (asignacion["id_formulario"], id_usuario),
+        )
+    filas = g.cursor.fetchall()
 
-    if not asignacion:
+    if not filas:
         return "No se encontró un formulario asignado."
 
-    id_formulario = asignacion["id_formulario"]
-
-    # Obtener factores (con caché)
-    factores = get_factores()
-
-    # Obtener datos del usuario
-    g.cursor.execute("SELECT * FROM usuario WHERE id = %s", (id_usuario,))
-    usuario = g.cursor.fetchone()
-
-    # Obtener respuestas anteriores (si existen)
-    g.cursor.execute(
-        """
-        SELECT rd.id_factor, rd.valor_usuario
-        FROM respuesta r
-        JOIN respuesta_detalle rd ON r.id = rd.id_respuesta
-        WHERE r.id_usuario = %s AND r.id_formulario = %s
-    """,
-        (id_usuario, id_formulario),
-    )
-    respuestas_previas = g.cursor.fetchall()
-
+    primera = filas[0]
+    if asignacion is None:
+        asignacion = {
+            "id_formulario": primera["id_formulario"],
+            "nombre_formulario": primera["nombre_formulario"],
+        }
+        cache.set(clave, asignacion, timeout=ASIGNACION_CACHE_TTL)
+
+    usuario = {
+        campo: primera[campo]
+        for campo in ("id", "nombre", "apellidos", "cargo", "dependencia")
+    }
     # Convertir a diccionario {id_factor: valor}
-    respuestas_dict = {r["id_factor"]: r["valor_usuario"] for r in respuestas_previas}
-
-    return render_template(
+    respuestas_dict = {
+        fila["id_factor"]: fila["valor_usuario"]
+        for fila in filas
+        if fila["id_factor"] is not None
+    }
+
+    # Antes de renderizar: la plantilla consume los mensajes flash
+    etag = etag_formulario(id_usuario, primera["ultima_respuesta"])
+    html = render_template(
         "formulario.html",
         usuario_id=id_usuario,
         formulario=asignacion,
-        factores=factores,
+        tabla_factores=render_tabla_factores(),
         usuario=usuario,
         respuestas_previas=respuestas_dict,
     )
+    return con_etag(html, etag)
 
 
 # ==============================
@@ -175,7 +686,7 @@ def mostrar_formulario(id_usuario):
 # ==============================
 
 
-@app.route("/guardar_respuesta", methods=["POST"])
+@vistas.route("/guardar_respuesta", methods=["POST"])
 def guardar_respuesta():
     id_usuario = int(request.form["usuario_id"])
     id_formulario = int(request.form["formulario_id"])
@@ -211,11 +722,11 @@ def guardar_respuesta():
         flash("Cada valor del 1 al 10 debe ser único. No se permiten duplicados.")
         return redirect(url_for("mostrar_formulario", id_usuario=id_usuario))
 
-    # 2. Guardar información en la base de datos dentro de una transacción
+    # 2. Guardar información en la base de datos dentro de una transacción.
+    # La conexión no usa autocommit, así que la transacción empieza con la
+    # primera sentencia sin un START TRANSACTION adicional.
     get_db()
     try:
-        g.conn.start_transaction()
-
         # Actualizar los datos del usuario
         g.cursor.execute(
             """
@@ -229,64 +740,91 @@ def guardar_respuesta():
             (nombre, apellidos, cargo, dependencia, id_usuario),
         )
 
-        # Verificar si ya hay una respuesta existente → si sí, eliminarla
-        g.cursor.execute(
-            """
-            SELECT id FROM respuesta
-            WHERE id_usuario = %s AND id_formulario = %s
-        """,
-            (id_usuario, id_formulario),
-        )
-        anterior = g.cursor.fetchone()
-
-        if anterior:
-            id_anterior = anterior["id"]
-            # Eliminar ponderaciones si existen
-            g.cursor.execute(
-                "DELETE FROM ponderacion_admin WHERE id_respuesta = %s", (id_anterior,)
-            )
-            g.cursor.execute(
-                "DELETE FROM respuesta_detalle WHERE id_respuesta = %s", (id_anterior,)
-            )
-            g.cursor.execute("DELETE FROM respuesta WHERE id = %s", (id_anterior,))
-
-        # Insertar nueva respuesta
+        # Conservar la respuesta existente (y sus ponderaciones) o crearla;
+        # LAST_INSERT_ID(id) devuelve su id en ambos casos y rowcount dice
+        # cuál fue: 1 si se insertó, 2 (o 0 sin cambios) si ya existía.
         g.cursor.execute(
             """
             INSERT INTO respuesta (id_usuario, id_formulario)
             VALUES (%s, %s)
+            ON DUPLICATE KEY UPDATE id = LAST_INSERT_ID(id),
+                                    fecha_respuesta = CURRENT_TIMESTAMP
         """,
             (id_usuario, id_formulario),
         )
         id_respuesta = g.cursor.lastrowid
-
-        # Insertar detalle de factores
-        detalles = [(id_respuesta, factor_id, valor) for factor_id, valor in valores]
-        g.cursor.executemany(
+        nueva = g.cursor.rowcount == 1
+
+        completa = False
+        if nueva:
+            ranking.registrar_respuesta(g.cursor, id_respuesta, dependencia, cargo)
+        else:
+            estado = ranking.bloquear_estado(g.cursor, id_respuesta)
+            completa = (
+                estado is not None
+                and estado["ponderaciones"] == ranking.FACTORES_POR_RESPUESTA
+            )
+        # Solo una respuesta completa aporta al ranking: retirar los valores
+        # previos y, si cambiaron la dependencia o el cargo, moverla de celda
+        # del cubo. Las incompletas toman sus dimensiones al completarse.
+        if completa:
+            ranking.ajustar_ranking(g.cursor, [id_respuesta], -1)
+            if (estado["dependencia"], estado["cargo"]) != (dependencia, cargo):
+                ranking.actualizar_dimensiones(g.cursor, id_respuesta, dependencia, cargo)
+
+        # Reemplazar los 10 detalles en una sola sentencia. REPLACE borra las
+        # filas que chocan con cualquiera de las dos claves únicas, así que
+        # intercambiar valores entre factores no viola UNIQUE(id_respuesta,
+        # valor_usuario) como lo haría un ON DUPLICATE KEY UPDATE fila a fila.
+        detalles = [
+            dato
+            for factor_id, valor in valores
+            for dato in (id_respuesta, factor_id, valor)
+        ]
+        g.cursor.execute(
             """
-                INSERT INTO respuesta_detalle (id_respuesta, id_factor, valor_usuario)
-                VALUES (%s, %s, %s)
-            """,
+            REPLACE INTO respuesta_detalle (id_respuesta, id_factor, valor_usuario)
+            VALUES """
+            + ", ".join(["(%s, %s, %s)"] * len(valores)),
             detalles,
         )
+        if completa:
+            ranking.ajustar_ranking(g.cursor, [id_respuesta], 1)
 
         g.conn.commit()
-    except mysql.connector.IntegrityError:
+        metricas.TRANSACCIONES.labels("guardar_respuesta", "commit").inc()
+    except ERRORES_INTEGRIDAD:
+        # Con la respuesta como upsert solo queda violar una clave foránea:
+        # usuario, formulario o factor inexistente
         g.conn.rollback()
-        flash("Ya se registró una respuesta para este formulario.")
+        metricas.TRANSACCIONES.labels("guardar_respuesta", "rollback").inc()
+        flash("Los datos del formulario no son válidos. Recarga la página e intenta nuevamente.")
         return redirect(url_for("mostrar_formulario", id_usuario=id_usuario))
     except Exception:
         g.conn.rollback()
+        metricas.TRANSACCIONES.labels("guardar_respuesta", "rollback").inc()
         flash("Error al guardar la respuesta. Intenta nuevamente.")
         return redirect(url_for("mostrar_formulario", id_usuario=id_usuario))
 
-    invalidate_ranking_cache()
+    # Solo cambian el ranking una respuesta nueva (conteos e incompletas) o
+    # una respuesta ya ponderada por completo (totales)
+    if nueva or completa:
+        invalidate_ranking_cache()
+    # Una respuesta nueva cambia el formulario que se le muestra al usuario
+    if nueva:
+        invalidate_asignacion_cache(id_usuario)
+    else:
+        # El ETag del formulario no puede depender solo de fecha_respuesta: con
+        # resolución de un segundo, reenviar dentro del mismo segundo no la cambia
+        generaciones.incrementar(cubeta_usuario(id_usuario))
+    # Cualquier cambio de valores afecta la analítica del ranking
+    generaciones.incrementar("respuestas")
     if exit_redirect:
         return redirect(url_for("index"))
     return render_template("confirmacion.html")
 
 
-@app.route("/admin/login", methods=["GET", "POST"])
+@vistas.route("/admin/login", methods=["GET", "POST"])
 def admin_login():
     if request.method == "POST":
         password = request.form.get("password", "")
@@ -297,7 +835,7 @@ def admin_login():
     return render_template("admin_login.html")
 
 
-@app.route("/admin/logout")
+@vistas.route("/admin/logout")
 def admin_logout():
     session.pop("is_admin", None)
     return redirect(url_for("index"))
@@ -308,16 +846,39 @@ def admin_logout():
 # ==============================
 
 
-@app.route("/admin")
+@vistas.route("/admin")
 def panel_admin():
     if not session.get("is_admin"):
         return redirect(url_for("admin_login"))
-    get_db()
-    page = request.args.get("page", 1, type=int)
+    _, cursor = get_db_lectura()
     per_page = 10
-    offset = (page - 1) * per_page
-    g.cursor.execute(
-        """
+    tipos_cursor = (datetime, int)
+    despues = decodificar_cursor(request.args.get("despues"), tipos_cursor)
+    antes = None if despues else decodificar_cursor(
+        request.args.get("antes"), tipos_cursor
+    )
+
+    # Paginación por (fecha_respuesta, id) sobre idx_respuesta_fecha_id: cada
+    # página cuesta lo mismo sin importar su profundidad.
+    condicion = ""
+    params = ()
+    orden = "DESC"
+    if despues:
+        condicion = (
+            "WHERE r.fecha_respuesta < %s"
+            " OR (r.fecha_respuesta = %s AND r.id < %s)"
+        )
+        params = (despues[0], despues[0], despues[1])
+    elif antes:
+        condicion = (
+            "WHERE r.fecha_respuesta > %s"
+            " OR (r.fecha_respuesta = %s AND r.id > %s)"
+        )
+        params = (antes[0], antes[0], antes[1])
+        orden = "ASC"
+
+    cursor.execute(
+        f"""
         SELECT r.id AS id_respuesta,
                u.nombre,
                u.apellidos,
@@ -327,42 +888,66 @@ def panel_admin():
         FROM respuesta r
         JOIN usuario u ON r.id_usuario = u.id
         JOIN formulario f ON r.id_formulario = f.id
-        ORDER BY r.fecha_respuesta DESC
-        LIMIT %s OFFSET %s
+        {condicion}
+        ORDER BY r.fecha_respuesta {orden}, r.id {orden}
+        LIMIT %s
         """,
-        (per_page + 1, offset),
+        (*params, per_page + 1),
     )
-    respuestas = g.cursor.fetchall()
-    has_next = len(respuestas) > per_page
-    if has_next:
-        respuestas = respuestas[:-1]
+    respuestas = cursor.fetchall()
+    hay_mas = len(respuestas) > per_page
+    respuestas = respuestas[:per_page]
+    if antes:
+        respuestas.reverse()
+        has_prev, has_next = hay_mas, True
+    else:
+        has_prev, has_next = despues is not None, hay_mas
+
+    cursor_anterior = cursor_siguiente = None
+    if respuestas:
+        primera, ultima = respuestas[0], respuestas[-1]
+        if has_prev:
+            cursor_anterior = codificar_cursor(
+                primera["fecha_respuesta"], primera["id_respuesta"]
+            )
+        if has_next:
+            cursor_siguiente = codificar_cursor(
+                ultima["fecha_respuesta"], ultima["id_respuesta"]
+            )
 
     return render_template(
-        "admin.html", respuestas=respuestas, page=page, has_next=has_next
+        "admin.html",
+        respuestas=respuestas,
+        cursor_anterior=cursor_anterior,
+        cursor_siguiente=cursor_siguiente,
     )
 
 
-@app.route("/admin/formularios", methods=["GET", "POST"])
+@vistas.route("/admin/formularios", methods=["GET", "POST"])
 def administrar_formularios():
     if not session.get("is_admin"):
         return redirect(url_for("admin_login"))
 
-    get_db()
+    # El listado es un reporte: sin escritura pendiente va a la réplica
+    if request.method == "POST":
+        _, cursor = get_db()
+    else:
+        _, cursor = get_db_lectura()
 
     # Obtener el próximo ID para sugerir un nombre por defecto
-    g.cursor.execute(
+    cursor.execute(
         """
         SELECT AUTO_INCREMENT AS siguiente_id
         FROM information_schema.TABLES
         WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'formulario'
         """
     )
-    siguiente_id = g.cursor.fetchone()["siguiente_id"]
+    siguiente_id = cursor.fetchone()["siguiente_id"]
     default_name = f"Formulario {siguiente_id:02d}"
 
     if request.method == "POST":
         nombre = request.form.get("nombre", "").strip() or default_name
-        g.cursor.execute(
+        cursor.execute(
             "INSERT INTO formulario (nombre) VALUES (%s)",
             (nombre,),
         )
@@ -370,7 +955,7 @@ def administrar_formularios():
         flash("Formulario creado correctamente.")
         return redirect(url_for("administrar_formularios"))
 
-    g.cursor.execute(
+    cursor.execute(
         """
         SELECT f.id, f.nombre, COUNT(r.id) AS respuestas
         FROM formulario f
@@ -379,7 +964,7 @@ def administrar_formularios():
         ORDER BY f.id
         """
     )
-    formularios = g.cursor.fetchall()
+    formularios = cursor.fetchall()
 
     return render_template(
         "admin_formularios.html",
@@ -388,7 +973,7 @@ def administrar_formularios():
     )
 
 
-@app.route("/admin/formularios/eliminar/<int:id>", methods=["POST"])
+@vistas.route("/admin/formularios/eliminar/<int:id>", methods=["POST"])
 def eliminar_formulario(id):
     if not session.get("is_admin"):
         return redirect(url_for("admin_login"))
@@ -426,11 +1011,13 @@ def eliminar_formulario(id):
                 flash("El número de respuestas cambió; operación cancelada.")
                 return redirect(url_for("administrar_formularios"))
 
+        ranking.retirar_formulario(g.cursor, id)
         g.cursor.execute("DELETE FROM respuesta WHERE id_formulario = %s", (id,))
         g.cursor.execute("DELETE FROM asignacion WHERE id_formulario = %s", (id,))
         g.cursor.execute("DELETE FROM formulario WHERE id = %s", (id,))
         g.conn.commit()
         invalidate_ranking_cache()
+        invalidate_asignacion_cache()
         flash("Formulario eliminado correctamente.")
         return redirect(url_for("administrar_formularios"))
 
@@ -438,7 +1025,7 @@ def eliminar_formulario(id):
     return redirect(url_for("administrar_formularios"))
 
 
-@app.route("/admin/formularios/reiniciar", methods=["POST"])
+@vistas.route("/admin/formularios/reiniciar", methods=["POST"])
 def reiniciar_formularios():
     if not session.get("is_admin"):
         return redirect(url_for("admin_login"))
@@ -448,13 +1035,15 @@ def reiniciar_formularios():
     g.cursor.execute("DELETE FROM ponderacion_admin")
     g.cursor.execute("DELETE FROM respuesta_detalle")
     g.cursor.execute("DELETE FROM respuesta")
+    ranking.reiniciar(g.cursor)
     g.conn.commit()
     invalidate_ranking_cache()
+    invalidate_asignacion_cache()
     flash("Todos los formularios han sido reiniciados.")
     return redirect(url_for("administrar_formularios"))
 
 
-@app.route("/admin/factores", methods=["GET", "POST"])
+@vistas.route("/admin/factores", methods=["GET", "POST"])
 def administrar_factores():
     if not session.get("is_admin"):
         return redirect(url_for("admin_login"))
@@ -485,7 +1074,7 @@ def administrar_factores():
 # ==============================
 
 
-@app.route("/admin/respuesta/<int:id_respuesta>")
+@vistas.route("/admin/respuesta/<int:id_respuesta>")
 def detalle_respuesta(id_respuesta):
     if not session.get("is_admin"):
         return redirect(url_for("admin_login"))
@@ -519,21 +1108,11 @@ def detalle_respuesta(id_respuesta):
     )
     factores = g.cursor.fetchall()
 
-    # Ranking acumulado (de todas las ponderaciones globales)
-    g.cursor.execute(
-        """
-        SELECT f.nombre, SUM(p.peso_admin * rd.valor_usuario) AS total
-        FROM ponderacion_admin p
-        JOIN respuesta_detalle rd ON rd.id_respuesta = p.id_respuesta AND rd.id_factor = p.id_factor
-        JOIN factor f ON f.id = p.id_factor
-        GROUP BY f.id, f.nombre
-        ORDER BY total DESC
-    """
-    )
-    ranking = g.cursor.fetchall()
-
+    # El ranking global se carga aparte desde datos_ranking (caché compartida)
     return render_template(
-        "admin_detalle.html", respuesta=respuesta, factores=factores, ranking=ranking
+        "admin_detalle.html",
+        respuesta=respuesta,
+        factores=factores,
     )
 
 
@@ -542,7 +1121,7 @@ def detalle_respuesta(id_respuesta):
 # ==============================
 
 
-@app.route("/admin/ponderar", methods=["POST"])
+@vistas.route("/admin/ponderar", methods=["POST"])
 def guardar_ponderacion():
     if not session.get("is_admin"):
         return redirect(url_for("admin_login"))
@@ -582,6 +1161,10 @@ def guardar_ponderacion():
         ponderaciones.append((id_respuesta, id_factor, float(peso)))
 
     if ponderaciones:
+        # Las tablas resumen se actualizan en la misma transacción
+        previas = ranking.bloquear_estado(g.cursor, id_respuesta)
+        if previas and previas["ponderaciones"] == ranking.FACTORES_POR_RESPUESTA:
+            ranking.ajustar_ranking(g.cursor, [id_respuesta], -1)
         g.cursor.executemany(
             """
                 INSERT INTO ponderacion_admin (id_respuesta, id_factor, peso_admin)
@@ -590,6 +1173,8 @@ def guardar_ponderacion():
             """,
             ponderaciones,
         )
+        ranking.actualizar_estado(g.cursor, [id_respuesta])
+        ranking.ajustar_ranking(g.cursor, [id_respuesta], 1)
     g.conn.commit()
     invalidate_ranking_cache()
 
@@ -598,80 +1183,571 @@ def guardar_ponderacion():
 
 
 # ==============================
-# RANKING DE FACTORES (ADMIN)
+# PONDERACIÓN MASIVA (ADMIN)
 # ==============================
 
 
-@app.route("/admin/ranking")
-def vista_ranking():
+def _parametros_ponderacion():
+    """Página y filtro actuales, para volver a ellos tras guardar."""
+    return {
+        clave: request.args[clave]
+        for clave in ("despues", "antes", "incompletas")
+        if request.args.get(clave)
+    }
+
+
+@vistas.route("/admin/ponderaciones", methods=["GET", "POST"])
+def ponderacion_masiva():
+    """Cuadrícula respuesta × factor para ponderar muchas respuestas a la vez."""
     if not session.get("is_admin"):
         return redirect(url_for("admin_login"))
     get_db()
-    # Contar formularios asignados y formularios con respuesta
-    g.cursor.execute("SELECT COUNT(*) AS total FROM asignacion")
-    total_asignados = g.cursor.fetchone()["total"]
+    ids_factor = {factor["id"] for factor in get_factores()}
 
-    g.cursor.execute("SELECT COUNT(*) AS total FROM respuesta")
-    total_respuestas = g.cursor.fetchone()["total"]
+    if request.method == "POST":
+        # Campos peso_<id_respuesta>_<id_factor>; los vacíos no se tocan
+        pesos = {}
+        try:
+            for clave, valor in request.form.items():
+                if not clave.startswith("peso_"):
+                    continue
+                peso = ponderaciones.leer_peso(valor)
+                if peso is None:
+                    continue
+                try:
+                    id_respuesta, id_factor = (int(parte) for parte in clave.split("_")[1:])
+                except ValueError:
+                    raise ValueError(
+                        "Los identificadores de respuesta y factor deben ser números enteros."
+                    ) from None
+                if id_factor not in ids_factor:
+                    raise ValueError(f"El factor {id_factor} no existe.")
+                pesos[(id_respuesta, id_factor)] = peso
+        except ValueError as error:
+            flash(str(error))
+            return redirect(url_for("ponderacion_masiva", **_parametros_ponderacion()))
 
-    pendientes = total_respuestas < total_asignados
+        try:
+            respuestas = ponderaciones.guardar(
+                g.cursor, [(*clave, peso) for clave, peso in pesos.items()]
+            )
+            g.conn.commit()
+        except ERRORES_INTEGRIDAD:
+            g.conn.rollback()
+            flash("Alguna de las respuestas ya no existe. No se guardó ningún cambio.")
+            return redirect(url_for("ponderacion_masiva", **_parametros_ponderacion()))
+        if respuestas:
+            invalidate_ranking_cache()
+        flash(f"Ponderaciones guardadas en {respuestas} respuestas.")
+        return redirect(url_for("ponderacion_masiva", **_parametros_ponderacion()))
+
+    despues = decodificar_cursor(request.args.get("despues"), (int,))
+    antes = None if despues else decodificar_cursor(request.args.get("antes"), (int,))
+    solo_incompletas = request.args.get("incompletas") == "1"
+    filas, hay_anterior, hay_siguiente = ponderaciones.pagina(
+        g.cursor,
+        despues=despues[0] if despues else None,
+        antes=antes[0] if antes else None,
+        solo_incompletas=solo_incompletas,
+    )
+    filtro = {"incompletas": "1"} if solo_incompletas else {}
+    cursor_anterior = cursor_siguiente = None
+    if filas:
+        if hay_anterior:
+            cursor_anterior = codificar_cursor(filas[0]["id_respuesta"])
+        if hay_siguiente:
+            cursor_siguiente = codificar_cursor(filas[-1]["id_respuesta"])
+    return render_template(
+        "admin_ponderaciones.html",
+        factores=sorted(get_factores(), key=lambda factor: factor["id"]),
+        filas=filas,
+        plantillas=ponderaciones.listar_plantillas(g.cursor),
+        solo_incompletas=solo_incompletas,
+        filtro=filtro,
+        parametros=_parametros_ponderacion(),
+        cursor_anterior=cursor_anterior,
+        cursor_siguiente=cursor_siguiente,
+        completas=ranking.FACTORES_POR_RESPUESTA,
+    )
 
-    cached = cache.get(RANKING_CACHE_KEY)
-    if cached is not None:
-        ranking = cached["ranking"]
-        incompletas = cached["incompletas"]
-    else:
-        # Detectar respuestas con ponderaciones incompletas
-        incompletas_query = """
-            SELECT r.id AS id_respuesta
-            FROM respuesta r
-            LEFT JOIN ponderacion_admin p ON r.id = p.id_respuesta
-            GROUP BY r.id
-            HAVING COUNT(p.id_factor) < %s
-        """
-        g.cursor.execute(incompletas_query, (10,))
-        incompletas_rows = g.cursor.fetchall()
-        incompletas = [row["id_respuesta"] for row in incompletas_rows]
-
-        ranking_query = """
-            SELECT f.nombre,
-                   SUM(pa.peso_admin * rd.valor_usuario) AS total
-            FROM factor f
-            JOIN ponderacion_admin pa ON f.id = pa.id_factor
-            JOIN (
-                SELECT id_respuesta
-                FROM ponderacion_admin
-                GROUP BY id_respuesta
-                HAVING COUNT(id_factor) = %s
-            ) rc ON pa.id_respuesta = rc.id_respuesta
-            JOIN respuesta_detalle rd
-                ON rd.id_respuesta = pa.id_respuesta AND rd.id_factor = f.id
-            GROUP BY f.id, f.nombre
-            ORDER BY total DESC
-        """
-        g.cursor.execute(ranking_query, (10,))
-        ranking = g.cursor.fetchall()
 
-        cache.set(
-            RANKING_CACHE_KEY,
-            {"ranking": ranking, "incompletas": incompletas},
-            timeout=CACHE_TTL,
-        )
+@vistas.route("/admin/ponderaciones/plantillas", methods=["POST"])
+def guardar_plantilla_ponderacion():
+    if not session.get("is_admin"):
+        return redirect(url_for("admin_login"))
+    get_db()
+    nombre = sanitize(request.form.get("nombre", "")).strip()
+    if not nombre:
+        flash("La plantilla necesita un nombre.")
+        return redirect(url_for("ponderacion_masiva"))
+    pesos = {}
+    try:
+        for factor in get_factores():
+            peso = ponderaciones.leer_peso(request.form.get(f"plantilla_{factor['id']}", ""))
+            if peso is not None:
+                pesos[factor["id"]] = peso
+    except ValueError as error:
+        flash(str(error))
+        return redirect(url_for("ponderacion_masiva"))
+    ponderaciones.guardar_plantilla(g.cursor, nombre[:100], pesos)
+    g.conn.commit()
+    flash(f"Plantilla «{nombre[:100]}» guardada.")
+    return redirect(url_for("ponderacion_masiva"))
+
+
+@vistas.route("/admin/ponderaciones/plantillas/<int:id_plantilla>/aplicar", methods=["POST"])
+def aplicar_plantilla_ponderacion(id_plantilla):
+    """Completa con la plantilla los pesos que faltan en todas las respuestas incompletas."""
+    if not session.get("is_admin"):
+        return redirect(url_for("admin_login"))
+    get_db()
+    respuestas, agregados = ponderaciones.aplicar_plantilla(g.cursor, id_plantilla)
+    g.conn.commit()
+    if agregados:
+        invalidate_ranking_cache()
+    flash(f"Se agregaron {agregados} ponderaciones en {respuestas} respuestas incompletas.")
+    return redirect(url_for("ponderacion_masiva", incompletas="1"))
+
+
+@vistas.route("/admin/ponderaciones/plantillas/<int:id_plantilla>/eliminar", methods=["POST"])
+def eliminar_plantilla_ponderacion(id_plantilla):
+    if not session.get("is_admin"):
+        return redirect(url_for("admin_login"))
+    get_db()
+    ponderaciones.eliminar_plantilla(g.cursor, id_plantilla)
+    g.conn.commit()
+    flash("Plantilla eliminada.")
+    return redirect(url_for("ponderacion_masiva"))
+
+
+# ==============================
+# RANKING DE FACTORES (ADMIN)
+# ==============================
+
+
+@vistas.route("/admin/ranking")
+def vista_ranking():
+    if not session.get("is_admin"):
+        return redirect(url_for("admin_login"))
+    generacion = generaciones.actual("ranking")
+    etag = calcular_etag("ranking", generacion, generaciones.actual("factores"))
+    respuesta = no_modificado(etag)
+    if respuesta is not None:
+        return respuesta
+
+    datos = obtener_ranking_cacheado()
+    ranking_factores = datos["ranking"]
+    if datos.get("generacion") != generacion:
+        # Resultado anterior servido mientras otro worker recalcula
+        etag = None
 
     # Determinar si no hay datos
     estado_ranking = None
-    if not ranking:
+    if not ranking_factores:
         estado_ranking = "sin_datos"
 
-    return render_template(
+    html = render_template(
         "admin_ranking.html",
-        ranking=ranking,
-        pendientes=pendientes,
-        total_asignados=total_asignados,
-        total_respuestas=total_respuestas,
-        incompletas=incompletas,
+        ranking=ranking_factores,
+        pendientes=datos["total_respuestas"] < datos["total_asignados"],
+        total_asignados=datos["total_asignados"],
+        total_respuestas=datos["total_respuestas"],
+        incompletas=datos["incompletas"],
         estado_ranking=estado_ranking,
     )
+    return con_etag(html, etag)
+
+
+@vistas.route("/admin/ranking/datos")
+def datos_ranking():
+    """Ranking global en JSON desde la misma caché que la vista del ranking.
+
+    Lo usa el panel de detalle_respuesta, que se abre una y otra vez mientras
+    se pondera: con el ETag, cada vista sin cambios es un 304 sin consultas.
+    """
+    if not session.get("is_admin"):
+        return redirect(url_for("admin_login"))
+    generacion = generaciones.actual("ranking")
+    etag = calcular_etag("ranking-datos", generacion, generaciones.actual("factores"))
+    respuesta = no_modificado(etag)
+    if respuesta is not None:
+        return respuesta
+
+    datos = obtener_ranking_cacheado()
+    if datos.get("generacion") != generacion:
+        etag = None
+    return con_etag(
+        jsonify(
+            {
+                "ranking": [
+                    {"nombre": fila["nombre"], "total": float(fila["total"])}
+                    for fila in datos["ranking"]
+                ],
+                "incompletas": len(datos["incompletas"]),
+                "respuestas": datos["total_respuestas"],
+            }
+        ),
+        etag,
+    )
+
+
+# Parámetro de la URL -> columna de ranking_cubo
+FILTROS_DESGLOSE = (
+    ("dependencia", "dependencia"),
+    ("cargo", "cargo"),
+    ("formulario", "id_formulario"),
+)
+
+
+@vistas.route("/admin/ranking/desglose")
+def desglose_ranking():
+    """Ranking de una dependencia, cargo y/o formulario, leído de ranking_cubo.
+
+    Un parámetro presente filtra aunque esté vacío (usuarios sin dependencia
+    o sin cargo). La respuesta incluye las opciones disponibles para cada filtro.
+    """
+    if not session.get("is_admin"):
+        return redirect(url_for("admin_login"))
+    filtros = {}
+    for parametro, columna in FILTROS_DESGLOSE:
+        if parametro not in request.args:
+            continue
+        valor = request.args[parametro]
+        if columna == "id_formulario":
+            try:
+                valor = int(valor)
+            except ValueError:
+                abort(400)
+        filtros[columna] = valor
+
+    etag = calcular_etag(
+        "desglose",
+        generaciones.actual("ranking"),
+        generaciones.actual("factores"),
+        sorted(filtros.items()),
+    )
+    respuesta = no_modificado(etag)
+    if respuesta is not None:
+        return respuesta
+
+    get_db()
+    ranking_filtrado, respuestas = ranking.obtener_desglose(g.cursor, filtros)
+    return con_etag(
+        jsonify(
+            {
+                "filtros": {
+                    parametro: filtros[columna]
+                    for parametro, columna in FILTROS_DESGLOSE
+                    if columna in filtros
+                },
+                "respuestas": respuestas,
+                "ranking": ranking_filtrado,
+                "opciones": ranking.opciones_desglose(g.cursor),
+            }
+        ),
+        etag,
+    )
+
+
+@vistas.route("/admin/ranking/analitica")
+def analitica_ranking():
+    """Borda, rango medio, W de Kendall y distribuciones en JSON.
+
+    La vista del ranking la pide al cargar para no retrasar la tabla
+    principal mientras se calcula.
+    """
+    if not session.get("is_admin"):
+        return redirect(url_for("admin_login"))
+    version = version_analitica()
+    etag = calcular_etag("analitica", *version)
+    respuesta = no_modificado(etag)
+    if respuesta is not None:
+        return respuesta
+
+    analisis = dict(obtener_analitica_cacheada())
+    if analisis.pop("version", None) != version:
+        etag = None
+    return con_etag(jsonify(analisis), etag)
+
+
+# ==============================
+# EXPORTACIÓN (ADMIN)
+# ==============================
+
+
+@vistas.route("/admin/exportar")
+def exportar_respuestas():
+    """Descarga todas las respuestas con sus valores y ponderaciones.
+
+    Acepta ``formato`` (csv o xlsx) y los filtros ``formulario``,
+    ``dependencia``, ``desde`` y ``hasta`` (AAAA-MM-DD).
+    """
+    if not session.get("is_admin"):
+        return redirect(url_for("admin_login"))
+    formato = request.args.get("formato", "csv")
+    if formato not in ("csv", "xlsx"):
+        abort(400)
+    try:
+        desde = request.args.get("desde") or None
+        hasta = request.args.get("hasta") or None
+        desde = datetime.strptime(desde, "%Y-%m-%d") if desde else None
+        hasta = datetime.strptime(hasta, "%Y-%m-%d") if hasta else None
+    except ValueError:
+        abort(400)
+    sql, params = exportacion.construir_consulta(
+        id_formulario=request.args.get("formulario", type=int),
+        dependencia=request.args.get("dependencia", "").strip() or None,
+        desde=desde,
+        hasta=hasta,
+    )
+
+    _, cursor = get_db()
+    factores = get_factores()
+    columnas = exportacion.encabezados(factores)
+    cursor.execute(sql, params)
+    # La respuesta se genera después del teardown de la petición, así que la
+    # conexión pasa a ser suya y se devuelve al pool cuando termina el envío.
+    conn, cursor = g.pop("conn"), g.pop("cursor")
+
+    def generar():
+        lotes = exportacion.filas_anchas(cursor, factores)
+        if formato == "xlsx":
+            yield from exportacion.xlsx_stream(lotes, columnas)
+        else:
+            yield from exportacion.csv_stream(lotes, columnas)
+
+    def cerrar():
+        try:
+            # Un cursor sin búfer debe leerse entero antes de liberar la conexión
+            while cursor.fetchmany(exportacion.TAM_LOTE):
+                pass
+            cursor.close()
+        finally:
+            conn.close()
+
+    if formato == "xlsx":
+        mimetype = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    else:
+        mimetype = "text/csv; charset=utf-8"
+    nombre = f"respuestas_{datetime.now():%Y%m%d_%H%M}.{formato}"
+    respuesta = Response(
+        generar(),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f'attachment; filename="{nombre}"'},
+    )
+    respuesta.call_on_close(cerrar)
+    return respuesta
+
+
+# ==============================
+# IMPORTACIÓN (ADMIN)
+# ==============================
+
+
+def _invalidar_tras_importacion(tipo, resultado):
+    if tipo == "asignaciones" and resultado.importadas:
+        invalidate_ranking_cache()
+        invalidate_asignacion_cache()
+    elif tipo == "usuarios" and resultado.importadas:
+        # Los datos del usuario aparecen en /formulario/<id> (ETag)
+        invalidate_asignacion_cache()
+
+
+@vistas.route("/admin/importar", methods=["GET", "POST"])
+def importar_datos():
+    """Carga usuarios o asignaciones desde un archivo CSV."""
+    if not session.get("is_admin"):
+        return redirect(url_for("admin_login"))
+
+    resultado = None
+    tipo = request.form.get("tipo", "usuarios")
+    if request.method == "POST":
+        archivo = request.files.get("archivo")
+        if tipo not in importacion.COLUMNAS or not archivo or not archivo.filename:
+            flash("Selecciona el tipo de datos y un archivo CSV.")
+            return redirect(url_for("importar_datos"))
+        conn, cursor = get_db()
+        # Werkzeug guarda las subidas grandes en disco: se leen como flujo
+        texto = io.TextIOWrapper(archivo.stream, encoding="utf-8-sig", newline="")
+        try:
+            resultado = importacion.importar(conn, cursor, texto, tipo)
+        except importacion.ErrorImportacion as exc:
+            flash(str(exc))
+            return redirect(url_for("importar_datos"))
+        except UnicodeDecodeError:
+            flash("El archivo debe estar codificado en UTF-8.")
+            return redirect(url_for("importar_datos"))
+        finally:
+            texto.detach()
+        _invalidar_tras_importacion(tipo, resultado)
+
+    return render_template(
+        "admin_importar.html",
+        tipo=tipo,
+        resultado=resultado,
+        columnas=importacion.COLUMNAS,
+    )
+
+
+# ==============================
+# MÉTRICAS
+# ==============================
+
+
+@vistas.route("/metrics")
+def exportar_metricas():
+    """Métricas en formato Prometheus, agregadas entre workers.
+
+    Exige ``METRICS_TOKEN`` como token Bearer. Sin token definido solo se
+    sirven en modo debug o de pruebas, para no exponerlas por descuido.
+    """
+    token = os.getenv("METRICS_TOKEN")
+    if not token:
+        if not (current_app.debug or current_app.testing):
+            abort(404)
+    elif request.headers.get("Authorization") != f"Bearer {token}":
+        return "No autorizado", 401
+    cuerpo, tipo = metricas.exportar()
+    return cuerpo, 200, {"Content-Type": tipo}
+
+
+# ==============================
+# COMANDOS DE MANTENIMIENTO
+# ==============================
+
+
+@vistas.cli.command("ranking-resumen")
+@click.option(
+    "--reconstruir",
+    is_flag=True,
+    help="Recalcula las tablas resumen antes de verificarlas.",
+)
+def ranking_resumen_command(reconstruir):
+    """Verifica (y opcionalmente reconstruye) las tablas resumen del ranking."""
+    get_db()
+    if reconstruir:
+        ranking.reconstruir(g.cursor)
+        g.conn.commit()
+        invalidate_ranking_cache()
+        click.echo("Tablas resumen reconstruidas.")
+
+    diferencias = ranking.verificar(g.cursor)
+    if diferencias:
+        for diferencia in diferencias:
+            click.echo(diferencia)
+        raise SystemExit(1)
+    click.echo("Las tablas resumen coinciden con la consulta completa.")
+
+
+@vistas.cli.command("importar")
+@click.argument("tipo", type=click.Choice(sorted(importacion.COLUMNAS)))
+@click.argument("archivo", type=click.Path(exists=True, dir_okay=False))
+def importar_command(tipo, archivo):
+    """Importa usuarios o asignaciones desde un archivo CSV."""
+    conn, cursor = get_db()
+
+    def progreso(resultado):
+        click.echo(
+            f"{resultado.procesadas} filas procesadas, "
+            f"{resultado.importadas} importadas, {resultado.total_errores} errores"
+        )
+
+    with open(archivo, encoding="utf-8-sig", newline="") as texto:
+        try:
+            resultado = importacion.importar(conn, cursor, texto, tipo, progreso)
+        except importacion.ErrorImportacion as exc:
+            raise click.ClickException(str(exc))
+    _invalidar_tras_importacion(tipo, resultado)
+
+    for linea, mensaje in resultado.errores:
+        click.echo(f"Línea {linea}: {mensaje}", err=True)
+    if resultado.total_errores > len(resultado.errores):
+        click.echo(
+            f"... y {resultado.total_errores - len(resultado.errores)} errores más",
+            err=True,
+        )
+    click.echo(f"Importadas {resultado.importadas} de {resultado.procesadas} filas.")
+    if resultado.total_errores:
+        raise SystemExit(1)
+
+
+@vistas.cli.command("generar-datos")
+@click.option("--usuarios", type=int, default=1000, show_default=True)
+@click.option("--formularios", type=int, default=100, show_default=True)
+@click.option(
+    "--densidad",
+    type=float,
+    default=0.05,
+    show_default=True,
+    help="Fracción de los formularios nuevos asignada a cada usuario.",
+)
+@click.option(
+    "--completadas",
+    type=float,
+    default=0.8,
+    show_default=True,
+    help="Probabilidad de que una asignación tenga respuesta.",
+)
+@click.option(
+    "--ponderadas",
+    type=float,
+    default=0.5,
+    show_default=True,
+    help="Probabilidad de que una respuesta tenga sus 10 ponderaciones.",
+)
+@click.option("--semilla", type=int, default=0, show_default=True)
+def generar_datos_command(usuarios, formularios, densidad, completadas, ponderadas, semilla):
+    """Genera datos sintéticos reproducibles para pruebas de escala."""
+    conn, cursor = get_db()
+    inicio = time.perf_counter()
+
+    def progreso(totales):
+        click.echo(
+            f"{totales['usuario']} usuarios, {totales['respuesta']} respuestas, "
+            f"{totales['respuesta_detalle']} detalles "
+            f"({time.perf_counter() - inicio:.1f} s)"
+        )
+
+    try:
+        totales = datos_sinteticos.generar(
+            conn,
+            cursor,
+            usuarios,
+            formularios,
+            densidad=densidad,
+            completadas=completadas,
+            ponderadas=ponderadas,
+            semilla=semilla,
+            progreso=progreso,
+        )
+    except datos_sinteticos.ParametrosInvalidos as exc:
+        raise click.BadParameter(str(exc))
+    invalidate_ranking_cache()
+    invalidate_factores_cache()
+    invalidate_asignacion_cache()
+    for tabla, filas in totales.items():
+        click.echo(f"{tabla}: {filas} filas")
+    click.echo(f"Datos generados en {time.perf_counter() - inicio:.1f} s.")
+
+
+@vistas.cli.command("construir-assets")
+@click.option(
+    "--sin-descargas",
+    is_flag=True,
+    help="No descarga las bibliotecas de CDN que falten en static/vendor/.",
+)
+def construir_assets_command(sin_descargas):
+    """Genera static/dist/ con archivos versionados y precomprimidos."""
+    fallidos = []
+    if not sin_descargas:
+        fallidos = assets.descargar_vendor()
+    manifest = assets.construir(descargar=False)
+    for nombre in fallidos:
+        click.echo(f"No se pudo descargar {nombre}; se seguirá usando el CDN.", err=True)
+    click.echo(
+        f"{len(manifest['archivos'])} archivos y "
+        f"{len(manifest['imagenes'])} imágenes con variantes en {assets.DIST}."
+    )
 
 
 # ==============================
@@ -679,24 +1755,31 @@ def vista_ranking():
 # ==============================
 
 
-@app.errorhandler(400)
+@vistas.errorhandler(400)
 def handle_bad_request(error):
     return render_template("error_400.html"), 400
 
 
-@app.errorhandler(404)
+@vistas.errorhandler(404)
 def handle_bad_request(error):
     return render_template("error_404.html"), 404
 
 
-@app.errorhandler(500)
+@vistas.errorhandler(500)
 def handle_server_error(error):
     return render_template("error_500.html"), 500
 
 
+@vistas.errorhandler(PoolAgotado)
+def handle_pool_agotado(error):
+    """Responde 503 cuando no hay conexiones libres tras la espera del pool."""
+    current_app.logger.warning("Pool de conexiones agotado: %s", error)
+    return render_template("error_500.html"), 503, {"Retry-After": "1"}
+
+
 # ==============================
 # MAIN
 # ==============================
 
 if __name__ == "__main__":
-    app.run(debug=True)
+    create_app().run(debug=True)
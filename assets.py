@@ -0,0 +1,348 @@
+"""Construcción y publicación de los archivos estáticos.
+
+``construir`` copia los archivos de ``static/`` (y las bibliotecas de
+:data:`VENDOR`, descargadas una vez en ``static/vendor/``) a ``static/dist/``
+con el hash de su contenido en el nombre, reescribe las referencias ``url()``
+de las hojas de estilo, genera variantes ``.gz`` y ``.br`` de los archivos de
+texto y variantes WebP/AVIF en varios anchos de las imágenes, y escribe
+``manifest.json``. :func:`asset_url` traduce un nombre lógico
+(``css/main.css``) a su URL versionada; si aún no se ha construido nada usa el
+CDN original o ``/static`` para que el desarrollo no dependa del build.
+
+``brotli`` y ``Pillow`` son opcionales: sin ellos se omiten las variantes
+``.br`` y las imágenes WebP/AVIF.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import posixpath
+import re
+import shutil
+
+logger = logging.getLogger(__name__)
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+STATIC = os.path.join(RAIZ, "static")
+DIST = os.path.join(STATIC, "dist")
+MANIFEST = os.path.join(DIST, "manifest.json")
+
+# Bibliotecas que se servían desde CDN: nombre lógico -> URL de origen
+VENDOR = {
+    "vendor/bootstrap.min.css":
+        "https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css",
+    "vendor/bootstrap.bundle.min.js":
+        "https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js",
+    "vendor/bootstrap-icons.css":
+        "https://cdn.jsdelivr.net/npm/bootstrap-icons@1.8.1/font/bootstrap-icons.css",
+    "vendor/fonts/bootstrap-icons.woff2":
+        "https://cdn.jsdelivr.net/npm/bootstrap-icons@1.8.1/font/fonts/bootstrap-icons.woff2",
+    "vendor/fonts/bootstrap-icons.woff":
+        "https://cdn.jsdelivr.net/npm/bootstrap-icons@1.8.1/font/fonts/bootstrap-icons.woff",
+    "vendor/chart.umd.min.js":
+        "https://cdn.jsdelivr.net/npm/chart.js@4.4.1/dist/chart.umd.min.js",
+    "vendor/html2canvas.min.js":
+        "https://cdnjs.cloudflare.com/ajax/libs/html2canvas/1.4.1/html2canvas.min.js",
+    "vendor/jspdf.umd.min.js":
+        "https://cdnjs.cloudflare.com/ajax/libs/jspdf/2.5.1/jspdf.umd.min.js",
+}
+
+COMPRIMIBLES = {".css", ".js", ".svg", ".json", ".txt", ".html", ".map"}
+IMAGENES = {".png", ".jpg", ".jpeg"}
+ANCHOS = (120, 640, 1280, 1920)
+MIN_COMPRIMIR = 256
+_IGNORAR = {"dist"}
+
+_URL_CSS = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+_FONDO_CSS = re.compile(
+    r"""(background(?:-image)?\s*:[^;{}]*url\(\s*(['"]?)([^'")]+)\2\s*\)[^;{}]*;)"""
+)
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depende del entorno
+    brotli = None
+
+try:
+    from PIL import Image, features
+except ImportError:  # pragma: no cover - depende del entorno
+    Image = None
+    features = None
+
+
+# ==============================
+# Construcción
+# ==============================
+
+
+def descargar_vendor(destino=STATIC, timeout=20):
+    """Descarga las bibliotecas de :data:`VENDOR` que aún no estén en disco.
+
+    Devuelve los nombres que no se pudieron descargar; esos se siguen sirviendo
+    desde el CDN.
+    """
+    import urllib.request
+
+    fallidos = []
+    for nombre, url in VENDOR.items():
+        ruta = os.path.join(destino, nombre)
+        if os.path.exists(ruta):
+            continue
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        try:
+            with urllib.request.urlopen(url, timeout=timeout) as respuesta:
+                datos = respuesta.read()
+        except OSError as exc:
+            logger.warning("No se pudo descargar %s: %s", url, exc)
+            fallidos.append(nombre)
+            continue
+        with open(ruta, "wb") as archivo:
+            archivo.write(datos)
+    return fallidos
+
+
+def _fuentes(origen):
+    for carpeta, subcarpetas, archivos in os.walk(origen):
+        relativa = os.path.relpath(carpeta, origen)
+        if relativa.split(os.sep)[0] in _IGNORAR:
+            subcarpetas[:] = []
+            continue
+        for archivo in archivos:
+            nombre = os.path.normpath(os.path.join(relativa, archivo))
+            yield nombre.replace(os.sep, "/")
+
+
+def _huella(datos):
+    return hashlib.sha256(datos).hexdigest()[:12]
+
+
+def _nombre_hash(nombre, datos, sufijo=""):
+    base, ext = posixpath.splitext(nombre)
+    return f"{base}{sufijo}.{_huella(datos)}{ext}"
+
+
+def _escribir(destino, nombre, datos):
+    ruta = os.path.join(destino, nombre)
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    with open(ruta, "wb") as archivo:
+        archivo.write(datos)
+    if posixpath.splitext(nombre)[1] in COMPRIMIBLES and len(datos) >= MIN_COMPRIMIR:
+        with open(ruta + ".gz", "wb") as archivo:
+            archivo.write(gzip.compress(datos, compresslevel=9, mtime=0))
+        if brotli is not None:
+            with open(ruta + ".br", "wb") as archivo:
+                archivo.write(brotli.compress(datos, quality=11))
+
+
+def _formatos_imagen():
+    if Image is None:
+        return {}
+    formatos = {}
+    if features.check("webp"):
+        formatos["image/webp"] = ("WEBP", ".webp", {"quality": 80, "method": 6})
+    if features.check("avif"):
+        formatos["image/avif"] = ("AVIF", ".avif", {"quality": 60})
+    return formatos
+
+
+def _variantes_imagen(origen, destino, nombre, formatos):
+    """Genera las variantes WebP/AVIF de una imagen en los anchos de ANCHOS."""
+    import io
+
+    with Image.open(os.path.join(origen, nombre)) as imagen:
+        imagen.load()
+        ancho, alto = imagen.size
+        anchos = sorted({a for a in ANCHOS if a < ancho} | {ancho})
+        variantes = {"ancho": ancho, "alto": alto}
+        for tipo, (formato, ext, opciones) in formatos.items():
+            lista = []
+            for objetivo in anchos:
+                copia = imagen
+                if objetivo != ancho:
+                    copia = imagen.resize(
+                        (objetivo, round(alto * objetivo / ancho)), Image.LANCZOS
+                    )
+                if copia.mode not in ("RGB", "RGBA"):
+                    copia = copia.convert("RGBA")
+                buffer = io.BytesIO()
+                copia.save(buffer, formato, **opciones)
+                datos = buffer.getvalue()
+                base = posixpath.splitext(nombre)[0]
+                hashed = _nombre_hash(base + ext, datos, sufijo=f".{objetivo}")
+                _escribir(destino, hashed, datos)
+                lista.append([hashed, objetivo])
+            variantes[tipo] = lista
+    return variantes
+
+
+def _reescribir_css(nombre, texto, archivos, imagenes):
+    carpeta = posixpath.dirname(nombre)
+
+    def resolver(url):
+        if re.match(r"^(?:[a-z]+:|//|#|data:)", url, re.I):
+            return None
+        ruta = url.split("?")[0].split("#")[0]
+        logico = posixpath.normpath(posixpath.join(carpeta, ruta))
+        return logico if logico in archivos else None
+
+    def relativa(destino_logico):
+        return posixpath.relpath(destino_logico, carpeta or ".")
+
+    def fondo(coincidencia):
+        declaracion = coincidencia.group(1)
+        logico = resolver(coincidencia.group(3))
+        if logico is None or logico not in imagenes:
+            return declaracion
+        candidatos = [
+            f'url("{relativa(lista[-1][0])}") type("{tipo}")'
+            for tipo, lista in imagenes[logico].items()
+            if tipo.startswith("image/") and lista
+        ]
+        if not candidatos:
+            return declaracion
+        candidatos.append(
+            f'url("{relativa(archivos[logico])}") type("{_tipo_mime(logico)}")'
+        )
+        # Navegadores sin image-set() conservan la declaración original
+        return f"{declaracion} background-image: image-set({', '.join(candidatos)});"
+
+    def url(coincidencia):
+        comillas, original = coincidencia.group(1), coincidencia.group(2)
+        logico = resolver(original)
+        if logico is None:
+            return coincidencia.group(0)
+        sufijo = original[len(original.split("?")[0].split("#")[0]):]
+        # Las consultas de versión (?v=...) sobran con el hash en el nombre
+        sufijo = sufijo[sufijo.index("#"):] if "#" in sufijo else ""
+        return f"url({comillas}{relativa(archivos[logico])}{sufijo}{comillas})"
+
+    texto = _FONDO_CSS.sub(fondo, texto)
+    return _URL_CSS.sub(url, texto)
+
+
+def _tipo_mime(nombre):
+    import mimetypes
+
+    return mimetypes.guess_type(nombre)[0] or "application/octet-stream"
+
+
+def construir(origen=STATIC, destino=DIST, descargar=True):
+    """Genera ``destino`` con los archivos versionados y ``manifest.json``."""
+    if descargar:
+        descargar_vendor(origen)
+    if os.path.isdir(destino):
+        shutil.rmtree(destino)
+    os.makedirs(destino)
+
+    nombres = sorted(_fuentes(origen))
+    archivos = {}
+    imagenes = {}
+    formatos = _formatos_imagen()
+
+    # Primero lo que no es CSS, para conocer los nombres con hash que las
+    # hojas de estilo referencian.
+    hojas = [n for n in nombres if n.endswith(".css")]
+    for nombre in nombres:
+        if nombre in hojas:
+            continue
+        with open(os.path.join(origen, nombre), "rb") as archivo:
+            datos = archivo.read()
+        hashed = _nombre_hash(nombre, datos)
+        _escribir(destino, hashed, datos)
+        archivos[nombre] = hashed
+        if formatos and posixpath.splitext(nombre)[1].lower() in IMAGENES:
+            imagenes[nombre] = _variantes_imagen(origen, destino, nombre, formatos)
+
+    # Las hojas que importan otras hojas locales necesitarían un orden
+    # topológico; las de este proyecto solo referencian fuentes e imágenes.
+    for nombre in hojas:
+        with open(os.path.join(origen, nombre), encoding="utf-8") as archivo:
+            texto = _reescribir_css(nombre, archivo.read(), archivos, imagenes)
+        datos = texto.encode("utf-8")
+        hashed = _nombre_hash(nombre, datos)
+        _escribir(destino, hashed, datos)
+        archivos[nombre] = hashed
+
+    manifest = {"archivos": archivos, "imagenes": imagenes}
+    with open(os.path.join(destino, "manifest.json"), "w", encoding="utf-8") as archivo:
+        json.dump(manifest, archivo, indent=2, sort_keys=True)
+    return manifest
+
+
+# ==============================
+# Uso desde la aplicación
+# ==============================
+
+
+class Manifest:
+    """Manifest cargado en memoria; se relee si el archivo cambia."""
+
+    def __init__(self, ruta=MANIFEST):
+        self.ruta = ruta
+        self._mtime = None
+        self._datos = {"archivos": {}, "imagenes": {}}
+
+    def datos(self):
+        try:
+            mtime = os.stat(self.ruta).st_mtime
+        except OSError:
+            return self._datos
+        if mtime != self._mtime:
+            with open(self.ruta, encoding="utf-8") as archivo:
+                self._datos = json.load(archivo)
+            self._mtime = mtime
+        return self._datos
+
+
+def registrar(app, manifest=None, prefijo="/assets"):
+    """Agrega la ruta ``asset`` y los helpers ``asset_url``/``asset_srcset``."""
+    from flask import abort, request, send_from_directory, url_for
+    from werkzeug.security import safe_join
+
+    manifest = manifest or Manifest()
+    directorio = os.path.dirname(manifest.ruta)
+
+    def asset_url(nombre):
+        hashed = manifest.datos()["archivos"].get(nombre)
+        if hashed:
+            return url_for("asset", archivo=hashed)
+        if nombre in VENDOR and not os.path.exists(os.path.join(STATIC, nombre)):
+            return VENDOR[nombre]
+        return url_for("static", filename=nombre)
+
+    def asset_srcset(nombre, tipo):
+        variantes = manifest.datos()["imagenes"].get(nombre, {}).get(tipo, [])
+        return ", ".join(
+            f"{url_for('asset', archivo=hashed)} {ancho}w" for hashed, ancho in variantes
+        )
+
+    def servir_asset(archivo):
+        if safe_join(directorio, archivo) is None:
+            abort(404)
+        codificacion = None
+        aceptadas = request.accept_encodings
+        for candidata, ext in (("br", ".br"), ("gzip", ".gz")):
+            ruta = safe_join(directorio, archivo + ext)
+            if aceptadas[candidata] and ruta is not None and os.path.isfile(ruta):
+                codificacion = candidata
+                archivo_servido = archivo + ext
+                break
+        else:
+            archivo_servido = archivo
+
+        respuesta = send_from_directory(
+            directorio, archivo_servido, mimetype=_tipo_mime(archivo), max_age=31536000
+        )
+        respuesta.cache_control.public = True
+        respuesta.cache_control.immutable = True
+        respuesta.vary.add("Accept-Encoding")
+        if codificacion:
+            respuesta.headers["Content-Encoding"] = codificacion
+        return respuesta
+
+    app.add_url_rule(f"{prefijo}/<path:archivo>", "asset", servir_asset)
+    app.add_template_global(asset_url, "asset_url")
+    app.add_template_global(asset_srcset, "asset_srcset")
+    return asset_url
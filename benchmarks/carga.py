@@ -0,0 +1,503 @@
+"""Benchmark de carga del flujo de evaluación y del panel de administración.
+
+Simula evaluadores concurrentes que recorren ``/formulario_redirect`` →
+``/formulario/<id>`` → ``/guardar_respuesta`` y administradores que consultan
+``/admin`` y ``/admin/ranking`` y ponderan respuestas con ``/admin/ponderar``.
+Por endpoint informa el throughput, las latencias p50/p95/p99, las consultas
+SQL por petición y los milisegundos por consulta (leídos del encabezado
+``Server-Timing``), y guarda el
+resultado en JSON para comparar dos commits.
+
+Uso::
+
+    # En proceso, con el cliente de pruebas de Flask y SQLite
+    python benchmarks/carga.py --evaluadores 20 --iteraciones 10 --salida base.json
+
+    # Contra un gunicorn local lanzado por el propio benchmark
+    python benchmarks/carga.py --gunicorn --workers 4 --salida gunicorn.json
+
+    # Contra un servidor ya en marcha
+    python benchmarks/carga.py --url http://127.0.0.1:8000 --admin-password secreto
+
+    # Sentencias preparadas: el mismo servidor con MySQL, arrancado con
+    # DB_PREPARADAS=0 y luego con DB_PREPARADAS=1
+    python benchmarks/carga.py --url http://127.0.0.1:8000 --admin-password secreto \
+        --salida texto.json
+    python benchmarks/carga.py --url http://127.0.0.1:8000 --admin-password secreto \
+        --preparadas --salida preparadas.json
+
+    # Comparar dos ejecuciones
+    python benchmarks/carga.py --comparar base.json nuevo.json
+
+Salvo con ``--url``, la base es un archivo SQLite temporal (``DB_BACKEND=sqlite``)
+creado a partir de ``database/modelo.sql``.
+"""
+
+import argparse
+import http.cookiejar
+import json
+import math
+import os
+import random
+import re
+import secrets
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+FACTORES = range(1, 11)
+_CONSULTAS = re.compile(r'db;[^,]*desc="(\d+) queries"')
+_DURACION_DB = re.compile(r"db;dur=([\d.]+)")
+_FORMULARIO_ID = re.compile(r'name="formulario_id" value="(\d+)"')
+_RESPUESTA_ID = re.compile(r"/admin/respuesta/(\d+)")
+
+
+# ==============================
+# Registro de resultados
+# ==============================
+
+
+def percentil(valores, p):
+    """Percentil ``p`` (0-100) por rango más cercano de una lista ordenada."""
+    if not valores:
+        return None
+    indice = max(0, math.ceil(p / 100 * len(valores)) - 1)
+    return valores[indice]
+
+
+class Registro:
+    """Acumula las mediciones de todos los hilos."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._medidas = {}
+
+    def anotar(self, endpoint, duracion, status, consultas, sql_ms=None):
+        with self._lock:
+            self._medidas.setdefault(endpoint, []).append(
+                (duracion, status, consultas, sql_ms)
+            )
+
+    def resumen(self, duracion_total):
+        endpoints = {}
+        total = 0
+        with self._lock:
+            medidas = {k: list(v) for k, v in self._medidas.items()}
+        for endpoint, datos in sorted(medidas.items()):
+            tiempos = sorted(d[0] * 1000 for d in datos)
+            consultas = [d[2] for d in datos if d[2] is not None]
+            con_sql = [(d[2], d[3]) for d in datos if d[2] and d[3] is not None]
+            consultas_sql = sum(n for n, _ in con_sql)
+            total += len(datos)
+            endpoints[endpoint] = {
+                "peticiones": len(datos),
+                "errores": sum(1 for d in datos if d[1] >= 400),
+                "rps": round(len(datos) / duracion_total, 2),
+                "media_ms": round(sum(tiempos) / len(tiempos), 3),
+                "p50_ms": round(percentil(tiempos, 50), 3),
+                "p95_ms": round(percentil(tiempos, 95), 3),
+                "p99_ms": round(percentil(tiempos, 99), 3),
+                "consultas_por_peticion": (
+                    round(sum(consultas) / len(consultas), 2) if consultas else None
+                ),
+                "sql_ms_por_consulta": (
+                    round(sum(ms for _, ms in con_sql) / consultas_sql, 4)
+                    if consultas_sql else None
+                ),
+            }
+        return {
+            "duracion_s": round(duracion_total, 3),
+            "peticiones": total,
+            "rps": round(total / duracion_total, 2),
+            "endpoints": endpoints,
+        }
+
+
+# ==============================
+# Clientes
+# ==============================
+
+
+def _consultas(server_timing):
+    coincidencia = _CONSULTAS.search(server_timing or "")
+    return int(coincidencia.group(1)) if coincidencia else None
+
+
+def _sql_ms(server_timing):
+    coincidencia = _DURACION_DB.search(server_timing or "")
+    return float(coincidencia.group(1)) if coincidencia else None
+
+
+class ClienteFlask:
+    """Peticiones en proceso con el cliente de pruebas de Flask."""
+
+    def __init__(self, app, admin=False):
+        self._cliente = app.test_client()
+        if admin:
+            with self._cliente.session_transaction() as sesion:
+                sesion["is_admin"] = True
+
+    def pedir(self, metodo, ruta, datos=None):
+        inicio = time.perf_counter()
+        respuesta = self._cliente.open(ruta, method=metodo, data=datos)
+        cuerpo = respuesta.get_data(as_text=True)
+        duracion = time.perf_counter() - inicio
+        server_timing = respuesta.headers.get("Server-Timing")
+        return (
+            respuesta.status_code,
+            cuerpo,
+            duracion,
+            _consultas(server_timing),
+            _sql_ms(server_timing),
+        )
+
+
+class _SinRedirecciones(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class ClienteHTTP:
+    """Peticiones HTTP reales con su propia sesión (cookies)."""
+
+    def __init__(self, base, admin_password=None):
+        self._base = base.rstrip("/")
+        self._abridor = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()),
+            _SinRedirecciones,
+        )
+        if admin_password is not None:
+            status, *_ = self.pedir(
+                "POST", "/admin/login", {"password": admin_password}
+            )
+            if status != 302:
+                raise SystemExit("No se pudo iniciar sesión como administrador")
+
+    def pedir(self, metodo, ruta, datos=None):
+        cuerpo = urllib.parse.urlencode(datos).encode() if datos is not None else None
+        peticion = urllib.request.Request(self._base + ruta, data=cuerpo, method=metodo)
+        inicio = time.perf_counter()
+        try:
+            with self._abridor.open(peticion, timeout=30) as respuesta:
+                status, encabezados, texto = respuesta.status, respuesta.headers, respuesta.read()
+        except urllib.error.HTTPError as error:
+            status, encabezados, texto = error.code, error.headers, error.read()
+        duracion = time.perf_counter() - inicio
+        server_timing = encabezados.get("Server-Timing")
+        return (
+            status,
+            texto.decode("utf-8", "replace"),
+            duracion,
+            _consultas(server_timing),
+            _sql_ms(server_timing),
+        )
+
+
+# ==============================
+# Escenarios
+# ==============================
+
+
+def _medir(registro, endpoint, cliente, metodo, ruta, datos=None):
+    status, cuerpo, duracion, consultas, sql_ms = cliente.pedir(metodo, ruta, datos)
+    registro.anotar(endpoint, duracion, status, consultas, sql_ms)
+    return status, cuerpo
+
+
+def evaluador(cliente, usuarios, rng, registro, iteraciones):
+    for _ in range(iteraciones):
+        id_usuario = rng.choice(usuarios)
+        _medir(registro, "formulario_redirect", cliente, "POST",
+               "/formulario_redirect", {"usuario_id": id_usuario})
+        _, pagina = _medir(registro, "mostrar_formulario", cliente, "GET",
+                           f"/formulario/{id_usuario}")
+        formulario = _FORMULARIO_ID.search(pagina)
+        if not formulario:
+            continue
+        valores = list(FACTORES)
+        rng.shuffle(valores)
+        datos = {
+            "usuario_id": id_usuario,
+            "formulario_id": formulario.group(1),
+            "nombre": f"Nombre{id_usuario}",
+            "apellidos": f"Apellidos{id_usuario}",
+            "cargo": f"Cargo{id_usuario}",
+            "dependencia": f"Dependencia{id_usuario % 7}",
+        }
+        for i, (id_factor, valor) in enumerate(zip(FACTORES, valores), start=1):
+            datos[f"factor_id_{i}"] = id_factor
+            datos[f"valor_{i}"] = valor
+        _medir(registro, "guardar_respuesta", cliente, "POST", "/guardar_respuesta", datos)
+
+
+def administrador(cliente, rng, registro, iteraciones):
+    for _ in range(iteraciones):
+        _, pagina = _medir(registro, "panel_admin", cliente, "GET", "/admin")
+        _medir(registro, "vista_ranking", cliente, "GET", "/admin/ranking")
+        ids = _RESPUESTA_ID.findall(pagina)
+        if not ids:
+            continue
+        datos = {"id_respuesta": rng.choice(ids)}
+        datos.update(
+            {f"ponderacion_{i}": f"{rng.uniform(0, 10):.1f}" for i in FACTORES}
+        )
+        _medir(registro, "guardar_ponderacion", cliente, "POST", "/admin/ponderar", datos)
+
+
+def ejecutar(crear_cliente, args, usuarios):
+    """Lanza los hilos de evaluadores y administradores y resume la corrida."""
+    registro = Registro()
+    hilos = []
+    for n in range(args.evaluadores):
+        rng = random.Random(f"{args.semilla}-evaluador-{n}")
+        hilos.append(threading.Thread(
+            target=evaluador,
+            args=(crear_cliente(False), usuarios, rng, registro, args.iteraciones),
+        ))
+    for n in range(args.administradores):
+        rng = random.Random(f"{args.semilla}-admin-{n}")
+        hilos.append(threading.Thread(
+            target=administrador,
+            args=(crear_cliente(True), rng, registro, args.iteraciones),
+        ))
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return registro.resumen(time.perf_counter() - inicio)
+
+
+# ==============================
+# Entornos
+# ==============================
+
+
+def preparar_entorno(directorio, args):
+    """Variables para una base SQLite y cachés aisladas en ``directorio``."""
+    return {
+        "DB_BACKEND": "sqlite",
+        "DB_SQLITE_PATH": os.path.join(directorio, "benchmark.db"),
+        "CACHE_GENERACIONES_PATH": os.path.join(directorio, "generaciones"),
+        "SINGLEFLIGHT_DIR": directorio,
+        # SQLite no tiene sentencias preparadas en el servidor
+        "DB_PREPARADAS": "0",
+    }
+
+
+def preparar_base(entorno, args):
+    """Crea el esquema (y los datos sintéticos pedidos) antes de la carga."""
+    import datos_sinteticos
+    import db_sqlite
+
+    pool = db_sqlite.PoolSQLite(entorno["DB_SQLITE_PATH"], pool_size=1)
+    conexion = pool.get_connection()
+    try:
+        cursor = conexion.cursor(dictionary=True)
+        if args.usuarios_sinteticos:
+            datos_sinteticos.generar(
+                conexion,
+                cursor,
+                args.usuarios_sinteticos,
+                args.formularios_sinteticos,
+                semilla=args.semilla,
+            )
+        cursor.execute("SELECT DISTINCT id_usuario FROM asignacion ORDER BY id_usuario")
+        return [fila["id_usuario"] for fila in cursor.fetchall()]
+    finally:
+        conexion.close()
+
+
+def _puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _esperar_servidor(url, proceso, errores, limite=20.0):
+    """Espera a que ``url`` responda; si gunicorn termina, muestra su stderr."""
+    fin = time.monotonic() + limite
+    while time.monotonic() < fin:
+        if proceso.poll() is not None:
+            errores.seek(0)
+            raise SystemExit(
+                "gunicorn terminó antes de aceptar peticiones:\n" + errores.read()
+            )
+        try:
+            urllib.request.urlopen(url + "/", timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise SystemExit("gunicorn no respondió a tiempo")
+
+
+def correr_en_proceso(args, directorio):
+    entorno = preparar_entorno(directorio, args)
+    os.environ.update(entorno)
+    usuarios = preparar_base(entorno, args)
+    from app import app
+
+    return ejecutar(lambda admin: ClienteFlask(app, admin), args, usuarios)
+
+
+def correr_gunicorn(args, directorio):
+    from werkzeug.security import generate_password_hash
+
+    entorno = preparar_entorno(directorio, args)
+    usuarios = preparar_base(entorno, args)
+    password = secrets.token_urlsafe(12)
+    puerto = _puerto_libre()
+    metricas = os.path.join(directorio, "metricas")
+    os.makedirs(metricas, exist_ok=True)
+    entorno.update(
+        GUNICORN_BIND=f"127.0.0.1:{puerto}",
+        GUNICORN_WORKERS=str(args.workers),
+        PROMETHEUS_MULTIPROC_DIR=metricas,
+        ADMIN_PASSWORD_HASH=generate_password_hash(password),
+    )
+    # El log va a un archivo: una tubería sin leer podría llenarse y bloquear
+    # a gunicorn durante la carga
+    with open(os.path.join(directorio, "gunicorn.log"), "w+", encoding="utf-8") as errores:
+        proceso = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"],
+            cwd=RAIZ,
+            env={**os.environ, **entorno},
+            stdout=subprocess.DEVNULL,
+            stderr=errores,
+        )
+        url = f"http://127.0.0.1:{puerto}"
+        try:
+            _esperar_servidor(url, proceso, errores)
+            return ejecutar(
+                lambda admin: ClienteHTTP(url, password if admin else None), args, usuarios
+            )
+        finally:
+            proceso.terminate()
+            proceso.wait(timeout=10)
+
+
+def correr_url(args):
+    usuarios = _rango(args.usuarios)
+    return ejecutar(
+        lambda admin: ClienteHTTP(args.url, args.admin_password if admin else None),
+        args,
+        usuarios,
+    )
+
+
+def _rango(texto):
+    inicio, _, fin = texto.partition("-")
+    return list(range(int(inicio), int(fin or inicio) + 1))
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=RAIZ, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ==============================
+# Comparación
+# ==============================
+
+
+def comparar(ruta_base, ruta_nueva):
+    with open(ruta_base, encoding="utf-8") as archivo:
+        base = json.load(archivo)
+    with open(ruta_nueva, encoding="utf-8") as archivo:
+        nueva = json.load(archivo)
+    print(f"{'endpoint':<22}{'métrica':<24}{'base':>10}{'nuevo':>10}{'cambio':>10}")
+    for endpoint in sorted(set(base["endpoints"]) | set(nueva["endpoints"])):
+        antes = base["endpoints"].get(endpoint, {})
+        despues = nueva["endpoints"].get(endpoint, {})
+        for metrica in ("rps", "p50_ms", "p95_ms", "p99_ms", "consultas_por_peticion",
+                        "sql_ms_por_consulta"):
+            a, b = antes.get(metrica), despues.get(metrica)
+            cambio = f"{(b - a) / a * 100:+.1f}%" if a and b is not None else "-"
+            print(f"{endpoint:<22}{metrica:<24}{a if a is not None else '-':>10}"
+                  f"{b if b is not None else '-':>10}{cambio:>10}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    modo = parser.add_mutually_exclusive_group()
+    modo.add_argument("--gunicorn", action="store_true",
+                      help="Lanza un gunicorn local en lugar de usar el cliente de Flask")
+    modo.add_argument("--url", help="Servidor ya en marcha (no se prepara la base)")
+    modo.add_argument("--comparar", nargs=2, metavar=("BASE", "NUEVO"),
+                      help="Compara dos resultados JSON")
+    parser.add_argument("--evaluadores", type=int, default=10)
+    parser.add_argument("--administradores", type=int, default=2)
+    parser.add_argument("--iteraciones", type=int, default=5,
+                      help="Flujos completos por hilo")
+    parser.add_argument("--workers", type=int, default=2, help="Workers de gunicorn")
+    parser.add_argument("--usuarios", default="1-54",
+                        help="Rango de usuarios con formulario asignado (con --url)")
+    parser.add_argument("--admin-password", help="Contraseña del administrador (con --url)")
+    parser.add_argument("--usuarios-sinteticos", type=int, default=0,
+                        help="Usuarios sintéticos a generar antes de la carga")
+    parser.add_argument("--formularios-sinteticos", type=int, default=100,
+                        help="Formularios sintéticos (con --usuarios-sinteticos)")
+    parser.add_argument("--preparadas", action="store_true",
+                        help="Marca el resultado como medido contra un servidor con "
+                             "DB_PREPARADAS=1 (requiere --url)")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--salida", help="Archivo JSON de resultados")
+    args = parser.parse_args(argv)
+
+    if args.comparar:
+        comparar(*args.comparar)
+        return
+    if args.preparadas and not args.url:
+        # La base local es SQLite, que ignora prepared=True: ambos modos
+        # ejecutarían exactamente lo mismo
+        parser.error("--preparadas requiere --url contra un servidor con MySQL")
+
+    if args.url:
+        modo_nombre = "url"
+        resumen = correr_url(args)
+    else:
+        modo_nombre = "gunicorn" if args.gunicorn else "en_proceso"
+        with tempfile.TemporaryDirectory(prefix="form_mc_bench_") as directorio:
+            correr = correr_gunicorn if args.gunicorn else correr_en_proceso
+            resumen = correr(args, directorio)
+
+    resultado = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit(),
+        "modo": modo_nombre,
+        "parametros": {
+            "evaluadores": args.evaluadores,
+            "administradores": args.administradores,
+            "iteraciones": args.iteraciones,
+            "workers": args.workers if args.gunicorn else None,
+            "usuarios_sinteticos": args.usuarios_sinteticos,
+            "formularios_sinteticos": args.formularios_sinteticos,
+            "semilla": args.semilla,
+            "preparadas": args.preparadas,
+        },
+        **resumen,
+    }
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            archivo.write(texto + "\n")
+    print(texto)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""Compresión gzip/brotli de las respuestas dinámicas.
+
+:class:`Compresion` es un middleware WSGI. Elige la codificación a partir de
+``Accept-Encoding`` (brotli si el cliente lo acepta y el módulo está instalado,
+si no gzip) y solo comprime los tipos de :data:`TIPOS_COMPRIMIBLES`. Las
+respuestas que ya traen ``Content-Encoding`` (los archivos precomprimidos de
+``/assets``) pasan sin tocar.
+
+El cuerpo se comprime a medida que se produce: cada fragmento del iterable se
+comprime y se vacía con un *sync flush*, así que las descargas en streaming
+(la exportación CSV) siguen llegando por partes. Cuando la respuesta no declara
+``Content-Length`` se retienen los primeros fragmentos hasta reunir
+:data:`MINIMO` bytes; si el cuerpo termina antes, se envía sin comprimir.
+
+Los encabezados de caché (``no-store`` en ``/admin``) se conservan; se agrega
+``Vary: Accept-Encoding`` y el ``ETag`` pasa a débil, porque los bytes enviados
+ya no son los que lo generaron.
+"""
+
+import zlib
+
+from werkzeug.http import parse_accept_header
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depende del entorno
+    brotli = None
+
+MINIMO = 500
+NIVEL_GZIP = 6
+CALIDAD_BROTLI = 4
+TIPOS_COMPRIMIBLES = frozenset({
+    "text/html",
+    "text/css",
+    "text/csv",
+    "text/plain",
+    "text/javascript",
+    "application/javascript",
+    "application/json",
+    "application/xml",
+    "image/svg+xml",
+})
+_SIN_CUERPO = ("1", "204", "304")
+
+
+def elegir_codificacion(accept_encoding):
+    """Devuelve ``"br"``, ``"gzip"`` o ``None`` según ``Accept-Encoding``."""
+    aceptadas = parse_accept_header(accept_encoding or "")
+    if brotli is not None and aceptadas["br"]:
+        return "br"
+    if aceptadas["gzip"]:
+        return "gzip"
+    return None
+
+
+class _Compresor:
+    def __init__(self, codificacion, nivel_gzip, calidad_brotli):
+        if codificacion == "br":
+            self._br = brotli.Compressor(quality=calidad_brotli)
+            self._gzip = None
+        else:
+            self._br = None
+            self._gzip = zlib.compressobj(nivel_gzip, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def comprimir(self, datos):
+        if self._br is not None:
+            return self._br.process(datos) + self._br.flush()
+        return self._gzip.compress(datos) + self._gzip.flush(zlib.Z_SYNC_FLUSH)
+
+    def terminar(self):
+        if self._br is not None:
+            return self._br.finish()
+        return self._gzip.flush(zlib.Z_FINISH)
+
+
+def _encabezado(encabezados, nombre):
+    nombre = nombre.lower()
+    for clave, valor in encabezados:
+        if clave.lower() == nombre:
+            return valor
+    return None
+
+
+def _sin(encabezados, *nombres):
+    nombres = {n.lower() for n in nombres}
+    return [(c, v) for c, v in encabezados if c.lower() not in nombres]
+
+
+def _con_vary(encabezados):
+    vary = _encabezado(encabezados, "Vary")
+    if vary is None:
+        return encabezados + [("Vary", "Accept-Encoding")]
+    valores = {v.strip().lower() for v in vary.split(",")}
+    if "accept-encoding" in valores or "*" in valores:
+        return encabezados
+    return _sin(encabezados, "Vary") + [("Vary", f"{vary}, Accept-Encoding")]
+
+
+class _Cuerpo:
+    """Iterable de respuesta que decide si comprime al ver los primeros bytes."""
+
+    def __init__(self, middleware, iterable, start_response, estado, encabezados,
+                 codificacion):
+        self._m = middleware
+        self._iterable = iterable
+        self._start_response = start_response
+        self._estado = estado
+        self._encabezados = encabezados
+        self._codificacion = codificacion
+
+    def __iter__(self):
+        fragmentos = iter(self._iterable)
+        retenidos = []
+        tamano = 0
+        for fragmento in fragmentos:
+            retenidos.append(fragmento)
+            tamano += len(fragmento)
+            if tamano >= self._m.minimo:
+                break
+        else:
+            # El cuerpo completo no llega al mínimo: se envía tal cual
+            cuerpo = b"".join(retenidos)
+            encabezados = _sin(self._encabezados, "Content-Length")
+            self._start_response(
+                self._estado, encabezados + [("Content-Length", str(len(cuerpo)))]
+            )
+            if cuerpo:
+                yield cuerpo
+            return
+
+        encabezados = _sin(self._encabezados, "Content-Length", "ETag")
+        etag = _encabezado(self._encabezados, "ETag")
+        if etag is not None:
+            encabezados.append(("ETag", etag if etag.startswith("W/") else "W/" + etag))
+        encabezados.append(("Content-Encoding", self._codificacion))
+        self._start_response(self._estado, encabezados)
+
+        compresor = _Compresor(self._codificacion, self._m.nivel_gzip, self._m.calidad_brotli)
+        datos = compresor.comprimir(b"".join(retenidos))
+        if datos:
+            yield datos
+        for fragmento in fragmentos:
+            if fragmento:
+                datos = compresor.comprimir(fragmento)
+                if datos:
+                    yield datos
+        yield compresor.terminar()
+
+    def close(self):
+        cerrar = getattr(self._iterable, "close", None)
+        if cerrar is not None:
+            cerrar()
+
+
+class Compresion:
+    """Middleware WSGI que comprime las respuestas con gzip o brotli.
+
+    ``minimo`` es el tamaño en bytes a partir del cual vale la pena comprimir y
+    ``tipos`` los tipos MIME admitidos (sin parámetros como ``charset``).
+    """
+
+    def __init__(self, app, minimo=MINIMO, tipos=TIPOS_COMPRIMIBLES,
+                 nivel_gzip=NIVEL_GZIP, calidad_brotli=CALIDAD_BROTLI):
+        self.app = app
+        self.minimo = minimo
+        self.tipos = frozenset(tipos)
+        self.nivel_gzip = nivel_gzip
+        self.calidad_brotli = calidad_brotli
+
+    def _comprimible(self, estado, encabezados):
+        if estado.split(" ", 1)[0].startswith(_SIN_CUERPO):
+            return False
+        tipo = (_encabezado(encabezados, "Content-Type") or "").split(";")[0]
+        return (
+            tipo.strip().lower() in self.tipos
+            and _encabezado(encabezados, "Content-Encoding") is None
+            and _encabezado(encabezados, "Content-Range") is None
+            and "no-transform" not in (_encabezado(encabezados, "Cache-Control") or "").lower()
+        )
+
+    def __call__(self, environ, start_response):
+        codificacion = elegir_codificacion(environ.get("HTTP_ACCEPT_ENCODING"))
+        if environ.get("REQUEST_METHOD") == "HEAD":
+            codificacion = None
+        capturado = {}
+
+        def escribir(datos):
+            raise RuntimeError("Compresion no admite el callable write() de WSGI")
+
+        def iniciar(estado, encabezados, exc_info=None):
+            if exc_info is not None:
+                capturado.clear()
+                return start_response(estado, encabezados, exc_info)
+            capturado["estado"] = estado
+            capturado["encabezados"] = list(encabezados)
+            return escribir
+
+        # Flask llama a start_response antes de devolver el cuerpo
+        iterable = self.app(environ, iniciar)
+        if "estado" not in capturado:
+            return iterable
+
+        estado, encabezados = capturado["estado"], capturado["encabezados"]
+        if not self._comprimible(estado, encabezados):
+            start_response(estado, encabezados)
+            return iterable
+
+        # Aunque este cliente no reciba la versión comprimida, otro sí podría
+        encabezados = _con_vary(encabezados)
+        longitud = _encabezado(encabezados, "Content-Length")
+        if codificacion is None or (
+            longitud is not None and longitud.isdigit() and int(longitud) < self.minimo
+        ):
+            start_response(estado, encabezados)
+            return iterable
+        return _Cuerpo(self, iterable, start_response, estado, encabezados, codificacion)
@@ -0,0 +1,17 @@
+-- Tablas resumen del ranking para bases de datos existentes.
+-- Después de aplicarla ejecuta: flask --app app ranking-resumen --reconstruir
+USE sistema_formularios;
+
+CREATE TABLE IF NOT EXISTS ranking_factor (
+    id_factor INT PRIMARY KEY,
+    total DOUBLE NOT NULL DEFAULT 0,
+    respuestas INT NOT NULL DEFAULT 0,
+    FOREIGN KEY (id_factor) REFERENCES factor(id)
+);
+
+CREATE TABLE IF NOT EXISTS respuesta_estado (
+    id_respuesta INT PRIMARY KEY,
+    ponderaciones INT NOT NULL DEFAULT 0,
+    FOREIGN KEY (id_respuesta) REFERENCES respuesta(id) ON DELETE CASCADE,
+    INDEX idx_respuesta_estado_ponderaciones (ponderaciones)
+);
@@ -0,0 +1,5 @@
+-- Índice para la paginación por cursor del panel de administración.
+USE sistema_formularios;
+
+CREATE INDEX idx_respuesta_fecha_id
+    ON respuesta (fecha_respuesta, id);
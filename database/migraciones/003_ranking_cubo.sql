@@ -0,0 +1,19 @@
+-- Desglose del ranking por dependencia, cargo y formulario.
+-- Después de aplicarla ejecuta: flask --app app ranking-resumen --reconstruir
+USE sistema_formularios;
+
+ALTER TABLE respuesta_estado
+    ADD COLUMN dependencia VARCHAR(100) NOT NULL DEFAULT '',
+    ADD COLUMN cargo VARCHAR(100) NOT NULL DEFAULT '';
+
+CREATE TABLE IF NOT EXISTS ranking_cubo (
+    dependencia VARCHAR(100) NOT NULL,
+    cargo VARCHAR(100) NOT NULL,
+    id_formulario INT NOT NULL,
+    id_factor INT NOT NULL,
+    total DOUBLE NOT NULL DEFAULT 0,
+    respuestas INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (dependencia, cargo, id_formulario, id_factor),
+    INDEX idx_ranking_cubo_cargo (cargo),
+    INDEX idx_ranking_cubo_formulario (id_formulario)
+);
@@ -0,0 +1,16 @@
+-- Plantillas de la vista de ponderación masiva (/admin/ponderaciones).
+USE sistema_formularios;
+
+CREATE TABLE IF NOT EXISTS plantilla_ponderacion (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    nombre VARCHAR(100) NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS plantilla_peso (
+    id_plantilla INT NOT NULL,
+    id_factor INT NOT NULL,
+    peso FLOAT NOT NULL,
+    PRIMARY KEY (id_plantilla, id_factor),
+    FOREIGN KEY (id_plantilla) REFERENCES plantilla_ponderacion(id) ON DELETE CASCADE,
+    FOREIGN KEY (id_factor) REFERENCES factor(id)
+);
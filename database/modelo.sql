@@ -49,6 +49,10 @@ CREATE TABLE respuesta (
 CREATE INDEX idx_respuesta_formulario
     ON respuesta (id_formulario);
 
+-- Índice para paginar el panel por (fecha_respuesta, id) sin filesort
+CREATE INDEX idx_respuesta_fecha_id
+    ON respuesta (fecha_respuesta, id);
+
 -- Detalle de las respuestas por factor (valor de 1 a 10, sin repetir por respuesta)
 CREATE TABLE respuesta_detalle (
     id INT AUTO_INCREMENT PRIMARY KEY,
@@ -80,6 +84,64 @@ CREATE TABLE ponderacion_admin (
 CREATE INDEX idx_ponderacion_admin_respuesta
     ON ponderacion_admin (id_respuesta);
 
+-- Resumen incremental del ranking: suma ponderada por factor de las respuestas
+-- con las 10 ponderaciones completas
+CREATE TABLE ranking_factor (
+    id_factor INT PRIMARY KEY,
+    total DOUBLE NOT NULL DEFAULT 0,
+    respuestas INT NOT NULL DEFAULT 0,
+    FOREIGN KEY (id_factor) REFERENCES factor(id)
+);
+
+-- Número de factores ponderados por respuesta (10 = completa) y la dependencia
+-- y el cargo del usuario al guardarla, que ubican la respuesta en ranking_cubo
+CREATE TABLE respuesta_estado (
+    id_respuesta INT PRIMARY KEY,
+    ponderaciones INT NOT NULL DEFAULT 0,
+    dependencia VARCHAR(100) NOT NULL DEFAULT '',
+    cargo VARCHAR(100) NOT NULL DEFAULT '',
+    FOREIGN KEY (id_respuesta) REFERENCES respuesta(id) ON DELETE CASCADE
+);
+
+-- Ranking desglosado por dependencia, cargo y formulario: la misma suma que
+-- ranking_factor, por celda
+CREATE TABLE ranking_cubo (
+    dependencia VARCHAR(100) NOT NULL,
+    cargo VARCHAR(100) NOT NULL,
+    id_formulario INT NOT NULL,
+    id_factor INT NOT NULL,
+    total DOUBLE NOT NULL DEFAULT 0,
+    respuestas INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (dependencia, cargo, id_formulario, id_factor)
+);
+
+-- Índices para filtrar el cubo por cargo o por formulario
+CREATE INDEX idx_ranking_cubo_cargo
+    ON ranking_cubo (cargo);
+
+CREATE INDEX idx_ranking_cubo_formulario
+    ON ranking_cubo (id_formulario);
+
+-- Índice para listar rápidamente las respuestas incompletas
+CREATE INDEX idx_respuesta_estado_ponderaciones
+    ON respuesta_estado (ponderaciones);
+
+-- Plantillas de ponderación: un peso por factor que la vista de ponderación
+-- masiva aplica a las respuestas incompletas
+CREATE TABLE plantilla_ponderacion (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    nombre VARCHAR(100) NOT NULL UNIQUE
+);
+
+CREATE TABLE plantilla_peso (
+    id_plantilla INT NOT NULL,
+    id_factor INT NOT NULL,
+    peso FLOAT NOT NULL,
+    PRIMARY KEY (id_plantilla, id_factor),
+    FOREIGN KEY (id_plantilla) REFERENCES plantilla_ponderacion(id) ON DELETE CASCADE,
+    FOREIGN KEY (id_factor) REFERENCES factor(id)
+);
+
 -- Insertar los 54 formularios
 INSERT INTO formulario (nombre)
 SELECT CONCAT('Formulario ', LPAD(n, 2, '0'))
@@ -102,6 +164,10 @@ INSERT INTO factor (nombre, descripcion) VALUES
 ('Factor 9', 'Descripción del factor 9'),
 ('Factor 10', 'Descripción del factor 10');
 
+-- Una fila de resumen por factor
+INSERT INTO ranking_factor (id_factor)
+SELECT id FROM factor;
+
 
 INSERT INTO usuario (id, nombre, apellidos, cargo, dependencia) VALUES
 (1, 'Nombre1', 'Apellidos1', 'Cargo1', 'Dependencia1'),
@@ -0,0 +1,157 @@
+"""Generación de datos sintéticos para pruebas de escala.
+
+Crea usuarios, formularios, asignaciones, respuestas (10 valores distintos del
+1 al 10 por respuesta) y ponderaciones completas con una semilla fija, de modo
+que dos ejecuciones con los mismos parámetros producen la misma base. Los ids
+se asignan a partir del máximo existente y las filas se insertan por bloques de
+usuarios con ``executemany`` (que ``mysql.connector`` convierte en un ``INSERT``
+de varias filas), confirmando cada bloque. Al final se reconstruyen las tablas
+resumen del ranking.
+"""
+
+import random
+from datetime import datetime, timedelta
+
+import ranking
+
+TAM_LOTE = 5000
+USUARIOS_POR_BLOQUE = 2000
+FECHA_BASE = datetime(2025, 1, 1)
+DIAS = 365
+
+CARGOS = ("Analista", "Coordinador", "Director", "Jefe de área", "Subdirector")
+DEPENDENCIAS = tuple(f"Dependencia {n:02d}" for n in range(1, 21))
+
+
+class ParametrosInvalidos(ValueError):
+    """Los parámetros de generación están fuera de rango."""
+
+
+def _maximo(cursor, tabla):
+    cursor.execute(f"SELECT COALESCE(MAX(id), 0) AS maximo FROM {tabla}")
+    return cursor.fetchone()["maximo"]
+
+
+def _insertar(cursor, sql, filas):
+    for inicio in range(0, len(filas), TAM_LOTE):
+        cursor.executemany(sql, filas[inicio:inicio + TAM_LOTE])
+
+
+def generar(conn, cursor, usuarios, formularios, densidad=0.05, completadas=0.8,
+            ponderadas=0.5, semilla=0, progreso=None):
+    """Inserta el conjunto de datos y devuelve cuántas filas creó por tabla.
+
+    ``densidad`` es la fracción de los formularios nuevos asignada a cada
+    usuario (al menos uno), ``completadas`` la probabilidad de que una
+    asignación tenga respuesta y ``ponderadas`` la de que una respuesta tenga
+    sus 10 ponderaciones. ``progreso(totales)`` se llama tras cada bloque.
+    """
+    if usuarios < 1 or formularios < 1:
+        raise ParametrosInvalidos("Se necesita al menos un usuario y un formulario")
+    for nombre, valor in (
+        ("densidad", densidad), ("completadas", completadas), ("ponderadas", ponderadas)
+    ):
+        if not 0 <= valor <= 1:
+            raise ParametrosInvalidos(f"{nombre} debe estar entre 0 y 1")
+
+    rng = random.Random(semilla)
+    cursor.execute("SELECT id FROM factor ORDER BY id")
+    factores = [fila["id"] for fila in cursor.fetchall()]
+    if len(factores) != ranking.FACTORES_POR_RESPUESTA:
+        raise ParametrosInvalidos(
+            f"Se esperaban {ranking.FACTORES_POR_RESPUESTA} factores"
+        )
+
+    primer_usuario = _maximo(cursor, "usuario") + 1
+    primer_formulario = _maximo(cursor, "formulario") + 1
+    siguiente_respuesta = _maximo(cursor, "respuesta") + 1
+
+    ids_formulario = list(range(primer_formulario, primer_formulario + formularios))
+    _insertar(
+        cursor,
+        "INSERT INTO formulario (id, nombre) VALUES (%s, %s)",
+        [(i, f"Formulario {i:02d}") for i in ids_formulario],
+    )
+    conn.commit()
+
+    por_usuario = max(1, round(densidad * formularios))
+    valores = list(range(1, ranking.FACTORES_POR_RESPUESTA + 1))
+    totales = {
+        "usuario": 0,
+        "formulario": formularios,
+        "asignacion": 0,
+        "respuesta": 0,
+        "respuesta_detalle": 0,
+        "ponderacion_admin": 0,
+    }
+
+    ultimo_usuario = primer_usuario + usuarios
+    for inicio in range(primer_usuario, ultimo_usuario, USUARIOS_POR_BLOQUE):
+        fin = min(inicio + USUARIOS_POR_BLOQUE, ultimo_usuario)
+        filas_usuario, asignaciones, respuestas, detalles, pesos = [], [], [], [], []
+        for id_usuario in range(inicio, fin):
+            filas_usuario.append((
+                id_usuario,
+                f"Nombre{id_usuario}",
+                f"Apellidos{id_usuario}",
+                rng.choice(CARGOS),
+                rng.choice(DEPENDENCIAS),
+            ))
+            for id_formulario in rng.sample(ids_formulario, por_usuario):
+                asignaciones.append((id_usuario, id_formulario))
+                if rng.random() >= completadas:
+                    continue
+                id_respuesta = siguiente_respuesta
+                siguiente_respuesta += 1
+                fecha = FECHA_BASE + timedelta(seconds=rng.randrange(DIAS * 86400))
+                respuestas.append((id_respuesta, id_usuario, id_formulario, fecha))
+                rng.shuffle(valores)
+                detalles.extend(zip([id_respuesta] * len(factores), factores, valores))
+                if rng.random() < ponderadas:
+                    pesos.extend(
+                        (id_respuesta, id_factor, rng.randint(0, 100) / 10)
+                        for id_factor in factores
+                    )
+
+        _insertar(
+            cursor,
+            "INSERT INTO usuario (id, nombre, apellidos, cargo, dependencia)"
+            " VALUES (%s, %s, %s, %s, %s)",
+            filas_usuario,
+        )
+        _insertar(
+            cursor,
+            "INSERT INTO asignacion (id_usuario, id_formulario) VALUES (%s, %s)",
+            asignaciones,
+        )
+        _insertar(
+            cursor,
+            "INSERT INTO respuesta (id, id_usuario, id_formulario, fecha_respuesta)"
+            " VALUES (%s, %s, %s, %s)",
+            respuestas,
+        )
+        _insertar(
+            cursor,
+            "INSERT INTO respuesta_detalle (id_respuesta, id_factor, valor_usuario)"
+            " VALUES (%s, %s, %s)",
+            detalles,
+        )
+        _insertar(
+            cursor,
+            "INSERT INTO ponderacion_admin (id_respuesta, id_factor, peso_admin)"
+            " VALUES (%s, %s, %s)",
+            pesos,
+        )
+        conn.commit()
+
+        totales["usuario"] += len(filas_usuario)
+        totales["asignacion"] += len(asignaciones)
+        totales["respuesta"] += len(respuestas)
+        totales["respuesta_detalle"] += len(detalles)
+        totales["ponderacion_admin"] += len(pesos)
+        if progreso is not None:
+            progreso(totales)
+
+    ranking.reconstruir(cursor)
+    conn.commit()
+    return totales
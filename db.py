@@ -1,60 +1,505 @@
+import logging
 import os
-from mysql.connector import Error, pooling
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from mysql.connector import Error, IntegrityError as MySQLIntegrityError, pooling
+from mysql.connector.errors import PoolError
+
+logger = logging.getLogger(__name__)
 
 # Pool de conexiones global. Se inicializa en :func:`init_pool`.
 _pool = None
+# Réplica de solo lectura (:class:`Replica`), si está configurada.
+_replica = None
+
+
+# Violaciones de claves únicas o foráneas en cualquiera de los backends
+ERRORES_INTEGRIDAD = (MySQLIntegrityError, sqlite3.IntegrityError)
+
+
+class PoolAgotado(PoolError):
+    """No hubo conexión libre dentro del tiempo de espera configurado."""
+
+
+class _ConexionPrestada:
+    """Conexión del pool que avisa al devolverse para llevar estadísticas."""
+
+    def __init__(self, conexion, pool):
+        self._conexion = conexion
+        self._pool = pool
+        self.preparadas = pool.preparadas
+        self.solo_lectura = pool.solo_lectura
+        self.escribio = False
+
+    def __getattr__(self, nombre):
+        return getattr(self._conexion, nombre)
+
+    def commit(self):
+        self.escribio = True
+        self._conexion.commit()
+
+    def close(self):
+        if self._pool is None:
+            return
+        pool, self._pool = self._pool, None
+        try:
+            # Sin reset_session nadie deshace una transacción a medias
+            if getattr(self._conexion, "in_transaction", False):
+                self._conexion.rollback()
+        finally:
+            try:
+                self._conexion.close()
+            finally:
+                pool._devolver()
+
+
+class PoolInstrumentado:
+    """Envuelve el pool del backend con espera acotada y estadísticas.
+
+    ``MySQLConnectionPool`` abre todas sus conexiones al crearse y en cada
+    préstamo comprueba con un ping que sigan vivas (reconectando si no); lo que
+    le falta es esperar cuando se agota, así que aquí se añade un semáforo con
+    tiempo de espera y una cola de espera acotada. ``PoolSQLite`` ofrece la
+    misma interfaz (``pool_name``, ``pool_size`` y ``get_connection``).
+    """
+
+    def __init__(self, pool, tamano, espera, max_esperando, preparadas=False,
+                 solo_lectura=False):
+        self._pool = pool
+        self.preparadas = preparadas
+        self.solo_lectura = solo_lectura
+        self.nombre = pool.pool_name
+        self.tamano = tamano
+        self.espera = espera
+        self.max_esperando = max_esperando
+        self._libres = threading.BoundedSemaphore(tamano)
+        self._lock = threading.Lock()
+        self._en_uso = 0
+        self._esperando = 0
+        self._contadores = {
+            "prestamos": 0,
+            "agotado": 0,
+            "rechazos": 0,
+            "timeouts": 0,
+            "espera_total": 0.0,
+            "espera_max": 0.0,
+        }
+
+    def _contar(self, nombre):
+        with self._lock:
+            self._contadores[nombre] += 1
+
+    def _esperar_turno(self):
+        if self._libres.acquire(blocking=False):
+            return
+        with self._lock:
+            self._contadores["agotado"] += 1
+            if self._esperando >= self.max_esperando:
+                self._contadores["rechazos"] += 1
+                raise PoolAgotado("Cola de espera del pool de conexiones llena")
+            self._esperando += 1
+        try:
+            obtenida = self._libres.acquire(timeout=self.espera)
+        finally:
+            with self._lock:
+                self._esperando -= 1
+        if not obtenida:
+            self._contar("timeouts")
+            raise PoolAgotado(
+                f"Sin conexiones libres en el pool tras {self.espera} s"
+            )
+
+    def get_connection(self):
+        inicio = time.perf_counter()
+        self._esperar_turno()
+        try:
+            conexion = self._pool.get_connection()
+        except Exception:
+            self._libres.release()
+            raise
+        espera = time.perf_counter() - inicio
+        with self._lock:
+            self._en_uso += 1
+            self._contadores["prestamos"] += 1
+            self._contadores["espera_total"] += espera
+            self._contadores["espera_max"] = max(self._contadores["espera_max"], espera)
+        return _ConexionPrestada(conexion, self)
+
+    def _devolver(self):
+        with self._lock:
+            self._en_uso -= 1
+        self._libres.release()
+
+    def estadisticas(self):
+        with self._lock:
+            datos = dict(self._contadores)
+            datos.update(
+                nombre=self.nombre,
+                tamano=self.tamano,
+                en_uso=self._en_uso,
+                libres=self.tamano - self._en_uso,
+                esperando=self._esperando,
+            )
+        prestamos = datos["prestamos"]
+        datos["espera_media"] = datos["espera_total"] / prestamos if prestamos else 0.0
+        return datos
+
+
+# ==============================
+# Sentencias preparadas
+# ==============================
+
+# Listas de marcadores cuyo largo depende de los datos: ``IN (%s, %s, ...)`` y
+# ``VALUES (...), (...)``. Cada largo sería otra sentencia en la caché.
+_LISTA_VARIABLE = re.compile(r"\bIN\s*\(\s*%s\s*,|\)\s*,\s*\(\s*%s", re.I)
+
+
+class CacheSentencias:
+    """Cursores preparados de una conexión física, uno por texto SQL.
+
+    El cursor preparado de ``mysql.connector`` guarda un solo handle y vuelve a
+    preparar cuando recibe otro objeto ``str``, así que se conserva un cursor
+    por sentencia junto con el texto exacto con el que se preparó. Al superar
+    ``maximo`` se cierra la menos usada (``COM_STMT_CLOSE``).
+    """
+
+    def __init__(self, id_conexion, maximo):
+        self.id_conexion = id_conexion
+        self.maximo = maximo
+        self._cursores = OrderedDict()
+
+    def __len__(self):
+        return len(self._cursores)
+
+    def __contains__(self, query):
+        return query in self._cursores
+
+    def obtener(self, conexion, query):
+        """Devuelve ``(texto, cursor)`` para ``query``, preparándola si hace falta."""
+        entrada = self._cursores.get(query)
+        if entrada is not None:
+            self._cursores.move_to_end(query)
+            return entrada
+        entrada = (query, conexion.cursor(prepared=True, dictionary=True))
+        self._cursores[query] = entrada
+        if len(self._cursores) > self.maximo:
+            _, (_, cursor) = self._cursores.popitem(last=False)
+            try:
+                cursor.close()
+            except (Error, sqlite3.Error):
+                logger.warning("No se pudo cerrar una sentencia preparada", exc_info=True)
+        return entrada
+
+
+def _estado_fisico(conexion):
+    """Atributos de la conexión física, que sobreviven a los préstamos del pool.
+
+    ``PooledMySQLConnection`` envuelve en ``_cnx`` la conexión que el pool
+    reutiliza; ``ConexionSQLite`` expone el suyo en ``estado``.
+    """
+    fisica = getattr(conexion, "_cnx", None)
+    if fisica is not None:
+        return vars(fisica)
+    return conexion.estado
+
+
+def cache_sentencias(conexion):
+    """:class:`CacheSentencias` de la conexión física detrás de ``conexion``.
+
+    Si la conexión se reabrió (el pool reconecta tras un ping fallido) cambia
+    su ``connection_id`` y los handles anteriores ya no existen en el servidor.
+    """
+    estado = _estado_fisico(conexion)
+    id_conexion = getattr(conexion, "connection_id", None)
+    cache = estado.get("sentencias_preparadas")
+    if cache is None or cache.id_conexion != id_conexion:
+        cache = CacheSentencias(id_conexion, _entero_env("DB_PREPARADAS_MAX", 64))
+        estado["sentencias_preparadas"] = cache
+    return cache
+
+
+class CursorPreparado:
+    """Cursor de diccionario que ejecuta con sentencias preparadas en caché.
+
+    Cada ``execute`` pasa al cursor preparado de su sentencia; las sentencias
+    con listas de largo variable usan un cursor de diccionario normal.
+    ``close`` no cierra los cursores de la caché: siguen siendo de la conexión.
+    """
+
+    def __init__(self, conexion):
+        self._conexion = conexion
+        self._cache = cache_sentencias(conexion)
+        self._texto = None
+        self._cursor = None
+
+    def __getattr__(self, nombre):
+        return getattr(self._cursor, nombre)
+
+    def _preparar(self, query):
+        if self._cursor is not None and getattr(self._conexion, "unread_result", False):
+            self._cursor.fetchall()
+        if _LISTA_VARIABLE.search(query):
+            if self._texto is None:
+                self._texto = self._conexion.cursor(dictionary=True)
+            self._cursor = self._texto
+            return query
+        query, self._cursor = self._cache.obtener(self._conexion, query)
+        return query
+
+    def execute(self, query, params=None):
+        query = self._preparar(query)
+        return self._cursor.execute(query, params)
+
+    def executemany(self, query, seq_params):
+        query = self._preparar(query)
+        return self._cursor.executemany(query, seq_params)
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount if self._cursor is not None else -1
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid if self._cursor is not None else None
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchmany(self, size=1):
+        return self._cursor.fetchmany(size)
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def close(self):
+        if self._texto is not None:
+            self._texto.close()
+        self._texto = self._cursor = None
+
+
+def cursor_diccionario(conexion):
+    """Cursor de diccionario para ``conexion``; preparado si ``DB_PREPARADAS=1``."""
+    if getattr(conexion, "preparadas", False):
+        return CursorPreparado(conexion)
+    return conexion.cursor(dictionary=True)
+
+
+def _entero_env(nombre, defecto):
+    return int(os.getenv(nombre) or defecto)
+
+
+def _preparadas():
+    return os.getenv("DB_PREPARADAS", "0") != "0"
+
+
+class Replica:
+    """Pool de la réplica de solo lectura que se aparta cuando falla.
+
+    Si abrir el pool o prestar una conexión falla, la réplica queda marcada
+    como caída durante ``reintento`` segundos y :meth:`get_connection`
+    devuelve ``None`` para que la lectura vaya al primario. Un pool agotado
+    también manda esa lectura al primario, pero no marca la réplica.
+    """
+
+    def __init__(self, crear, reintento):
+        self._crear = crear
+        self.reintento = reintento
+        self.pool = None
+        self.fallos = 0
+        self._caida_hasta = 0.0
+        self._lock = threading.Lock()
+
+    def caida(self):
+        return time.monotonic() < self._caida_hasta
+
+    def get_connection(self):
+        if self.caida():
+            return None
+        try:
+            if self.pool is None:
+                with self._lock:
+                    if self.pool is None:
+                        self.pool = self._crear()
+            return self.pool.get_connection()
+        except PoolAgotado:
+            return None
+        except (Error, sqlite3.Error) as exc:
+            with self._lock:
+                self.fallos += 1
+                self._caida_hasta = time.monotonic() + self.reintento
+            logger.warning(
+                "Réplica no disponible (%s); lecturas al primario durante %s s",
+                exc,
+                self.reintento,
+            )
+            return None
+
+
+def _pool_mysql(tamano, replica=False):
+    def variable(nombre):
+        return (replica and os.getenv("DB_REPLICA_" + nombre)) or os.getenv("DB_" + nombre)
+
+    host = os.getenv("DB_REPLICA_HOST") if replica else os.getenv("DB_HOST")
+    user = variable("USER")
+    password = variable("PASSWORD")
+    database = variable("NAME")
+
+    missing = [
+        name
+        for name, value in (
+            ("DB_HOST", host),
+            ("DB_USER", user),
+            ("DB_PASSWORD", password),
+            ("DB_NAME", database),
+        )
+        if not value
+    ]
+    if missing:
+        raise RuntimeError(
+            "Variables de entorno faltantes: " + ", ".join(missing)
+        )
+
+    return pooling.MySQLConnectionPool(
+        pool_name=_nombre_pool(replica),
+        pool_size=tamano,
+        # COM_RESET_CONNECTION libera las sentencias preparadas de la sesión
+        pool_reset_session=(
+            os.getenv("DB_POOL_RESET_SESSION", "1") != "0" and not _preparadas()
+        ),
+        host=host,
+        port=int(variable("PORT") or 3306),
+        user=user,
+        password=password,
+        database=database,
+    )
+
+
+def _pool_sqlite(tamano, replica=False):
+    import db_sqlite
+
+    ruta = os.getenv("DB_REPLICA_SQLITE_PATH") if replica else os.getenv("DB_SQLITE_PATH")
+    return db_sqlite.PoolSQLite(
+        ruta=ruta or ":memory:",
+        pool_size=tamano,
+        esquema=os.getenv("DB_SQLITE_SCHEMA") or db_sqlite.ESQUEMA_POR_DEFECTO,
+        pool_name=_nombre_pool(replica),
+        espera=float(os.getenv("DB_POOL_TIMEOUT") or 5),
+    )
+
+
+def _nombre_pool(replica):
+    nombre = os.getenv("DB_POOL_NAME") or "app_pool"
+    return nombre + "_replica" if replica else nombre
+
+
+BACKENDS = {"mysql": _pool_mysql, "sqlite": _pool_sqlite}
+# Variable que, definida, activa la réplica de cada backend
+REPLICAS = {"mysql": "DB_REPLICA_HOST", "sqlite": "DB_REPLICA_SQLITE_PATH"}
+
+
+def _crear_pool(backend, tamano, replica=False):
+    pool = BACKENDS[backend](tamano, replica=replica)
+    return PoolInstrumentado(
+        pool,
+        pool.pool_size,
+        espera=float(os.getenv("DB_POOL_TIMEOUT") or 5),
+        max_esperando=_entero_env("DB_POOL_MAX_WAITERS", 4 * tamano),
+        preparadas=_preparadas(),
+        solo_lectura=replica,
+    )
 
 
 def init_pool():
-    """Inicializa el pool de conexiones si aún no existe."""
-    global _pool
+    """Inicializa el pool de conexiones si aún no existe.
+
+    ``DB_BACKEND`` elige el motor (``mysql`` por defecto o ``sqlite``). El
+    tamaño y la espera se configuran con ``DB_POOL_SIZE``, ``DB_POOL_NAME``,
+    ``DB_POOL_TIMEOUT`` (segundos) y ``DB_POOL_MAX_WAITERS``;
+    ``DB_PREPARADAS=1`` activa las sentencias preparadas. Todas las
+    conexiones se abren aquí, por lo que conviene llamarla al arrancar cada
+    worker en lugar de esperar a la primera petición.
+
+    Con ``DB_REPLICA_HOST`` (MySQL) o ``DB_REPLICA_SQLITE_PATH`` se abre
+    también el pool de la réplica (``DB_REPLICA_POOL_SIZE`` conexiones). Si no
+    responde, la aplicación arranca igual y lo reintenta cada
+    ``DB_REPLICA_REINTENTO`` segundos.
+    """
+    global _pool, _replica
     if _pool is not None:
         return
 
     try:
-        host = os.getenv("DB_HOST")
-        user = os.getenv("DB_USER")
-        password = os.getenv("DB_PASSWORD")
-        database = os.getenv("DB_NAME")
-
-        missing = [
-            name
-            for name, value in (
-                ("DB_HOST", host),
-                ("DB_USER", user),
-                ("DB_PASSWORD", password),
-                ("DB_NAME", database),
-            )
-            if not value
-        ]
-        if missing:
+        backend = (os.getenv("DB_BACKEND") or "mysql").lower()
+        if backend not in BACKENDS:
             raise RuntimeError(
-                "Variables de entorno faltantes: " + ", ".join(missing)
+                f"DB_BACKEND desconocido: {backend} "
+                f"(opciones: {', '.join(sorted(BACKENDS))})"
             )
 
-        _pool = pooling.MySQLConnectionPool(
-            pool_name="app_pool",
-            pool_size=5,
-            host=host,
-            user=user,
-            password=password,
-            database=database,
-        )
-    except RuntimeError as exc:  # pragma: no cover - logging side effect
-        from app import app
+        tamano = _entero_env("DB_POOL_SIZE", 5)
+        if not 1 <= tamano <= pooling.CNX_POOL_MAXSIZE:
+            raise RuntimeError(
+                f"DB_POOL_SIZE debe estar entre 1 y {pooling.CNX_POOL_MAXSIZE}"
+            )
 
-        app.logger.error(str(exc))
+        _pool = _crear_pool(backend, tamano)
+        _replica = None
+        if os.getenv(REPLICAS[backend]):
+            tamano_replica = _entero_env("DB_REPLICA_POOL_SIZE", tamano)
+            _replica = Replica(
+                lambda: _crear_pool(backend, tamano_replica, replica=True),
+                reintento=float(os.getenv("DB_REPLICA_REINTENTO") or 30),
+            )
+            conexion = _replica.get_connection()
+            if conexion is not None:
+                conexion.close()
+    except RuntimeError as exc:
+        logger.error(str(exc))
         raise SystemExit(1)
-    except Error:  # pragma: no cover - logging side effect
-        from app import app
-
-        app.logger.exception("Error al inicializar el pool de conexiones")
+    except (Error, sqlite3.Error):  # pragma: no cover - logging side effect
+        logger.exception("Error al inicializar el pool de conexiones")
         raise
 
 
-def get_connection():
-    """Obtener una conexión del pool de conexiones."""
+def reiniciar_pool():
+    """Abre un pool propio en un proceso hijo creado con ``fork()``.
+
+    Un pool heredado del padre comparte sus sockets: no se cierra (las
+    conexiones enviarían ``COM_QUIT`` por el socket del padre), solo se olvida.
+    """
+    global _pool, _replica
+    _pool = _replica = None
+    init_pool()
+
+
+def get_connection(solo_lectura=False):
+    """Obtener una conexión del pool de conexiones.
+
+    Si el pool está agotado espera hasta ``DB_POOL_TIMEOUT`` segundos antes de
+    lanzar :class:`PoolAgotado`. Con ``solo_lectura=True`` la conexión sale de
+    la réplica cuando hay una disponible y del primario si no;
+    ``conexion.solo_lectura`` indica cuál se obtuvo.
+    """
     if _pool is None:
         init_pool()
+    if solo_lectura and _replica is not None:
+        conexion = _replica.get_connection()
+        if conexion is not None:
+            return conexion
     return _pool.get_connection()
 
+
+def hay_replica():
+    """Indica si hay una réplica configurada (aunque esté caída)."""
+    if _pool is None:
+        backend = (os.getenv("DB_BACKEND") or "mysql").lower()
+        return bool(os.getenv(REPLICAS.get(backend, "")))
+    return _replica is not None
+
+
+def estadisticas_pool():
+    """Estadísticas del pool del proceso actual (``None`` si no existe)."""
+    return _pool.estadisticas() if _pool is not None else None
@@ -0,0 +1,322 @@
+"""Backend SQLite para ejecutar la aplicación sin un servidor MySQL.
+
+Pensado para pruebas de extremo a extremo y benchmarks: carga una traducción de
+``database/modelo.sql`` y traduce al vuelo el dialecto MySQL que usa la
+aplicación (marcadores ``%s``, ``ON DUPLICATE KEY UPDATE``, ``INSERT IGNORE``,
+``LAST_INSERT_ID(id)``, ``FOR UPDATE``, ``DATE_FORMAT`` y la consulta de
+``AUTO_INCREMENT`` en ``information_schema``). Las conexiones imitan la
+interfaz de ``mysql.connector`` que usa la aplicación (``cursor(dictionary=True)``,
+``lastrowid``, ``rowcount``, ``fetchmany``…).
+
+Cada escritura abre la transacción con ``BEGIN IMMEDIATE``, que bloquea la base
+completa hasta el ``commit``; eso cubre lo que ``SELECT ... FOR UPDATE`` hace
+por fila en MySQL.
+"""
+
+import functools
+import os
+import queue
+import re
+import sqlite3
+from datetime import date, datetime
+from decimal import Decimal
+
+ESQUEMA_POR_DEFECTO = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "database", "modelo.sql"
+)
+
+sqlite3.register_adapter(Decimal, float)
+sqlite3.register_adapter(datetime, lambda valor: valor.isoformat(" "))
+sqlite3.register_adapter(date, lambda valor: valor.isoformat())
+sqlite3.register_converter(
+    "TIMESTAMP", lambda valor: datetime.fromisoformat(valor.decode())
+)
+
+# ==============================
+# Traducción de consultas
+# ==============================
+
+_CADENAS = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_MARCADOR = re.compile(r"%s")
+_DATE_FORMAT = re.compile(r"DATE_FORMAT\(\s*([^,()]+?)\s*,\s*'([^']*)'\s*\)", re.I)
+_FORMATOS_FECHA = {"%i": "%M", "%s": "%S", "%k": "%H", "%e": "%d", "%c": "%m"}
+_SIGUIENTE_ID = re.compile(
+    r"SELECT\s+AUTO_INCREMENT\s+AS\s+(\w+)\s+FROM\s+information_schema\.TABLES\s+"
+    r"WHERE\s+TABLE_SCHEMA\s*=\s*DATABASE\(\)\s+AND\s+TABLE_NAME\s*=\s*'(\w+)'",
+    re.I,
+)
+_INSERT_IGNORE = re.compile(r"\bINSERT\s+IGNORE\b", re.I)
+_FOR_UPDATE = re.compile(r"\s+(?:FOR\s+UPDATE|LOCK\s+IN\s+SHARE\s+MODE)\b", re.I)
+_ODKU = re.compile(r"\bON\s+DUPLICATE\s+KEY\s+UPDATE\b(.*)$", re.I | re.S)
+_VALUES = re.compile(r"\bVALUES\((\w+)\)", re.I)
+_LAST_INSERT_ID = re.compile(r"\bLAST_INSERT_ID\((\w+)\)", re.I)
+_DO_UPDATE = re.compile(r"\bON CONFLICT DO UPDATE SET\b.*(?= RETURNING \w+$)", re.S)
+
+
+def _fuera_de_cadenas(sql, funcion):
+    """Aplica ``funcion`` solo a las partes de ``sql`` fuera de literales."""
+    partes = []
+    inicio = 0
+    for literal in _CADENAS.finditer(sql):
+        partes.append(funcion(sql[inicio:literal.start()]))
+        partes.append(literal.group())
+        inicio = literal.end()
+    partes.append(funcion(sql[inicio:]))
+    return "".join(partes)
+
+
+def _date_format(coincidencia):
+    formato = re.sub(
+        r"%[a-zA-Z]",
+        lambda m: _FORMATOS_FECHA.get(m.group(), m.group()),
+        coincidencia.group(2),
+    )
+    return f"strftime('{formato}', {coincidencia.group(1)})"
+
+
+@functools.lru_cache(maxsize=512)
+def traducir(sql):
+    """Traduce una sentencia MySQL de la aplicación a SQLite.
+
+    Devuelve ``(sql, columna)``; ``columna`` no es ``None`` cuando la sentencia
+    usaba ``LAST_INSERT_ID(columna)`` y ahora la devuelve con ``RETURNING``.
+    """
+    sql = _DATE_FORMAT.sub(_date_format, sql)
+    sql = _SIGUIENTE_ID.sub(
+        r"SELECT COALESCE((SELECT seq FROM sqlite_sequence WHERE name = '\2'), 0)"
+        r" + 1 AS \1",
+        sql,
+    )
+
+    columna = None
+
+    def dialecto(texto):
+        nonlocal columna
+        texto = _MARCADOR.sub("?", texto)
+        texto = _INSERT_IGNORE.sub("INSERT OR IGNORE", texto)
+        texto = _FOR_UPDATE.sub("", texto)
+        odku = _ODKU.search(texto)
+        if odku:
+            asignaciones = _VALUES.sub(r"excluded.\1", odku.group(1).rstrip())
+            ultimo_id = _LAST_INSERT_ID.search(asignaciones)
+            if ultimo_id:
+                columna = ultimo_id.group(1)
+                asignaciones = _LAST_INSERT_ID.sub(r"\1", asignaciones)
+            texto = texto[: odku.start()] + "ON CONFLICT DO UPDATE SET" + asignaciones
+            if columna:
+                texto += f" RETURNING {columna}"
+        return texto
+
+    return _fuera_de_cadenas(sql, dialecto), columna
+
+
+@functools.lru_cache(maxsize=512)
+def solo_insertar(sql):
+    """Variante ``ON CONFLICT DO NOTHING`` de un upsert traducido con ``RETURNING``."""
+    return _DO_UPDATE.sub("ON CONFLICT DO NOTHING", sql)
+
+
+# ==============================
+# Traducción del esquema
+# ==============================
+
+_SENTENCIAS = re.compile(r";\s*$", re.M)
+_NUMERACION = re.compile(r"WHERE\s+n\s*<=\s*(\d+)", re.I)
+
+
+def _numerar_formularios(sentencia):
+    # MySQL numera con variables de sesión (@row); SQLite usa un CTE recursivo
+    limite = int(_NUMERACION.search(sentencia).group(1))
+    return (
+        "WITH RECURSIVE numeros(n) AS "
+        f"(SELECT 1 UNION ALL SELECT n + 1 FROM numeros WHERE n < {limite}) "
+        "INSERT INTO formulario (nombre) "
+        "SELECT 'Formulario ' || printf('%02d', n) FROM numeros"
+    )
+
+
+def traducir_esquema(texto):
+    """Convierte ``modelo.sql`` en un script ejecutable por SQLite."""
+    sentencias = []
+    for sentencia in _SENTENCIAS.split(texto):
+        sin_comentarios = "\n".join(
+            linea for linea in sentencia.splitlines()
+            if not linea.strip().startswith("--")
+        ).strip()
+        if not sin_comentarios or re.match(
+            r"(CREATE\s+DATABASE|USE)\b", sin_comentarios, re.I
+        ):
+            continue
+        if "@row" in sin_comentarios:
+            sentencias.append(_numerar_formularios(sin_comentarios))
+            continue
+        sentencia = re.sub(
+            r"\bINT\s+AUTO_INCREMENT\s+PRIMARY\s+KEY\b",
+            "INTEGER PRIMARY KEY AUTOINCREMENT",
+            sin_comentarios,
+            flags=re.I,
+        )
+        sentencia = re.sub(r"\bUNIQUE\s+KEY\s+\w+\s*\(", "UNIQUE (", sentencia, flags=re.I)
+        sentencias.append(sentencia)
+    return ";\n".join(sentencias) + ";\n"
+
+
+# ==============================
+# Conexiones
+# ==============================
+
+
+class CursorSQLite:
+    """Cursor con la interfaz de ``mysql.connector`` usada por la aplicación."""
+
+    def __init__(self, conexion, dictionary=False):
+        self._cursor = conexion.cursor()
+        self._diccionario = dictionary
+        self._lastrowid = None
+        self._rowcount = None
+
+    @property
+    def rowcount(self):
+        if self._rowcount is not None:
+            return self._rowcount
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._lastrowid
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def execute(self, query, params=None):
+        sql, columna = traducir(query)
+        params = tuple(params) if params else ()
+        self._rowcount = None
+        if columna is None:
+            self._cursor.execute(sql, params)
+            self._lastrowid = self._cursor.lastrowid
+            return
+        # Upsert de una fila con LAST_INSERT_ID(id): MySQL informa 1 fila si
+        # insertó y 2 si actualizó, y la aplicación lo usa para saber si la
+        # fila es nueva. SQLite informa 1 en ambos casos, así que primero se
+        # intenta insertar sin actualizar.
+        self._cursor.execute(solo_insertar(sql), params)
+        fila = self._cursor.fetchone()
+        self._rowcount = 1
+        if fila is None:
+            self._cursor.execute(sql, params)
+            fila = self._cursor.fetchone()
+            self._rowcount = 2
+        self._lastrowid = fila[0]
+
+    def executemany(self, query, seq_params):
+        sql, _ = traducir(query)
+        self._rowcount = None
+        self._cursor.executemany(sql, [tuple(p) for p in seq_params])
+        self._lastrowid = self._cursor.lastrowid
+
+    def _fila(self, fila):
+        if fila is None or not self._diccionario:
+            return fila
+        return dict(zip((d[0] for d in self._cursor.description), fila))
+
+    def fetchone(self):
+        return self._fila(self._cursor.fetchone())
+
+    def fetchmany(self, size=1):
+        return [self._fila(fila) for fila in self._cursor.fetchmany(size)]
+
+    def fetchall(self):
+        return [self._fila(fila) for fila in self._cursor.fetchall()]
+
+    def close(self):
+        self._cursor.close()
+
+
+class ConexionSQLite:
+    """Conexión prestada por :class:`PoolSQLite`.
+
+    ``estado`` es un diccionario propio de la conexión física que se conserva
+    entre préstamos (``sqlite3.Connection`` no admite atributos).
+    """
+
+    def __init__(self, conexion, pool):
+        self._conexion = conexion
+        self._pool = pool
+        self.estado = pool._estados[id(conexion)]
+
+    def cursor(self, dictionary=False, **kwargs):
+        return CursorSQLite(self._conexion, dictionary)
+
+    def commit(self):
+        self._conexion.commit()
+
+    def rollback(self):
+        self._conexion.rollback()
+
+    def close(self):
+        # Igual que reset_session en MySQL: no dejar transacciones abiertas
+        if self._conexion.in_transaction:
+            self._conexion.rollback()
+        self._pool._devolver(self._conexion)
+
+
+class PoolSQLite:
+    """Conjunto fijo de conexiones a una base SQLite.
+
+    Con ``ruta=":memory:"`` la base vive en una única conexión, así que el pool
+    tiene tamaño 1. En un archivo se activa WAL para que las lecturas no
+    esperen a las escrituras. ``esquema`` se carga si la base está vacía.
+    """
+
+    def __init__(self, ruta=":memory:", pool_size=5, esquema=ESQUEMA_POR_DEFECTO,
+                 pool_name="sqlite_pool", espera=5.0):
+        self.ruta = ruta
+        self.pool_name = pool_name
+        self.pool_size = 1 if ruta == ":memory:" else pool_size
+        self.espera = espera
+        self._libres = queue.LifoQueue()
+        self._estados = {}
+        for _ in range(self.pool_size):
+            conexion = self._conectar()
+            self._estados[id(conexion)] = {}
+            self._libres.put(conexion)
+        if esquema:
+            conexion = self._libres.get()
+            try:
+                cargar_esquema(conexion, esquema)
+            finally:
+                self._libres.put(conexion)
+
+    def _conectar(self):
+        conexion = sqlite3.connect(
+            self.ruta,
+            timeout=self.espera,
+            isolation_level="IMMEDIATE",
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            check_same_thread=False,
+        )
+        conexion.execute("PRAGMA foreign_keys = ON")
+        if self.ruta != ":memory:":
+            conexion.execute("PRAGMA journal_mode = WAL")
+            conexion.execute("PRAGMA synchronous = NORMAL")
+        return conexion
+
+    def get_connection(self):
+        return ConexionSQLite(self._libres.get(timeout=self.espera), self)
+
+    def _devolver(self, conexion):
+        self._libres.put(conexion)
+
+
+def cargar_esquema(conexion, ruta=ESQUEMA_POR_DEFECTO):
+    """Crea las tablas de ``ruta`` salvo que la base ya tenga el esquema."""
+    existe = conexion.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'usuario'"
+    ).fetchone()
+    if existe:
+        return
+    with open(ruta, encoding="utf-8") as archivo:
+        conexion.executescript(traducir_esquema(archivo.read()))
+    conexion.commit()
@@ -0,0 +1,223 @@
+"""Exportación en streaming de respuestas y ponderaciones (CSV y XLSX).
+
+Las filas se leen del cursor sin búfer en lotes con ``fetchmany`` y se emiten
+en formato ancho (una fila por respuesta) a medida que llegan, de modo que la
+memoria no crece con el tamaño de la tabla. El XLSX se escribe con ``zipfile``
+sobre un destino no posicionable, así que también se genera por partes.
+"""
+
+import csv
+import io
+import re
+import zipfile
+from datetime import timedelta
+from decimal import Decimal
+from itertools import groupby
+from xml.sax.saxutils import escape
+
+TAM_LOTE = 1000
+
+COLUMNAS_RESPUESTA = (
+    "id_respuesta",
+    "fecha_respuesta",
+    "id_usuario",
+    "nombre",
+    "apellidos",
+    "cargo",
+    "dependencia",
+    "id_formulario",
+    "formulario",
+)
+
+EXPORTACION_QUERY = """
+    SELECT r.id AS id_respuesta,
+           r.fecha_respuesta,
+           u.id AS id_usuario,
+           u.nombre,
+           u.apellidos,
+           u.cargo,
+           u.dependencia,
+           f.id AS id_formulario,
+           f.nombre AS formulario,
+           rd.id_factor,
+           rd.valor_usuario,
+           pa.peso_admin
+    FROM respuesta r
+    JOIN usuario u ON u.id = r.id_usuario
+    JOIN formulario f ON f.id = r.id_formulario
+    JOIN respuesta_detalle rd ON rd.id_respuesta = r.id
+    LEFT JOIN ponderacion_admin pa
+        ON pa.id_respuesta = rd.id_respuesta AND pa.id_factor = rd.id_factor
+    {condiciones}
+    ORDER BY r.id
+"""
+
+
+def construir_consulta(id_formulario=None, dependencia=None, desde=None, hasta=None):
+    """Devuelve ``(sql, params)`` con los filtros indicados (fechas inclusivas)."""
+    condiciones, params = [], []
+    if id_formulario is not None:
+        condiciones.append("r.id_formulario = %s")
+        params.append(id_formulario)
+    if dependencia:
+        condiciones.append("u.dependencia = %s")
+        params.append(dependencia)
+    if desde is not None:
+        condiciones.append("r.fecha_respuesta >= %s")
+        params.append(desde)
+    if hasta is not None:
+        condiciones.append("r.fecha_respuesta < %s")
+        params.append(hasta + timedelta(days=1))
+    where = "WHERE " + " AND ".join(condiciones) if condiciones else ""
+    return EXPORTACION_QUERY.format(condiciones=where), tuple(params)
+
+
+def encabezados(factores):
+    return (
+        list(COLUMNAS_RESPUESTA)
+        + [f"valor_{f['id']}" for f in factores]
+        + [f"peso_{f['id']}" for f in factores]
+    )
+
+
+def filas_anchas(cursor, factores):
+    """Agrupa las filas (una por factor) del cursor en una fila por respuesta.
+
+    Genera listas de filas por lote para que quien consume pueda emitirlas
+    juntas. Requiere que la consulta venga ordenada por ``id_respuesta``.
+    """
+    ids_factor = [f["id"] for f in factores]
+    pendientes = []
+    while True:
+        filas = cursor.fetchmany(TAM_LOTE)
+        if not filas:
+            break
+        filas = pendientes + filas
+        # La última respuesta puede continuar en el lote siguiente
+        ultimo_id = filas[-1]["id_respuesta"]
+        corte = len(filas)
+        while corte and filas[corte - 1]["id_respuesta"] == ultimo_id:
+            corte -= 1
+        completas, pendientes = filas[:corte], filas[corte:]
+        if completas:
+            yield list(_agrupar(completas, ids_factor))
+    if pendientes:
+        yield list(_agrupar(pendientes, ids_factor))
+
+
+def _agrupar(filas, ids_factor):
+    for _, grupo in groupby(filas, key=lambda fila: fila["id_respuesta"]):
+        grupo = list(grupo)
+        primera = grupo[0]
+        valores = {fila["id_factor"]: fila["valor_usuario"] for fila in grupo}
+        pesos = {fila["id_factor"]: fila["peso_admin"] for fila in grupo}
+        yield (
+            [primera[c] for c in COLUMNAS_RESPUESTA]
+            + [valores.get(i) for i in ids_factor]
+            + [pesos.get(i) for i in ids_factor]
+        )
+
+
+def csv_stream(lotes, columnas):
+    """Genera el CSV (UTF-8 con BOM para que Excel respete los acentos)."""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    buffer.write("﻿")
+    escritor.writerow(columnas)
+    for lote in lotes:
+        escritor.writerows(
+            ["" if valor is None else valor for valor in fila] for fila in lote
+        )
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+# ==============================
+# XLSX mínimo en streaming
+# ==============================
+
+_CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>
+<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>
+</Types>"""
+
+_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>
+</Relationships>"""
+
+_WORKBOOK = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
+<sheets><sheet name="Respuestas" sheetId="1" r:id="rId1"/></sheets>
+</workbook>"""
+
+_WORKBOOK_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>
+</Relationships>"""
+
+_HOJA_INICIO = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    "<sheetData>"
+)
+_HOJA_FIN = "</sheetData></worksheet>"
+
+_CONTROL = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+class _Destino:
+    """Destino no posicionable que acumula lo escrito hasta que se vacía."""
+
+    def __init__(self):
+        self._partes = []
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def vaciar(self):
+        datos = b"".join(self._partes)
+        self._partes.clear()
+        return datos
+
+
+def _celda(valor):
+    if valor is None:
+        return "<c/>"
+    if isinstance(valor, bool):
+        valor = int(valor)
+    if isinstance(valor, (int, float, Decimal)):
+        return f"<c><v>{valor}</v></c>"
+    texto = escape(_CONTROL.sub("", str(valor)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>'
+
+
+def _fila(valores):
+    return "<row>" + "".join(_celda(v) for v in valores) + "</row>"
+
+
+def xlsx_stream(lotes, columnas):
+    """Genera un libro XLSX de una hoja escribiendo el ZIP por partes."""
+    destino = _Destino()
+    with zipfile.ZipFile(destino, "w", compression=zipfile.ZIP_DEFLATED) as libro:
+        libro.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        libro.writestr("_rels/.rels", _RELS)
+        libro.writestr("xl/workbook.xml", _WORKBOOK)
+        libro.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS)
+        with libro.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as hoja:
+            hoja.write((_HOJA_INICIO + _fila(columnas)).encode("utf-8"))
+            for lote in lotes:
+                hoja.write("".join(_fila(fila) for fila in lote).encode("utf-8"))
+                yield destino.vaciar()
+            hoja.write(_HOJA_FIN.encode("utf-8"))
+    yield destino.vaciar()
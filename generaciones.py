@@ -0,0 +1,112 @@
+"""Contadores de generación compartidos entre procesos.
+
+Cada caché se guarda bajo una clave que incluye su generación actual, así que
+invalidar consiste en incrementar el contador: las entradas anteriores dejan de
+leerse en todos los workers. Los contadores viven en un archivo mapeado en
+memoria (``mmap``) que comparten todos los procesos de la máquina, por lo que
+leerlos no cuesta ninguna consulta ni llamada al sistema.
+"""
+
+import fcntl
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+_FORMATO = "<Q"
+_TAM_CONTADOR = struct.calcsize(_FORMATO)
+
+# Las cachés por usuario se invalidan por cubetas: incrementar la cubeta de un
+# usuario invalida también a los que comparten su cubeta, pero evita un
+# contador por usuario en el archivo compartido.
+CUBETAS_USUARIO = 64
+
+# Los nombres nuevos se agregan al final para no mover los contadores de un
+# archivo ya existente.
+NOMBRES = ("ranking", "factores", "asignaciones") + tuple(
+    f"usuarios:{n}" for n in range(CUBETAS_USUARIO)
+) + ("respuestas",)
+
+
+def cubeta_usuario(id_usuario):
+    """Nombre del contador que cubre las cachés de ``id_usuario``."""
+    return f"usuarios:{id_usuario % CUBETAS_USUARIO}"
+
+
+def ruta_por_defecto():
+    return os.getenv("CACHE_GENERACIONES_PATH") or os.path.join(
+        tempfile.gettempdir(), "form_mc_generaciones"
+    )
+
+
+class Generaciones:
+    """Contadores con nombre almacenados en un archivo compartido."""
+
+    def __init__(self, ruta=None, nombres=NOMBRES):
+        self.ruta = ruta or ruta_por_defecto()
+        self._posiciones = {
+            nombre: i * _TAM_CONTADOR for i, nombre in enumerate(nombres)
+        }
+        self._tam = len(self._posiciones) * _TAM_CONTADOR
+        self._fd = None
+        self._mmap = None
+        self._lock = threading.Lock()
+
+    def _abrir(self):
+        if self._mmap is not None:
+            return self._mmap
+        with self._lock:
+            if self._mmap is None:
+                fd = os.open(self.ruta, os.O_RDWR | os.O_CREAT, 0o600)
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                try:
+                    actual = os.fstat(fd).st_size
+                    if actual < self._tam:
+                        # Los contadores nuevos arrancan en un valor basado en
+                        # la hora para no reutilizar claves de una caché
+                        # persistente si el archivo se borró.
+                        inicio = struct.pack(_FORMATO, time.time_ns() // 1_000_000)
+                        os.lseek(fd, actual, os.SEEK_SET)
+                        os.write(fd, inicio * ((self._tam - actual) // _TAM_CONTADOR))
+                finally:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                self._mmap = mmap.mmap(fd, self._tam)
+                self._fd = fd
+        return self._mmap
+
+    def tras_fork(self):
+        """Reabre el archivo en un proceso hijo creado con ``fork()``.
+
+        ``flock`` bloquea la descripción de archivo abierta, que un descriptor
+        heredado comparte con el padre: sin reabrir, ambos creerían tener el
+        bloqueo a la vez.
+        """
+        self._lock = threading.Lock()
+        if self._mmap is not None:
+            self._mmap.close()
+            os.close(self._fd)
+        self._mmap = None
+        self._fd = None
+
+    def actual(self, nombre):
+        """Devuelve la generación vigente de ``nombre``."""
+        return struct.unpack_from(_FORMATO, self._abrir(), self._posiciones[nombre])[0]
+
+    def incrementar(self, nombre):
+        """Invalida ``nombre`` en todos los procesos y devuelve la nueva generación."""
+        datos = self._abrir()
+        posicion = self._posiciones[nombre]
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                valor = struct.unpack_from(_FORMATO, datos, posicion)[0] + 1
+                struct.pack_into(_FORMATO, datos, posicion, valor)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        return valor
+
+    def clave(self, base, nombre):
+        """Clave de caché de ``base`` para la generación vigente de ``nombre``."""
+        return f"{base}:{self.actual(nombre)}"
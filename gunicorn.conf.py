@@ -0,0 +1,49 @@
+"""Configuración de gunicorn: ``gunicorn -c gunicorn.conf.py app:app``."""
+
+import glob
+import os
+import tempfile
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("GUNICORN_WORKERS", 2))
+# La aplicación se importa una sola vez en el maestro y los workers la
+# heredan con fork() (copy-on-write). Importarla no abre conexiones: cada
+# worker crea su pool en post_fork. GUNICORN_PRELOAD=0 vuelve a importarla
+# en cada worker.
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") != "0"
+
+# Las métricas de Prometheus se agregan entre workers mediante archivos; la
+# variable debe existir antes de que los workers importen la aplicación.
+os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "form_mc_metricas")
+)
+# Con preload_app el maestro importa metricas (y abre sus archivos) antes de
+# on_starting, así que el directorio se prepara aquí, al leer la configuración.
+# Se descartan solo los *.db de ejecuciones anteriores: el directorio puede
+# venir del entorno y contener otros archivos.
+_directorio_metricas = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+os.makedirs(_directorio_metricas, exist_ok=True)
+for _archivo in glob.glob(os.path.join(_directorio_metricas, "*.db")):
+    os.remove(_archivo)
+
+
+def when_ready(server):
+    """Con preload_app, importa en el maestro lo que las vistas cargan bajo demanda."""
+    if server.cfg.preload_app:
+        import app
+
+        app.precargar()
+
+
+def post_fork(server, worker):
+    """Abre el pool de conexiones del worker antes de aceptar peticiones."""
+    import app
+
+    app.iniciar_worker()
+
+
+def child_exit(server, worker):
+    """Retira los indicadores en vivo del worker que terminó."""
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,201 @@
+"""Importación masiva de usuarios y asignaciones desde CSV.
+
+El archivo se lee con ``csv.DictReader`` fila a fila y se procesa en lotes de
+:data:`TAM_LOTE`: cada lote se valida, se inserta con una sola sentencia
+``INSERT ... VALUES (...), (...) ON DUPLICATE KEY UPDATE`` y se confirma, así
+que la memoria no depende del tamaño del archivo. Las filas inválidas no
+detienen la importación; se devuelven con su número de línea. Los textos se
+limpian de HTML igual que en el formulario de respuesta.
+"""
+
+import csv
+
+TAM_LOTE = 1000
+MAX_ERRORES = 1000
+LONGITUD_MAXIMA = 100
+
+COLUMNAS = {
+    "usuarios": ("id", "nombre", "apellidos", "cargo", "dependencia"),
+    "asignaciones": ("id_usuario", "id_formulario"),
+}
+OBLIGATORIAS = {
+    "usuarios": ("nombre", "apellidos"),
+    "asignaciones": ("id_usuario", "id_formulario"),
+}
+
+
+class ErrorImportacion(ValueError):
+    """El archivo no se puede importar (por ejemplo, faltan columnas)."""
+
+
+class ResultadoImportacion:
+    """Resumen de una importación: filas leídas, importadas y errores."""
+
+    def __init__(self):
+        self.procesadas = 0
+        self.importadas = 0
+        self.total_errores = 0
+        self.errores = []
+
+    def agregar_error(self, linea, mensaje):
+        self.total_errores += 1
+        if len(self.errores) < MAX_ERRORES:
+            self.errores.append((linea, mensaje))
+
+
+def _marcadores(filas, columnas):
+    grupo = "(" + ", ".join(["%s"] * columnas) + ")"
+    return ", ".join([grupo] * len(filas))
+
+
+def _entero(fila, campo, obligatorio=True):
+    texto = (fila.get(campo) or "").strip()
+    if not texto:
+        if obligatorio:
+            raise ValueError(f"falta {campo}")
+        return None
+    try:
+        valor = int(texto)
+    except ValueError:
+        raise ValueError(f"{campo} no es un entero: {texto!r}") from None
+    if valor <= 0:
+        raise ValueError(f"{campo} debe ser positivo")
+    return valor
+
+
+def _sanitizar(texto):
+    """Quita etiquetas y escapa ``<``, ``>`` y ``&`` como ``app.sanitize``."""
+    if not ("<" in texto or ">" in texto or "&" in texto):
+        # Sin esos caracteres bleach devuelve el texto intacto
+        return texto
+    import bleach
+
+    return bleach.clean(texto, tags=[], attributes={}, strip=True)
+
+
+def _texto(fila, campo, obligatorio=False):
+    texto = _sanitizar((fila.get(campo) or "").strip()).strip()
+    if not texto:
+        if obligatorio:
+            raise ValueError(f"falta {campo}")
+        return None
+    if len(texto) > LONGITUD_MAXIMA:
+        raise ValueError(f"{campo} supera {LONGITUD_MAXIMA} caracteres")
+    return texto
+
+
+def _validar_usuario(fila):
+    return (
+        _entero(fila, "id", obligatorio=False),
+        _texto(fila, "nombre", obligatorio=True),
+        _texto(fila, "apellidos", obligatorio=True),
+        _texto(fila, "cargo"),
+        _texto(fila, "dependencia"),
+    )
+
+
+def _validar_asignacion(fila):
+    return (_entero(fila, "id_usuario"), _entero(fila, "id_formulario"))
+
+
+def _insertar_usuarios(cursor, filas, resultado):
+    cursor.execute(
+        f"""
+        INSERT INTO usuario (id, nombre, apellidos, cargo, dependencia)
+        VALUES {_marcadores(filas, 5)}
+        ON DUPLICATE KEY UPDATE nombre = VALUES(nombre),
+                                apellidos = VALUES(apellidos),
+                                cargo = VALUES(cargo),
+                                dependencia = VALUES(dependencia)
+        """,
+        [valor for _, datos in filas for valor in datos],
+    )
+    resultado.importadas += len(filas)
+
+
+def _insertar_asignaciones(cursor, filas, resultado, formularios):
+    ids_usuario = sorted({datos[0] for _, datos in filas})
+    cursor.execute(
+        f"SELECT id FROM usuario WHERE id IN ({', '.join(['%s'] * len(ids_usuario))})",
+        ids_usuario,
+    )
+    existentes = {row["id"] for row in cursor.fetchall()}
+
+    validas = []
+    for linea, (id_usuario, id_formulario) in filas:
+        if id_usuario not in existentes:
+            resultado.agregar_error(linea, f"el usuario {id_usuario} no existe")
+        elif id_formulario not in formularios:
+            resultado.agregar_error(linea, f"el formulario {id_formulario} no existe")
+        else:
+            validas.append((linea, (id_usuario, id_formulario)))
+    if not validas:
+        return
+
+    # Las asignaciones repetidas se ignoran gracias a la clave única
+    cursor.execute(
+        f"""
+        INSERT INTO asignacion (id_usuario, id_formulario)
+        VALUES {_marcadores(validas, 2)}
+        ON DUPLICATE KEY UPDATE id_formulario = VALUES(id_formulario)
+        """,
+        [valor for _, datos in validas for valor in datos],
+    )
+    resultado.importadas += len(validas)
+
+
+def importar(conn, cursor, archivo, tipo, progreso=None):
+    """Importa ``archivo`` (texto CSV con encabezados) en lotes.
+
+    ``tipo`` es ``"usuarios"`` o ``"asignaciones"``. Cada lote se confirma por
+    separado; si la base de datos falla, se revierte el lote en curso y se
+    propaga la excepción (los lotes anteriores quedan importados).
+    ``progreso(resultado)`` se llama después de cada lote.
+    """
+    if tipo not in COLUMNAS:
+        raise ErrorImportacion(f"Tipo de importación desconocido: {tipo}")
+
+    lector = csv.DictReader(archivo)
+    encabezados = {c.strip().lower() for c in (lector.fieldnames or [])}
+    faltantes = [c for c in OBLIGATORIAS[tipo] if c not in encabezados]
+    if faltantes:
+        raise ErrorImportacion("Faltan columnas: " + ", ".join(faltantes))
+    lector.fieldnames = [c.strip().lower() for c in lector.fieldnames]
+
+    if tipo == "usuarios":
+        validar = _validar_usuario
+        insertar = _insertar_usuarios
+    else:
+        cursor.execute("SELECT id FROM formulario")
+        formularios = {row["id"] for row in cursor.fetchall()}
+        validar = _validar_asignacion
+
+        def insertar(cursor, filas, resultado):
+            _insertar_asignaciones(cursor, filas, resultado, formularios)
+
+    resultado = ResultadoImportacion()
+    lote = []
+
+    def confirmar():
+        try:
+            insertar(cursor, lote, resultado)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        lote.clear()
+        if progreso is not None:
+            progreso(resultado)
+
+    for fila in lector:
+        resultado.procesadas += 1
+        try:
+            lote.append((lector.line_num, validar(fila)))
+        except ValueError as exc:
+            resultado.agregar_error(lector.line_num, str(exc))
+            continue
+        if len(lote) >= TAM_LOTE:
+            confirmar()
+    if lote:
+        confirmar()
+    return resultado
@@ -0,0 +1,107 @@
+"""Registro por petición de las consultas SQL ejecutadas.
+
+:class:`CursorInstrumentado` envuelve el cursor de la petición y anota por cada
+sentencia su texto normalizado, número de parámetros, filas y duración. El
+costo es una llamada a ``perf_counter`` y un ``append`` por consulta; la
+normalización del texto se memoriza porque las mismas sentencias se repiten.
+"""
+
+import functools
+import logging
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+_ESPACIOS = re.compile(r"\s+")
+_GRUPOS_REPETIDOS = re.compile(r"(\((?:%s, )*%s\))(?:, \1)+")
+_MARCADORES_REPETIDOS = re.compile(r"%s(?:, %s)+")
+
+
+@functools.lru_cache(maxsize=512)
+def normalizar(query):
+    """Colapsa espacios y listas de marcadores para agrupar sentencias iguales."""
+    texto = _ESPACIOS.sub(" ", query).strip()
+    texto = _GRUPOS_REPETIDOS.sub(r"\1, …", texto)
+    return _MARCADORES_REPETIDOS.sub("%s, …", texto)
+
+
+class Consulta:
+    __slots__ = ("sql", "parametros", "filas", "duracion")
+
+    def __init__(self, sql, parametros, filas, duracion):
+        self.sql = sql
+        self.parametros = parametros
+        self.filas = filas
+        self.duracion = duracion
+
+
+def _contar_parametros(params, muchos=False):
+    if not params:
+        return 0
+    if muchos:
+        return sum(len(fila) for fila in params)
+    return len(params)
+
+
+class CursorInstrumentado:
+    """Proxy del cursor que registra cada consulta en ``registro``."""
+
+    def __init__(self, cursor, registro, umbral_lento_ms=None):
+        self._cursor = cursor
+        self._registro = registro
+        self._umbral = umbral_lento_ms
+        self._ultima = None
+
+    def __getattr__(self, nombre):
+        return getattr(self._cursor, nombre)
+
+    def _anotar(self, query, parametros, inicio):
+        duracion = time.perf_counter() - inicio
+        filas = getattr(self._cursor, "rowcount", -1)
+        consulta = Consulta(query, parametros, filas if filas >= 0 else 0, duracion)
+        self._registro.append(consulta)
+        self._ultima = consulta
+        if self._umbral is not None and duracion * 1000 >= self._umbral:
+            logger.warning(
+                "Consulta lenta (%.1f ms, %d parámetros): %s",
+                duracion * 1000,
+                parametros,
+                normalizar(query),
+            )
+
+    def execute(self, query, params=None, *args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return self._cursor.execute(query, params, *args, **kwargs)
+        finally:
+            self._anotar(query, _contar_parametros(params), inicio)
+
+    def executemany(self, query, seq_params, *args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return self._cursor.executemany(query, seq_params, *args, **kwargs)
+        finally:
+            self._anotar(query, _contar_parametros(seq_params, muchos=True), inicio)
+
+    # En cursores sin búfer ``rowcount`` solo se conoce al leer las filas
+    def fetchone(self):
+        fila = self._cursor.fetchone()
+        if fila is not None and self._ultima is not None:
+            self._ultima.filas = max(self._ultima.filas, 1)
+        return fila
+
+    def fetchall(self):
+        filas = self._cursor.fetchall()
+        if self._ultima is not None:
+            self._ultima.filas = len(filas)
+        return filas
+
+
+def server_timing(consultas, duracion_total=None):
+    """Valor del encabezado ``Server-Timing`` para las consultas registradas."""
+    total_db = sum(c.duracion for c in consultas) * 1000
+    partes = [f'db;dur={total_db:.2f};desc="{len(consultas)} queries"']
+    if duracion_total is not None:
+        partes.append(f"app;dur={duracion_total * 1000:.2f}")
+    return ", ".join(partes)
@@ -0,0 +1,122 @@
+"""Métricas de la aplicación en formato de texto de Prometheus.
+
+Con ``PROMETHEUS_MULTIPROC_DIR`` definido (antes de importar este módulo)
+``prometheus_client`` guarda los valores en archivos mapeados en memoria por
+proceso y ``/metrics`` los agrega, de modo que cualquier worker de gunicorn
+responde con los totales de todos. Sin esa variable las métricas son las del
+proceso actual.
+"""
+
+import os
+import threading
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+
+LATENCIA = Histogram(
+    "formularios_request_duration_seconds",
+    "Latencia de las peticiones por endpoint de Flask y código de estado.",
+    ["endpoint", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+CACHE = Counter(
+    "formularios_cache_requests",
+    "Consultas a las cachés de ranking y factores.",
+    ["cache", "resultado"],
+)
+RECALCULOS = Counter(
+    "formularios_ranking_recalculos",
+    "Resultado de las peticiones que no encontraron el ranking en caché.",
+    ["resultado"],
+)
+TRANSACCIONES = Counter(
+    "formularios_transacciones",
+    "Transacciones confirmadas o revertidas por vista.",
+    ["vista", "resultado"],
+)
+LECTURAS = Counter(
+    "formularios_db_reads",
+    "Peticiones de reportes por destino: réplica, primario (la sesión acaba de "
+    "escribir) o respaldo (réplica no disponible).",
+    ["destino"],
+)
+POOL_CONEXIONES = Gauge(
+    "formularios_db_pool_connections",
+    "Conexiones del pool por estado.",
+    ["estado"],
+    multiprocess_mode="livesum",
+)
+POOL_EVENTOS = Counter(
+    "formularios_db_pool_events",
+    "Préstamos, agotamientos, rechazos y timeouts del pool.",
+    ["evento"],
+)
+POOL_ESPERA = Counter(
+    "formularios_db_pool_wait_seconds",
+    "Tiempo total esperando una conexión del pool.",
+)
+
+_previos = {}
+_lock = threading.Lock()
+
+
+def _sumar_diferencia(clave, actual, contador):
+    """Convierte contadores acumulados por proceso en incrementos."""
+    anterior = _previos.get(clave, 0)
+    if actual > anterior:
+        contador.inc(actual - anterior)
+    _previos[clave] = actual
+
+
+def sincronizar(estadisticas_pool=None, estadisticas_ranking=None):
+    """Vuelca en las métricas las estadísticas del pool y del single-flight."""
+    with _lock:
+        if estadisticas_pool:
+            for estado in ("en_uso", "libres", "esperando"):
+                POOL_CONEXIONES.labels(estado).set(estadisticas_pool[estado])
+            for evento in ("prestamos", "agotado", "rechazos", "timeouts"):
+                _sumar_diferencia(
+                    ("pool", evento),
+                    estadisticas_pool[evento],
+                    POOL_EVENTOS.labels(evento),
+                )
+            _sumar_diferencia(
+                ("pool", "espera_total"), estadisticas_pool["espera_total"], POOL_ESPERA
+            )
+        if estadisticas_ranking:
+            _sumar_diferencia(
+                ("ranking", "hit"),
+                estadisticas_ranking["aciertos"],
+                CACHE.labels("ranking", "hit"),
+            )
+            fallos = (
+                estadisticas_ranking["calculos"]
+                + estadisticas_ranking["esperas"]
+                + estadisticas_ranking["anteriores"]
+            )
+            _sumar_diferencia(("ranking", "miss"), fallos, CACHE.labels("ranking", "miss"))
+            for resultado in ("calculos", "esperas", "anteriores"):
+                _sumar_diferencia(
+                    ("recalculos", resultado),
+                    estadisticas_ranking[resultado],
+                    RECALCULOS.labels(resultado),
+                )
+
+
+def exportar():
+    """Devuelve ``(cuerpo, content_type)`` con todas las métricas."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registro = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registro)
+    else:
+        registro = REGISTRY
+    return generate_latest(registro), CONTENT_TYPE_LATEST
@@ -0,0 +1,38 @@
+"""Cursores opacos para paginación por conjunto de claves (keyset).
+
+Un cursor codifica los valores de ordenación de la última fila vista, de modo
+que la página siguiente se obtiene con un ``WHERE`` sobre el índice en lugar
+de un ``OFFSET`` que recorre y descarta las filas anteriores.
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+
+
+def codificar_cursor(*valores):
+    """Codifica los valores de ordenación de una fila como texto URL-safe."""
+    datos = [v.isoformat() if isinstance(v, datetime) else v for v in valores]
+    crudo = json.dumps(datos, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(crudo).decode().rstrip("=")
+
+
+def decodificar_cursor(texto, tipos):
+    """Decodifica un cursor; devuelve ``None`` si es inválido o está alterado.
+
+    ``tipos`` indica cómo convertir cada valor (``datetime`` o ``int``).
+    """
+    if not texto:
+        return None
+    try:
+        relleno = "=" * (-len(texto) % 4)
+        datos = json.loads(base64.urlsafe_b64decode(texto + relleno))
+        if not isinstance(datos, list) or len(datos) != len(tipos):
+            return None
+        return tuple(
+            datetime.fromisoformat(v) if tipo is datetime else tipo(v)
+            for v, tipo in zip(datos, tipos)
+        )
+    except (binascii.Error, ValueError, TypeError):
+        return None
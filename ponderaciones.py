@@ -0,0 +1,226 @@
+"""Ponderación masiva de respuestas y plantillas de pesos.
+
+La vista ``/admin/ponderaciones`` muestra las respuestas en una cuadrícula
+paginada por ``id`` (keyset) y guarda todos los pesos editados con un único
+``INSERT ... ON DUPLICATE KEY UPDATE`` de varias filas. Las plantillas guardan
+un peso por factor y se aplican a las respuestas incompletas llenando solo los
+pesos que les faltan. Como en :mod:`ranking`, las funciones reciben el cursor
+de la petición, mantienen las tablas resumen y nunca hacen ``commit``.
+"""
+
+from decimal import Decimal, InvalidOperation
+
+import ranking
+
+PESO_MINIMO = Decimal(0)
+PESO_MAXIMO = Decimal(10)
+POR_PAGINA = 25
+# Respuestas por sentencia al aplicar una plantilla: acota el número de
+# marcadores de los IN (...) aunque haya miles de respuestas incompletas
+TAM_LOTE = 1000
+
+
+def leer_peso(texto):
+    """Convierte el texto de un campo en un peso redondeado a una décima.
+
+    Devuelve ``None`` si el campo está vacío y lanza ``ValueError`` con el
+    mensaje para el usuario si no es un número entre 0 y 10.
+    """
+    valor = texto.strip()
+    if valor == "":
+        return None
+    try:
+        peso = Decimal(valor)
+    except InvalidOperation:
+        raise ValueError("Las ponderaciones deben ser valores numéricos.") from None
+    if not peso.is_finite() or peso < PESO_MINIMO or peso > PESO_MAXIMO:
+        raise ValueError("Cada ponderación debe estar entre 0 y 10.")
+    return float(peso.quantize(Decimal("0.1")))
+
+
+def guardar(cursor, ponderaciones):
+    """Guarda ``(id_respuesta, id_factor, peso)`` de varias respuestas a la vez.
+
+    Las respuestas que ya estaban completas se restan del ranking antes de
+    cambiar sus pesos y todas se vuelven a sumar después; las que siguen
+    incompletas no aportan nada. Devuelve el número de respuestas tocadas.
+    """
+    if not ponderaciones:
+        return 0
+    ids = sorted({id_respuesta for id_respuesta, _, _ in ponderaciones})
+    previas = ranking.bloquear_estados(cursor, ids)
+    completas = [
+        id_respuesta
+        for id_respuesta, ponderadas in previas.items()
+        if ponderadas == ranking.FACTORES_POR_RESPUESTA
+    ]
+    ranking.ajustar_ranking(cursor, completas, -1)
+    cursor.execute(
+        """
+        INSERT INTO ponderacion_admin (id_respuesta, id_factor, peso_admin)
+        VALUES """
+        + ", ".join(["(%s, %s, %s)"] * len(ponderaciones))
+        + """
+        ON DUPLICATE KEY UPDATE peso_admin = VALUES(peso_admin)
+        """,
+        [dato for fila in ponderaciones for dato in fila],
+    )
+    ranking.actualizar_estado(cursor, ids)
+    ranking.ajustar_ranking(cursor, ids, 1)
+    return len(ids)
+
+
+def pagina(cursor, despues=None, antes=None, solo_incompletas=False,
+           por_pagina=None):
+    """Lee una página de respuestas con sus valores y pesos por factor.
+
+    ``despues`` y ``antes`` son el ``id`` de la última o la primera respuesta
+    de la página actual. Devuelve ``(filas, hay_anterior, hay_siguiente)``;
+    cada fila trae ``valores`` y ``pesos`` indexados por ``id_factor``.
+    """
+    por_pagina = por_pagina or POR_PAGINA
+    condiciones = []
+    params = []
+    orden = "ASC"
+    if despues is not None:
+        condiciones.append("r.id > %s")
+        params.append(despues)
+    elif antes is not None:
+        condiciones.append("r.id < %s")
+        params.append(antes)
+        orden = "DESC"
+    if solo_incompletas:
+        condiciones.append("re.ponderaciones < %s")
+        params.append(ranking.FACTORES_POR_RESPUESTA)
+    where = "WHERE " + " AND ".join(condiciones) if condiciones else ""
+    cursor.execute(
+        f"""
+        SELECT r.id AS id_respuesta, u.nombre, u.apellidos,
+               f.nombre AS formulario, re.ponderaciones
+        FROM respuesta r
+        JOIN respuesta_estado re ON re.id_respuesta = r.id
+        JOIN usuario u ON u.id = r.id_usuario
+        JOIN formulario f ON f.id = r.id_formulario
+        {where}
+        ORDER BY r.id {orden}
+        LIMIT %s
+        """,
+        (*params, por_pagina + 1),
+    )
+    filas = cursor.fetchall()
+    hay_mas = len(filas) > por_pagina
+    filas = filas[:por_pagina]
+    if antes is not None:
+        filas.reverse()
+        hay_anterior, hay_siguiente = hay_mas, True
+    else:
+        hay_anterior, hay_siguiente = despues is not None, hay_mas
+    if not filas:
+        return filas, hay_anterior, hay_siguiente
+
+    por_id = {}
+    for fila in filas:
+        fila["valores"] = {}
+        fila["pesos"] = {}
+        por_id[fila["id_respuesta"]] = fila
+    cursor.execute(
+        f"""
+        SELECT rd.id_respuesta, rd.id_factor, rd.valor_usuario, pa.peso_admin
+        FROM respuesta_detalle rd
+        LEFT JOIN ponderacion_admin pa
+            ON pa.id_respuesta = rd.id_respuesta AND pa.id_factor = rd.id_factor
+        WHERE rd.id_respuesta IN ({", ".join(["%s"] * len(por_id))})
+        """,
+        list(por_id),
+    )
+    for detalle in cursor.fetchall():
+        fila = por_id[detalle["id_respuesta"]]
+        fila["valores"][detalle["id_factor"]] = detalle["valor_usuario"]
+        if detalle["peso_admin"] is not None:
+            fila["pesos"][detalle["id_factor"]] = detalle["peso_admin"]
+    return filas, hay_anterior, hay_siguiente
+
+
+def listar_plantillas(cursor):
+    """Plantillas guardadas con sus pesos indexados por ``id_factor``."""
+    cursor.execute(
+        """
+        SELECT p.id, p.nombre, pp.id_factor, pp.peso
+        FROM plantilla_ponderacion p
+        LEFT JOIN plantilla_peso pp ON pp.id_plantilla = p.id
+        ORDER BY p.nombre, pp.id_factor
+        """
+    )
+    plantillas = {}
+    for fila in cursor.fetchall():
+        plantilla = plantillas.setdefault(
+            fila["id"], {"id": fila["id"], "nombre": fila["nombre"], "pesos": {}}
+        )
+        if fila["id_factor"] is not None:
+            plantilla["pesos"][fila["id_factor"]] = fila["peso"]
+    return list(plantillas.values())
+
+
+def guardar_plantilla(cursor, nombre, pesos):
+    """Crea o reemplaza la plantilla ``nombre`` con ``{id_factor: peso}``."""
+    cursor.execute(
+        """
+        INSERT INTO plantilla_ponderacion (nombre) VALUES (%s)
+        ON DUPLICATE KEY UPDATE id = LAST_INSERT_ID(id)
+        """,
+        (nombre,),
+    )
+    id_plantilla = cursor.lastrowid
+    cursor.execute("DELETE FROM plantilla_peso WHERE id_plantilla = %s", (id_plantilla,))
+    if pesos:
+        cursor.execute(
+            "INSERT INTO plantilla_peso (id_plantilla, id_factor, peso) VALUES "
+            + ", ".join(["(%s, %s, %s)"] * len(pesos)),
+            [dato for id_factor, peso in pesos.items() for dato in (id_plantilla, id_factor, peso)],
+        )
+    return id_plantilla
+
+
+def eliminar_plantilla(cursor, id_plantilla):
+    """Borra la plantilla; los pesos ya aplicados no cambian."""
+    cursor.execute("DELETE FROM plantilla_peso WHERE id_plantilla = %s", (id_plantilla,))
+    cursor.execute("DELETE FROM plantilla_ponderacion WHERE id = %s", (id_plantilla,))
+
+
+def aplicar_plantilla(cursor, id_plantilla):
+    """Llena con la plantilla los pesos que faltan en las respuestas incompletas.
+
+    Los pesos ya asignados se conservan (``INSERT IGNORE``). Devuelve
+    ``(respuestas, pesos)``: cuántas respuestas incompletas había y cuántos
+    pesos se agregaron.
+    """
+    cursor.execute(
+        """
+        SELECT id_respuesta
+        FROM respuesta_estado
+        WHERE ponderaciones < %s
+        ORDER BY id_respuesta
+        FOR UPDATE
+        """,
+        (ranking.FACTORES_POR_RESPUESTA,),
+    )
+    ids = [fila["id_respuesta"] for fila in cursor.fetchall()]
+    agregados = 0
+    for inicio in range(0, len(ids), TAM_LOTE):
+        lote = ids[inicio:inicio + TAM_LOTE]
+        cursor.execute(
+            f"""
+            INSERT IGNORE INTO ponderacion_admin (id_respuesta, id_factor, peso_admin)
+            SELECT rd.id_respuesta, rd.id_factor, pp.peso
+            FROM respuesta_detalle rd
+            JOIN plantilla_peso pp
+                ON pp.id_factor = rd.id_factor AND pp.id_plantilla = %s
+            WHERE rd.id_respuesta IN ({", ".join(["%s"] * len(lote))})
+            """,
+            (id_plantilla, *lote),
+        )
+        agregados += max(cursor.rowcount, 0)
+        # Estaban incompletas: no hay aportación previa que restar
+        ranking.actualizar_estado(cursor, lote)
+        ranking.ajustar_ranking(cursor, lote, 1)
+    return len(ids), agregados
@@ -0,0 +1,399 @@
+"""Mantenimiento incremental de las tablas resumen del ranking.
+
+``ranking_factor`` acumula por factor la suma ``peso_admin * valor_usuario`` de
+las respuestas con ponderación completa y ``respuesta_estado`` registra cuántos
+factores tiene ponderados cada respuesta. ``ranking_cubo`` guarda la misma suma
+por dependencia, cargo y formulario; la dependencia y el cargo son los que
+``respuesta_estado`` anotó al guardar la respuesta o al recalcular sus
+ponderaciones, así que la aportación que se resta es siempre la misma que se
+sumó. Las funciones reciben el cursor de la
+petición y nunca hacen ``commit``: se ejecutan dentro de la transacción de quien
+las llama.
+"""
+
+FACTORES_POR_RESPUESTA = 10
+
+# Consultas completas originales; solo se usan para verificar o reconstruir.
+INCOMPLETAS_COMPLETA_QUERY = """
+    SELECT r.id AS id_respuesta
+    FROM respuesta r
+    LEFT JOIN ponderacion_admin p ON r.id = p.id_respuesta
+    GROUP BY r.id
+    HAVING COUNT(p.id_factor) < %s
+"""
+
+RANKING_COMPLETO_QUERY = """
+    SELECT f.id AS id_factor,
+           f.nombre,
+           SUM(pa.peso_admin * rd.valor_usuario) AS total
+    FROM factor f
+    JOIN ponderacion_admin pa ON f.id = pa.id_factor
+    JOIN (
+        SELECT id_respuesta
+        FROM ponderacion_admin
+        GROUP BY id_respuesta
+        HAVING COUNT(id_factor) = %s
+    ) rc ON pa.id_respuesta = rc.id_respuesta
+    JOIN respuesta_detalle rd
+        ON rd.id_respuesta = pa.id_respuesta AND rd.id_factor = f.id
+    GROUP BY f.id, f.nombre
+"""
+
+CUBO_COMPLETO_QUERY = """
+    SELECT re.dependencia, re.cargo, r.id_formulario, pa.id_factor,
+           SUM(pa.peso_admin * rd.valor_usuario) AS total
+    FROM ponderacion_admin pa
+    JOIN (
+        SELECT id_respuesta
+        FROM ponderacion_admin
+        GROUP BY id_respuesta
+        HAVING COUNT(id_factor) = %s
+    ) rc ON pa.id_respuesta = rc.id_respuesta
+    JOIN respuesta r ON r.id = pa.id_respuesta
+    JOIN respuesta_estado re ON re.id_respuesta = pa.id_respuesta
+    JOIN respuesta_detalle rd
+        ON rd.id_respuesta = pa.id_respuesta AND rd.id_factor = pa.id_factor
+    GROUP BY re.dependencia, re.cargo, r.id_formulario, pa.id_factor
+"""
+
+# Columnas de ranking_cubo por las que se puede filtrar el desglose
+DIMENSIONES = ("dependencia", "cargo", "id_formulario")
+
+
+def _marcadores(valores):
+    return ", ".join(["%s"] * len(valores))
+
+
+def _ajustar(cursor, condicion, params, signo, cubo=True):
+    cursor.execute(
+        f"""
+        INSERT INTO ranking_factor (id_factor, total, respuestas)
+        SELECT pa.id_factor,
+               %s * SUM(pa.peso_admin * rd.valor_usuario),
+               %s * COUNT(*)
+        FROM ponderacion_admin pa
+        JOIN respuesta_estado re
+            ON re.id_respuesta = pa.id_respuesta AND re.ponderaciones = %s
+        JOIN respuesta_detalle rd
+            ON rd.id_respuesta = pa.id_respuesta AND rd.id_factor = pa.id_factor
+        WHERE {condicion}
+        GROUP BY pa.id_factor
+        ON DUPLICATE KEY UPDATE total = total + VALUES(total),
+                                respuestas = respuestas + VALUES(respuestas)
+        """,
+        (signo, signo, FACTORES_POR_RESPUESTA, *params),
+    )
+    if not cubo:
+        return
+    cursor.execute(
+        f"""
+        INSERT INTO ranking_cubo
+            (dependencia, cargo, id_formulario, id_factor, total, respuestas)
+        SELECT re.dependencia, re.cargo, r.id_formulario, pa.id_factor,
+               %s * SUM(pa.peso_admin * rd.valor_usuario),
+               %s * COUNT(*)
+        FROM ponderacion_admin pa
+        JOIN respuesta_estado re
+            ON re.id_respuesta = pa.id_respuesta AND re.ponderaciones = %s
+        JOIN respuesta r ON r.id = pa.id_respuesta
+        JOIN respuesta_detalle rd
+            ON rd.id_respuesta = pa.id_respuesta AND rd.id_factor = pa.id_factor
+        WHERE {condicion}
+        GROUP BY re.dependencia, re.cargo, r.id_formulario, pa.id_factor
+        ON DUPLICATE KEY UPDATE total = total + VALUES(total),
+                                respuestas = respuestas + VALUES(respuestas)
+        """,
+        (signo, signo, FACTORES_POR_RESPUESTA, *params),
+    )
+
+
+def ajustar_ranking(cursor, ids_respuesta, signo):
+    """Suma (``signo=1``) o resta (``signo=-1``) la aportación de respuestas.
+
+    Solo las respuestas con ponderación completa aportan al ranking; para las
+    demás la sentencia no modifica ninguna fila.
+    """
+    ids = list(ids_respuesta)
+    if not ids:
+        return
+    _ajustar(cursor, f"pa.id_respuesta IN ({_marcadores(ids)})", ids, signo)
+
+
+def retirar_formulario(cursor, id_formulario):
+    """Resta del ranking todas las respuestas completas de un formulario."""
+    _ajustar(
+        cursor,
+        "pa.id_respuesta IN (SELECT id FROM respuesta WHERE id_formulario = %s)",
+        (id_formulario,),
+        -1,
+        cubo=False,
+    )
+    # Las celdas del formulario solo contienen sus respuestas
+    cursor.execute("DELETE FROM ranking_cubo WHERE id_formulario = %s", (id_formulario,))
+
+
+def registrar_respuesta(cursor, id_respuesta, dependencia, cargo):
+    """Crea el estado de una respuesta nueva, todavía sin ponderaciones."""
+    cursor.execute(
+        """
+        INSERT INTO respuesta_estado (id_respuesta, ponderaciones, dependencia, cargo)
+        VALUES (%s, 0, %s, %s)
+        """,
+        (id_respuesta, dependencia or "", cargo or ""),
+    )
+
+
+def actualizar_dimensiones(cursor, id_respuesta, dependencia, cargo):
+    """Anota la dependencia y el cargo con que se desglosa la respuesta.
+
+    Si la respuesta aporta al ranking, hay que restarla antes y sumarla
+    después para que ``ranking_cubo`` la mueva de celda.
+    """
+    cursor.execute(
+        "UPDATE respuesta_estado SET dependencia = %s, cargo = %s WHERE id_respuesta = %s",
+        (dependencia or "", cargo or "", id_respuesta),
+    )
+
+
+def bloquear_estado(cursor, id_respuesta):
+    """Bloquea el estado de la respuesta y lo devuelve (``None`` si no existe).
+
+    La fila trae ``ponderaciones`` y la ``dependencia`` y el ``cargo`` con que
+    la respuesta está sumada en ``ranking_cubo``.
+    """
+    cursor.execute(
+        """
+        SELECT ponderaciones, dependencia, cargo
+        FROM respuesta_estado
+        WHERE id_respuesta = %s
+        FOR UPDATE
+        """,
+        (id_respuesta,),
+    )
+    return cursor.fetchone()
+
+
+def bloquear_estados(cursor, ids_respuesta):
+    """Como :func:`bloquear_estado` para varias respuestas: ``{id: ponderaciones}``."""
+    ids = list(ids_respuesta)
+    if not ids:
+        return {}
+    cursor.execute(
+        f"""
+        SELECT id_respuesta, ponderaciones
+        FROM respuesta_estado
+        WHERE id_respuesta IN ({_marcadores(ids)})
+        FOR UPDATE
+        """,
+        ids,
+    )
+    return {fila["id_respuesta"]: fila["ponderaciones"] for fila in cursor.fetchall()}
+
+
+def actualizar_estado(cursor, ids_respuesta):
+    """Recalcula cuántos factores ponderados tiene cada respuesta indicada.
+
+    También toma la dependencia y el cargo actuales del usuario: al editar una
+    respuesta incompleta no se actualizan, porque no aporta al cubo, y se
+    ponen al día aquí antes de que empiece a aportar. Quien llama ya restó la
+    aportación de las respuestas completas.
+    """
+    ids = list(ids_respuesta)
+    if not ids:
+        return
+    cursor.execute(
+        f"""
+        INSERT INTO respuesta_estado (id_respuesta, ponderaciones, dependencia, cargo)
+        SELECT r.id, COUNT(pa.id_factor),
+               COALESCE(u.dependencia, ''), COALESCE(u.cargo, '')
+        FROM respuesta r
+        JOIN usuario u ON u.id = r.id_usuario
+        LEFT JOIN ponderacion_admin pa ON pa.id_respuesta = r.id
+        WHERE r.id IN ({_marcadores(ids)})
+        GROUP BY r.id, u.dependencia, u.cargo
+        ON DUPLICATE KEY UPDATE ponderaciones = VALUES(ponderaciones),
+                                dependencia = VALUES(dependencia),
+                                cargo = VALUES(cargo)
+        """,
+        ids,
+    )
+
+
+def reiniciar(cursor):
+    """Deja el resumen vacío tras borrar todas las respuestas."""
+    cursor.execute("DELETE FROM respuesta_estado")
+    cursor.execute("UPDATE ranking_factor SET total = 0, respuestas = 0")
+    cursor.execute("DELETE FROM ranking_cubo")
+
+
+def obtener_ranking(cursor):
+    """Lee el ranking y las respuestas incompletas desde las tablas resumen."""
+    cursor.execute(
+        """
+        SELECT id_respuesta
+        FROM respuesta_estado
+        WHERE ponderaciones < %s
+        ORDER BY id_respuesta
+        """,
+        (FACTORES_POR_RESPUESTA,),
+    )
+    incompletas = [row["id_respuesta"] for row in cursor.fetchall()]
+
+    cursor.execute(
+        """
+        SELECT f.nombre, rf.total
+        FROM ranking_factor rf
+        JOIN factor f ON f.id = rf.id_factor
+        WHERE rf.respuestas > %s
+        ORDER BY rf.total DESC
+        """,
+        (0,),
+    )
+    ranking = cursor.fetchall()
+    return ranking, incompletas
+
+
+def obtener_desglose(cursor, filtros):
+    """Ranking de la porción de ``ranking_cubo`` que cumple ``filtros``.
+
+    ``filtros`` asocia columnas de :data:`DIMENSIONES` con su valor. Devuelve
+    ``(ranking, respuestas)``: las filas ``nombre``/``total`` ordenadas y el
+    número de respuestas completas de la porción.
+    """
+    desconocidas = set(filtros) - set(DIMENSIONES)
+    if desconocidas:
+        raise ValueError(f"Dimensiones desconocidas: {', '.join(sorted(desconocidas))}")
+    condiciones = " AND ".join(f"c.{columna} = %s" for columna in filtros) or "1 = 1"
+    cursor.execute(
+        f"""
+        SELECT f.nombre, SUM(c.total) AS total, SUM(c.respuestas) AS respuestas
+        FROM ranking_cubo c
+        JOIN factor f ON f.id = c.id_factor
+        WHERE {condiciones}
+        GROUP BY f.id, f.nombre
+        HAVING SUM(c.respuestas) > 0
+        ORDER BY total DESC
+        """,
+        tuple(filtros.values()),
+    )
+    filas = cursor.fetchall()
+    # Cada respuesta completa suma una a cada uno de sus factores
+    respuestas = max((int(fila["respuestas"]) for fila in filas), default=0)
+    ranking = [{"nombre": fila["nombre"], "total": float(fila["total"])} for fila in filas]
+    return ranking, respuestas
+
+
+def opciones_desglose(cursor):
+    """Dependencias, cargos y formularios con alguna respuesta en el cubo."""
+    cursor.execute(
+        """
+        SELECT c.dependencia, c.cargo, c.id_formulario, fo.nombre
+        FROM ranking_cubo c
+        JOIN formulario fo ON fo.id = c.id_formulario
+        WHERE c.respuestas > %s
+        GROUP BY c.dependencia, c.cargo, c.id_formulario, fo.nombre
+        """,
+        (0,),
+    )
+    filas = cursor.fetchall()
+    formularios = {fila["id_formulario"]: fila["nombre"] for fila in filas}
+    return {
+        "dependencia": sorted({fila["dependencia"] for fila in filas}),
+        "cargo": sorted({fila["cargo"] for fila in filas}),
+        "formulario": [
+            {"id": id_formulario, "nombre": formularios[id_formulario]}
+            for id_formulario in sorted(formularios)
+        ],
+    }
+
+
+def reconstruir(cursor):
+    """Recalcula las tablas resumen desde cero con consultas completas."""
+    cursor.execute("DELETE FROM respuesta_estado")
+    cursor.execute(
+        """
+        INSERT INTO respuesta_estado (id_respuesta, ponderaciones, dependencia, cargo)
+        SELECT r.id, COUNT(pa.id_factor),
+               COALESCE(u.dependencia, ''), COALESCE(u.cargo, '')
+        FROM respuesta r
+        JOIN usuario u ON u.id = r.id_usuario
+        LEFT JOIN ponderacion_admin pa ON pa.id_respuesta = r.id
+        GROUP BY r.id, u.dependencia, u.cargo
+        """
+    )
+    cursor.execute("UPDATE ranking_factor SET total = 0, respuestas = 0")
+    cursor.execute("DELETE FROM ranking_cubo")
+    _ajustar(cursor, "1 = 1", (), 1)
+
+
+def verificar(cursor, tolerancia=1e-6):
+    """Compara las tablas resumen con las consultas completas.
+
+    Devuelve una lista de diferencias legibles; vacía si todo coincide.
+    """
+    diferencias = []
+
+    cursor.execute(INCOMPLETAS_COMPLETA_QUERY, (FACTORES_POR_RESPUESTA,))
+    esperadas = {row["id_respuesta"] for row in cursor.fetchall()}
+    cursor.execute(
+        "SELECT id_respuesta FROM respuesta_estado WHERE ponderaciones < %s",
+        (FACTORES_POR_RESPUESTA,),
+    )
+    resumidas = {row["id_respuesta"] for row in cursor.fetchall()}
+    cursor.execute(
+        """
+        SELECT r.id AS id_respuesta
+        FROM respuesta r
+        LEFT JOIN respuesta_estado re ON re.id_respuesta = r.id
+        WHERE re.id_respuesta IS NULL
+        """
+    )
+    sin_estado = {row["id_respuesta"] for row in cursor.fetchall()}
+    for id_respuesta in sorted(sin_estado):
+        diferencias.append(f"Respuesta {id_respuesta} sin fila en respuesta_estado")
+    for id_respuesta in sorted(esperadas - resumidas - sin_estado):
+        diferencias.append(f"Respuesta {id_respuesta} debería figurar como incompleta")
+    for id_respuesta in sorted(resumidas - esperadas):
+        diferencias.append(f"Respuesta {id_respuesta} figura como incompleta sin serlo")
+
+    cursor.execute(RANKING_COMPLETO_QUERY, (FACTORES_POR_RESPUESTA,))
+    esperado = {row["id_factor"]: (row["nombre"], float(row["total"] or 0))
+                for row in cursor.fetchall()}
+    cursor.execute(
+        "SELECT id_factor, total FROM ranking_factor WHERE respuestas > %s", (0,)
+    )
+    resumido = {row["id_factor"]: float(row["total"] or 0) for row in cursor.fetchall()}
+
+    for id_factor in sorted(set(esperado) | set(resumido)):
+        nombre, total_esperado = esperado.get(id_factor, (f"Factor {id_factor}", 0.0))
+        total_resumen = resumido.get(id_factor, 0.0)
+        if abs(total_esperado - total_resumen) > tolerancia * max(1.0, abs(total_esperado)):
+            diferencias.append(
+                f"{nombre}: resumen {total_resumen:.4f} != consulta {total_esperado:.4f}"
+            )
+
+    def celda(row):
+        return (row["dependencia"], row["cargo"], row["id_formulario"], row["id_factor"])
+
+    cursor.execute(CUBO_COMPLETO_QUERY, (FACTORES_POR_RESPUESTA,))
+    esperado_cubo = {celda(row): float(row["total"] or 0) for row in cursor.fetchall()}
+    cursor.execute(
+        """
+        SELECT dependencia, cargo, id_formulario, id_factor, total
+        FROM ranking_cubo
+        WHERE respuestas > %s
+        """,
+        (0,),
+    )
+    resumido_cubo = {celda(row): float(row["total"] or 0) for row in cursor.fetchall()}
+    for clave in sorted(set(esperado_cubo) | set(resumido_cubo)):
+        total_esperado = esperado_cubo.get(clave, 0.0)
+        total_resumen = resumido_cubo.get(clave, 0.0)
+        if abs(total_esperado - total_resumen) > tolerancia * max(1.0, abs(total_esperado)):
+            dependencia, cargo, id_formulario, id_factor = clave
+            diferencias.append(
+                f"Cubo {dependencia or '-'} / {cargo or '-'} / formulario {id_formulario}"
+                f" / factor {id_factor}: resumen {total_resumen:.4f}"
+                f" != consulta {total_esperado:.4f}"
+            )
+    return diferencias
@@ -0,0 +1,145 @@
+"""Protección contra estampidas al recalcular valores cacheados.
+
+Cuando una entrada de caché expira o se invalida, solo una petición la
+recalcula. Dentro del proceso se serializa con un ``threading.Lock`` y entre
+workers de gunicorn con un ``flock`` sobre un archivo de bloqueo; el resto de
+peticiones espera ese resultado o, durante una ventana de gracia corta, recibe
+el valor anterior. Con un backend de caché compartido (FileSystemCache, Redis…)
+los demás workers reutilizan el resultado; con ``SimpleCache`` al menos nunca
+calculan varios a la vez.
+"""
+
+import fcntl
+import os
+import tempfile
+import threading
+import time
+
+
+class SingleFlight:
+    """Coordina el recálculo de entradas de caché entre hilos y procesos."""
+
+    def __init__(self, cache, directorio=None, espera=10.0, gracia=5.0):
+        self.cache = cache
+        self.directorio = directorio or tempfile.gettempdir()
+        self.espera = espera
+        self.gracia = gracia
+        self._locks = {}
+        self._inicios = {}
+        self._mutex = threading.Lock()
+        self._estadisticas = {
+            "aciertos": 0,
+            "calculos": 0,
+            "esperas": 0,
+            "anteriores": 0,
+        }
+
+    def _contar(self, nombre):
+        with self._mutex:
+            self._estadisticas[nombre] += 1
+
+    def estadisticas(self):
+        """Contadores del proceso; ``ahorrados`` son los recálculos evitados."""
+        with self._mutex:
+            datos = dict(self._estadisticas)
+        datos["ahorrados"] = datos["esperas"] + datos["anteriores"]
+        return datos
+
+    def _lock_local(self, nombre):
+        with self._mutex:
+            return self._locks.setdefault(nombre, threading.Lock())
+
+    def _ruta_lock(self, nombre):
+        return os.path.join(self.directorio, f"form_mc_{nombre}.lock")
+
+    def _en_gracia(self, nombre):
+        """Indica si el cálculo en curso empezó hace menos de ``gracia`` segundos."""
+        inicio = self._inicios.get(nombre)
+        if inicio is None:
+            try:
+                inicio = os.stat(self._ruta_lock(nombre)).st_mtime
+            except OSError:
+                return False
+        return time.time() - inicio < self.gracia
+
+    def _anterior(self, nombre, clave_anterior):
+        if clave_anterior is None or not self._en_gracia(nombre):
+            return None
+        return self.cache.get(clave_anterior)
+
+    def obtener(self, nombre, clave, calcular, clave_anterior=None, timeout=None):
+        """Devuelve ``cache[clave]`` o lo calcula una sola vez con ``calcular()``.
+
+        ``clave_anterior`` guarda el último valor calculado para servirlo
+        mientras otra petición recalcula.
+        """
+        valor = self.cache.get(clave)
+        if valor is not None:
+            self._contar("aciertos")
+            return valor
+
+        lock = self._lock_local(nombre)
+        if not lock.acquire(blocking=False):
+            anterior = self._anterior(nombre, clave_anterior)
+            if anterior is not None:
+                self._contar("anteriores")
+                return anterior
+            if not lock.acquire(timeout=self.espera):
+                # El cálculo en curso se atascó: no bloquear indefinidamente
+                return self._calcular(clave, calcular, clave_anterior, timeout)
+        try:
+            valor = self.cache.get(clave)
+            if valor is not None:
+                self._contar("esperas")
+                return valor
+            return self._calcular_entre_procesos(
+                nombre, clave, calcular, clave_anterior, timeout
+            )
+        finally:
+            lock.release()
+
+    def _calcular_entre_procesos(self, nombre, clave, calcular, clave_anterior, timeout):
+        ruta = self._ruta_lock(nombre)
+        fd = os.open(ruta, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                anterior = self._anterior(nombre, clave_anterior)
+                if anterior is not None:
+                    self._contar("anteriores")
+                    return anterior
+                if not self._esperar_flock(fd):
+                    return self._calcular(clave, calcular, clave_anterior, timeout)
+                valor = self.cache.get(clave)
+                if valor is not None:
+                    self._contar("esperas")
+                    return valor
+
+            # Marcar el inicio para la ventana de gracia de otros procesos
+            os.utime(fd)
+            self._inicios[nombre] = time.time()
+            try:
+                return self._calcular(clave, calcular, clave_anterior, timeout)
+            finally:
+                self._inicios.pop(nombre, None)
+        finally:
+            os.close(fd)
+
+    def _esperar_flock(self, fd):
+        limite = time.monotonic() + self.espera
+        while time.monotonic() < limite:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return True
+            except BlockingIOError:
+                time.sleep(0.01)
+        return False
+
+    def _calcular(self, clave, calcular, clave_anterior, timeout):
+        valor = calcular()
+        self._contar("calculos")
+        self.cache.set(clave, valor, timeout=timeout)
+        if clave_anterior is not None:
+            self.cache.set(clave_anterior, valor, timeout=0)
+        return valor
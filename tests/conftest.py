@@ -0,0 +1,84 @@
+"""Fixtures y ayudas compartidas por las pruebas sobre una base SQLite real."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import db
+import app as app_module
+
+
+@pytest.fixture
+def base_sqlite(monkeypatch, tmp_path):
+    """Base SQLite nueva en ``tmp_path``, con el pool y la caché vacíos.
+
+    El pool se crea con la primera conexión, así que las pruebas pueden
+    ajustar otras variables (``DB_POOL_SIZE``, la réplica) antes de usarla.
+    """
+    monkeypatch.setenv("DB_BACKEND", "sqlite")
+    monkeypatch.setenv("DB_SQLITE_PATH", str(tmp_path / "formularios.db"))
+    monkeypatch.setattr(db, "_pool", None)
+    monkeypatch.setattr(db, "_replica", None)
+    app_module.cache.clear()
+    yield tmp_path
+    app_module.cache.clear()
+
+
+@pytest.fixture
+def cliente_anonimo(base_sqlite):
+    """Cliente de pruebas sin sesión sobre la base SQLite."""
+    with app_module.app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def cliente(cliente_anonimo):
+    """Cliente de pruebas con sesión de administrador sobre la base SQLite."""
+    with cliente_anonimo.session_transaction() as sesion:
+        sesion["is_admin"] = True
+    return cliente_anonimo
+
+
+def consultar(sql, params=()):
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+    finally:
+        conn.close()
+
+
+def ejecutar(sql, params=()):
+    conn = db.get_connection()
+    try:
+        conn.cursor().execute(sql, params)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def responder(
+    client,
+    id_usuario,
+    id_formulario=None,
+    valores=range(10, 0, -1),
+    dependencia="Finanzas",
+    cargo="Jefa",
+):
+    """Envía una respuesta; el formulario por defecto tiene el id del usuario."""
+    datos = {
+        "usuario_id": id_usuario,
+        "formulario_id": id_usuario if id_formulario is None else id_formulario,
+        "nombre": "Ana",
+        "apellidos": "López",
+        "cargo": cargo,
+        "dependencia": dependencia,
+    }
+    for i, valor in enumerate(valores, start=1):
+        datos[f"factor_id_{i}"] = i
+        datos[f"valor_{i}"] = valor
+    return client.post("/guardar_respuesta", data=datos)
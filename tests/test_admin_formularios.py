@@ -9,7 +9,6 @@ import app as app_module
 
 app = app_module.app
 cache = app_module.cache
-RANKING_CACHE_KEY = app_module.RANKING_CACHE_KEY
 
 class DummyCursor:
     def __init__(self, fetchone_results=None):
@@ -56,7 +55,7 @@ def test_reiniciar_formularios_requires_admin(monkeypatch):
 
 def test_reiniciar_formularios(monkeypatch):
     cursor, conn = create_dummy(monkeypatch)
-    cache.set(RANKING_CACHE_KEY, {"ranking": "x", "incompletas": "y"})
+    cache.set(app_module.ranking_cache_key(), {"ranking": "x", "incompletas": "y"})
 
     with app.test_client() as client:
         with client.session_transaction() as sess:
@@ -69,16 +68,19 @@ def test_reiniciar_formularios(monkeypatch):
         ("DELETE FROM ponderacion_admin", None),
         ("DELETE FROM respuesta_detalle", None),
         ("DELETE FROM respuesta", None),
+        ("DELETE FROM respuesta_estado", None),
+        ("UPDATE ranking_factor SET total = 0, respuestas = 0", None),
+        ("DELETE FROM ranking_cubo", None),
     ]
     assert conn.commit_called
-    assert cache.get(RANKING_CACHE_KEY) is None
+    assert cache.get(app_module.ranking_cache_key()) is None
 
 
 def test_eliminar_formulario_invalida_cache(monkeypatch):
     fetchone_results = [{"total": 0}]
     cursor, conn = create_dummy(monkeypatch, fetchone_results=fetchone_results)
 
-    cache.set(RANKING_CACHE_KEY, {"ranking": "cached", "incompletas": "cached"})
+    cache.set(app_module.ranking_cache_key(), {"ranking": "cached", "incompletas": "cached"})
 
     with app.test_client() as client:
         with client.session_transaction() as sess:
@@ -87,11 +89,16 @@ def test_eliminar_formulario_invalida_cache(monkeypatch):
         assert resp.status_code == 302
         assert resp.headers["Location"].endswith("/admin/formularios")
 
+    retirar_query, retirar_params = cursor.queries.pop(1)
+    assert "INSERT INTO ranking_factor" in retirar_query
+    assert "WHERE id_formulario = %s" in retirar_query
+    assert retirar_params == (-1, -1, 10, 1)
     assert cursor.queries == [
         ("SELECT COUNT(*) AS total FROM respuesta WHERE id_formulario = %s", (1,)),
+        ("DELETE FROM ranking_cubo WHERE id_formulario = %s", (1,)),
         ("DELETE FROM respuesta WHERE id_formulario = %s", (1,)),
         ("DELETE FROM asignacion WHERE id_formulario = %s", (1,)),
         ("DELETE FROM formulario WHERE id = %s", (1,)),
     ]
     assert conn.commit_called
-    assert cache.get(RANKING_CACHE_KEY) is None
+    assert cache.get(app_module.ranking_cache_key()) is None
@@ -0,0 +1,94 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import analitica
+import app as app_module
+from conftest import responder
+
+FACTORES = [{"id": i, "nombre": f"F{i}"} for i in (1, 2, 3)]
+
+
+def matriz(valores, pesos=None, incompletas=0):
+    valores = np.array(valores, np.uint8)
+    if pesos is None:
+        pesos = np.full(valores.shape, np.nan, np.float32)
+    return analitica.Matriz(FACTORES, valores, np.array(pesos, np.float32), incompletas)
+
+
+def test_calcular_metricas_basicas():
+    resultado = analitica.calcular(
+        matriz(
+            [[3, 2, 1], [3, 1, 2], [2, 3, 1], [3, 2, 1]],
+            pesos=[[1, 1, 1], [np.nan, 1, 1], [2, 0, 1], [1, 1, 1]],
+            incompletas=1,
+        ),
+        remuestreos=200,
+    )
+    assert resultado["respuestas"] == 4
+    assert resultado["incompletas"] == 1
+    assert resultado["ponderadas"] == 3
+
+    por_nombre = {f["nombre"]: f for f in resultado["factores"]}
+    assert [f["nombre"] for f in resultado["factores"]] == ["F1", "F2", "F3"]
+    assert por_nombre["F1"]["borda"] == 2 + 2 + 1 + 2
+    assert por_nombre["F1"]["rango_medio"] == pytest.approx((1 + 1 + 2 + 1) / 4)
+    assert por_nombre["F3"]["distribucion"] == [0.0, 25.0, 75.0]
+    assert por_nombre["F2"]["ponderado_medio"] == pytest.approx((2 + 0 + 2) / 3)
+    for f in resultado["factores"]:
+        assert f["ic_inferior"] <= f["rango_medio"] <= f["ic_superior"]
+        assert 1 <= f["ic_inferior"] and f["ic_superior"] <= 3
+
+    # W de Kendall: S = (5-8)² + (8-8)² + (11-8)² = 18 → 12·18 / (16·24)
+    assert resultado["kendall_w"] == pytest.approx(12 * 18 / (16 * 24))
+
+
+def test_kendall_w_extremos():
+    assert analitica.kendall_w(np.array([[1, 2, 3]] * 5)) == pytest.approx(1.0)
+    assert analitica.kendall_w(np.array([[1, 2, 3], [3, 2, 1]])) == pytest.approx(0.0)
+    assert analitica.kendall_w(np.array([[1, 2, 3]])) is None
+
+
+def test_bootstrap_reproducible_y_sin_respuestas():
+    datos = matriz([[3, 2, 1], [1, 2, 3], [2, 3, 1]])
+    assert analitica.calcular(datos) == analitica.calcular(datos)
+    vacio = analitica.calcular(matriz(np.zeros((0, 3))))
+    assert vacio["respuestas"] == 0 and vacio["factores"] == []
+
+
+def test_endpoint_carga_y_se_invalida(cliente):
+    vacio = cliente.get("/admin/ranking/analitica").get_json()
+    assert vacio["respuestas"] == 0
+
+    responder(cliente, 1, valores=range(10, 0, -1))
+    responder(cliente, 2, valores=range(10, 0, -1))
+    resp = cliente.get("/admin/ranking/analitica")
+    analisis = resp.get_json()
+    assert analisis["respuestas"] == 2
+    assert analisis["kendall_w"] == pytest.approx(1.0)
+    primero = analisis["factores"][0]
+    assert primero["id_factor"] == 1
+    assert primero["borda"] == 18
+    assert primero["distribucion"][0] == 100.0
+    assert "version" not in analisis
+
+    etag = resp.headers["ETag"]
+    assert cliente.get(
+        "/admin/ranking/analitica", headers={"If-None-Match": etag}
+    ).status_code == 304
+
+    # Editar una respuesta sin ponderar no mueve el ranking, pero sí la analítica
+    responder(cliente, 2, valores=range(1, 11))
+    resp = cliente.get("/admin/ranking/analitica", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.get_json()["kendall_w"] == pytest.approx(0.0)
+
+
+def test_ranking_incluye_bloque_de_analitica(cliente):
+    resp = cliente.get("/admin/ranking")
+    assert b'id="analisisRanking"' in resp.data
+    assert b'data-url="/admin/ranking/analitica"' in resp.data
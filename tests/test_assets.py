@@ -0,0 +1,135 @@
+import gzip
+import json
+import os
+import sys
+
+import pytest
+from flask import Flask, render_template_string
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import assets
+
+CSS = (
+    "body { background: url('../img/fondo.png') no-repeat; }\n"
+    "@font-face { src: url(\"../vendor/fonts/icono.woff2?v=1\") format('woff2'); }\n"
+    "/* relleno para superar el mínimo de compresión */\n" + "/* . */\n" * 60
+)
+
+
+@pytest.fixture
+def construido(tmp_path):
+    origen = tmp_path / "static"
+    (origen / "css").mkdir(parents=True)
+    (origen / "img").mkdir()
+    (origen / "vendor" / "fonts").mkdir(parents=True)
+    (origen / "css" / "main.css").write_text(CSS, encoding="utf-8")
+    (origen / "vendor" / "fonts" / "icono.woff2").write_bytes(b"\x00fuente")
+    if assets.Image is not None:
+        assets.Image.new("RGB", (700, 300), (200, 30, 30)).save(origen / "img" / "fondo.png")
+    else:
+        (origen / "img" / "fondo.png").write_bytes(b"\x89PNG")
+    destino = tmp_path / "dist"
+    manifest = assets.construir(str(origen), str(destino), descargar=False)
+    return destino, manifest
+
+
+def test_construir_versiona_y_precomprime(construido):
+    destino, manifest = construido
+    css = manifest["archivos"]["css/main.css"]
+    assert css.startswith("css/main.") and css.endswith(".css")
+    assert (destino / css).exists()
+    assert gzip.decompress((destino / (css + ".gz")).read_bytes()) == (destino / css).read_bytes()
+    if assets.brotli is not None:
+        assert (destino / (css + ".br")).exists()
+    # Los binarios pequeños no se comprimen
+    fuente = manifest["archivos"]["vendor/fonts/icono.woff2"]
+    assert not (destino / (fuente + ".gz")).exists()
+
+    texto = (destino / css).read_text(encoding="utf-8")
+    assert f"../{manifest['archivos']['img/fondo.png']}" in texto
+    assert f"../{fuente}\"" in texto
+    assert "?v=1" not in texto
+
+    guardado = json.loads((destino / "manifest.json").read_text(encoding="utf-8"))
+    assert guardado == manifest
+
+
+@pytest.mark.skipif(assets.Image is None, reason="requiere Pillow")
+def test_construir_variantes_de_imagen(construido):
+    destino, manifest = construido
+    variantes = manifest["imagenes"]["img/fondo.png"]
+    assert (variantes["ancho"], variantes["alto"]) == (700, 300)
+    for tipo in ("image/webp", "image/avif"):
+        if tipo not in variantes:
+            continue
+        assert [ancho for _, ancho in variantes[tipo]] == [120, 640, 700]
+        assert all((destino / nombre).exists() for nombre, _ in variantes[tipo])
+    texto = (destino / manifest["archivos"]["css/main.css"]).read_text(encoding="utf-8")
+    assert "image-set(" in texto
+
+
+def _app(destino):
+    app = Flask(__name__)
+    assets.registrar(app, assets.Manifest(str(destino / "manifest.json")))
+    return app
+
+
+def test_ruta_asset_sirve_variante_comprimida(construido):
+    destino, manifest = construido
+    css = manifest["archivos"]["css/main.css"]
+    cliente = _app(destino).test_client()
+
+    respuesta = cliente.get(f"/assets/{css}", headers={"Accept-Encoding": "gzip"})
+    assert respuesta.status_code == 200
+    assert respuesta.headers["Content-Encoding"] == "gzip"
+    assert respuesta.mimetype == "text/css"
+    assert "immutable" in respuesta.headers["Cache-Control"]
+    assert "max-age=31536000" in respuesta.headers["Cache-Control"]
+    assert "Accept-Encoding" in respuesta.headers["Vary"]
+    assert gzip.decompress(respuesta.data) == (destino / css).read_bytes()
+
+    if assets.brotli is not None:
+        respuesta = cliente.get(f"/assets/{css}", headers={"Accept-Encoding": "gzip, br"})
+        assert respuesta.headers["Content-Encoding"] == "br"
+        assert assets.brotli.decompress(respuesta.data) == (destino / css).read_bytes()
+
+    respuesta = cliente.get(f"/assets/{css}")
+    assert "Content-Encoding" not in respuesta.headers
+    assert respuesta.data == (destino / css).read_bytes()
+
+
+def test_ruta_asset_no_sale_del_directorio(construido, monkeypatch):
+    destino, _ = construido
+    (destino.parent / "secreto.txt").write_text("fuera de dist")
+    (destino.parent / "secreto.txt.gz").write_bytes(gzip.compress(b"fuera de dist"))
+    cliente = _app(destino).test_client()
+    consultados = []
+    isfile = os.path.isfile
+    monkeypatch.setattr(
+        os.path, "isfile", lambda ruta: consultados.append(ruta) or isfile(ruta)
+    )
+
+    for ruta in ("/assets/..%2Fsecreto.txt", "/assets/%2E%2E/secreto.txt"):
+        respuesta = cliente.get(ruta, headers={"Accept-Encoding": "gzip"})
+        assert respuesta.status_code == 404
+        assert b"fuera de dist" not in respuesta.data
+    # Ni siquiera se comprueba si existen archivos fuera de dist/
+    assert consultados == []
+
+
+def test_asset_url_usa_manifest_o_respaldo(construido, tmp_path):
+    destino, manifest = construido
+    app = _app(destino)
+    with app.test_request_context():
+        url = render_template_string("{{ asset_url('css/main.css') }}")
+        assert url == "/assets/" + manifest["archivos"]["css/main.css"]
+
+    sin_build = _app(tmp_path / "vacio")
+    with sin_build.test_request_context():
+        assert (
+            render_template_string("{{ asset_url('vendor/bootstrap.min.css') }}")
+            == assets.VENDOR["vendor/bootstrap.min.css"]
+        )
+        assert render_template_string("{{ asset_url('css/main.css') }}") == "/static/css/main.css"
+        assert render_template_string("{{ asset_srcset('img/fondo.png', 'image/webp') }}") == ""
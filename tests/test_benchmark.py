@@ -0,0 +1,87 @@
+import json
+import os
+import random
+import subprocess
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from benchmarks import carga
+
+
+def test_percentil_rango_mas_cercano():
+    valores = list(range(1, 101))
+    assert carga.percentil(valores, 50) == 50
+    assert carga.percentil(valores, 95) == 95
+    assert carga.percentil(valores, 99) == 99
+    assert carga.percentil([7], 99) == 7
+    assert carga.percentil([], 50) is None
+
+
+def test_consultas_desde_server_timing():
+    assert carga._consultas('db;dur=3.21;desc="4 queries", app;dur=9.80') == 4
+    assert carga._consultas(None) is None
+    assert carga._sql_ms('db;dur=3.21;desc="4 queries", app;dur=9.80') == 3.21
+    assert carga._sql_ms(None) is None
+
+
+class ClienteFalso:
+    def __init__(self):
+        self.peticiones = []
+
+    def pedir(self, metodo, ruta, datos=None):
+        self.peticiones.append((metodo, ruta, datos))
+        cuerpo = '<input type="hidden" name="formulario_id" value="3">'
+        return 200, cuerpo, 0.002, 3, 0.6
+
+
+def test_evaluador_recorre_el_flujo_y_resume():
+    cliente = ClienteFalso()
+    registro = carga.Registro()
+    carga.evaluador(cliente, [3], random.Random(1), registro, iteraciones=2)
+
+    rutas = [ruta for _, ruta, _ in cliente.peticiones]
+    assert rutas == ["/formulario_redirect", "/formulario/3", "/guardar_respuesta"] * 2
+    datos = cliente.peticiones[2][2]
+    assert datos["formulario_id"] == "3"
+    assert sorted(datos[f"valor_{i}"] for i in range(1, 11)) == list(range(1, 11))
+
+    resumen = registro.resumen(1.0)
+    assert resumen["peticiones"] == 6
+    guardar = resumen["endpoints"]["guardar_respuesta"]
+    assert guardar["peticiones"] == 2
+    assert guardar["p99_ms"] == 2.0
+    assert guardar["consultas_por_peticion"] == 3
+    assert guardar["sql_ms_por_consulta"] == 0.2
+
+
+def test_modo_gunicorn(tmp_path):
+    salida = tmp_path / "gunicorn.json"
+    carga.main([
+        "--gunicorn", "--workers", "1", "--evaluadores", "2", "--administradores", "1",
+        "--iteraciones", "1", "--salida", str(salida),
+    ])
+
+    resultado = json.loads(salida.read_text(encoding="utf-8"))
+    assert resultado["modo"] == "gunicorn"
+    assert resultado["endpoints"]["guardar_respuesta"]["peticiones"] == 2
+    assert resultado["endpoints"]["vista_ranking"]["peticiones"] >= 1
+
+
+def test_gunicorn_caido_muestra_su_error(tmp_path):
+    with open(tmp_path / "gunicorn.log", "w+", encoding="utf-8") as errores:
+        proceso = subprocess.Popen(
+            [sys.executable, "-c", "import sys; sys.exit('configuración inválida')"],
+            stderr=errores,
+        )
+        proceso.wait()
+        with pytest.raises(SystemExit, match="configuración inválida"):
+            carga._esperar_servidor("http://127.0.0.1:9", proceso, errores)
+
+
+def test_preparadas_requiere_un_servidor(capsys):
+    with pytest.raises(SystemExit):
+        carga.main(["--preparadas"])
+    assert "--preparadas requiere --url" in capsys.readouterr().err
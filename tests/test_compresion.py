@@ -0,0 +1,113 @@
+import gzip
+import os
+import sys
+import zlib
+
+import pytest
+from flask import Flask, Response
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import compresion
+
+HTML = "<p>" + "evaluación multicriterio " * 100 + "</p>"
+
+
+@pytest.fixture
+def cliente():
+    app = Flask(__name__)
+    cerrados = []
+
+    @app.route("/html")
+    def html():
+        respuesta = Response(HTML, mimetype="text/html")
+        respuesta.set_etag("abc")
+        respuesta.headers["Cache-Control"] = "no-store, no-cache, must-revalidate"
+        return respuesta
+
+    @app.route("/corto")
+    def corto():
+        return "hola"
+
+    @app.route("/png")
+    def png():
+        return Response(b"\x89PNG" * 500, mimetype="image/png")
+
+    @app.route("/precomprimido")
+    def precomprimido():
+        respuesta = Response(gzip.compress(HTML.encode()), mimetype="text/css")
+        respuesta.headers["Content-Encoding"] = "gzip"
+        return respuesta
+
+    @app.route("/stream")
+    def stream():
+        def generar():
+            for n in range(50):
+                yield f"{n},{'x' * 40}\n"
+
+        respuesta = Response(generar(), mimetype="text/csv")
+        respuesta.call_on_close(lambda: cerrados.append(True))
+        return respuesta
+
+    @app.route("/stream-corto")
+    def stream_corto():
+        return Response(iter(["a,b\n", "1,2\n"]), mimetype="text/csv")
+
+    app.wsgi_app = compresion.Compresion(app.wsgi_app)
+    cliente = app.test_client()
+    cliente.cerrados = cerrados
+    return cliente
+
+
+def test_comprime_html_con_gzip_y_conserva_cabeceras(cliente):
+    respuesta = cliente.get("/html", headers={"Accept-Encoding": "gzip"})
+    assert respuesta.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(respuesta.data).decode() == HTML
+    assert respuesta.headers["Vary"] == "Accept-Encoding"
+    assert respuesta.headers["ETag"] == 'W/"abc"'
+    assert respuesta.headers["Cache-Control"] == "no-store, no-cache, must-revalidate"
+    assert "Content-Length" not in respuesta.headers
+
+
+@pytest.mark.skipif(compresion.brotli is None, reason="requiere brotli")
+def test_prefiere_brotli(cliente):
+    respuesta = cliente.get("/html", headers={"Accept-Encoding": "gzip, deflate, br"})
+    assert respuesta.headers["Content-Encoding"] == "br"
+    assert compresion.brotli.decompress(respuesta.data).decode() == HTML
+
+
+def test_sin_accept_encoding_no_comprime_pero_declara_vary(cliente):
+    respuesta = cliente.get("/html")
+    assert "Content-Encoding" not in respuesta.headers
+    assert respuesta.headers["Vary"] == "Accept-Encoding"
+    assert respuesta.headers["ETag"] == '"abc"'
+    assert respuesta.get_data(as_text=True) == HTML
+
+
+@pytest.mark.parametrize("ruta", ["/corto", "/png", "/stream-corto"])
+def test_no_comprime_respuestas_pequenas_ni_binarias(cliente, ruta):
+    respuesta = cliente.get(ruta, headers={"Accept-Encoding": "gzip, br"})
+    assert "Content-Encoding" not in respuesta.headers
+
+
+def test_no_recomprime_respuestas_precomprimidas(cliente):
+    respuesta = cliente.get("/precomprimido", headers={"Accept-Encoding": "gzip, br"})
+    assert respuesta.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(respuesta.data).decode() == HTML
+
+
+def test_stream_se_comprime_por_fragmentos(cliente):
+    respuesta = cliente.get(
+        "/stream", headers={"Accept-Encoding": "gzip"}, buffered=False
+    )
+    assert respuesta.headers["Content-Encoding"] == "gzip"
+    fragmentos = list(respuesta.response)
+    # Cada fragmento comprimido es decodificable al llegar (sync flush)
+    descompresor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    primero = descompresor.decompress(fragmentos[0]).decode()
+    assert primero.startswith("0,")
+    assert len(fragmentos) > 2
+    resto = b"".join(descompresor.decompress(f) for f in fragmentos[1:])
+    assert (primero + resto.decode()).count("\n") == 50
+    respuesta.close()
+    assert cliente.cerrados == [True]
@@ -0,0 +1,112 @@
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import app as app_module
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_create_app_conserva_endpoints_y_comandos():
+    nueva = app_module.create_app({"SECRET_KEY": "otra", "VERSION_DESPLIEGUE": "v1"})
+    assert nueva is not app_module.app
+    assert nueva.secret_key == "otra"
+
+    def endpoints(aplicacion):
+        return {regla.endpoint: regla.rule for regla in aplicacion.url_map.iter_rules()}
+
+    assert endpoints(nueva) == endpoints(app_module.app)
+    assert endpoints(nueva)["vista_ranking"] == "/admin/ranking"
+    assert {"ranking-resumen", "importar", "generar-datos", "construir-assets"} <= set(
+        nueva.cli.commands
+    )
+
+    with nueva.test_client() as cliente:
+        respuesta = cliente.get("/", headers={"Accept-Encoding": "gzip"})
+        assert respuesta.status_code == 200
+        assert respuesta.headers["Content-Encoding"] == "gzip"
+
+    # El ETag depende de la versión de despliegue de cada aplicación
+    otra = app_module.create_app({"VERSION_DESPLIEGUE": "v2"})
+    with nueva.test_request_context():
+        etag = app_module.calcular_etag("x")
+    with otra.test_request_context():
+        assert app_module.calcular_etag("x") != etag
+
+
+def test_clave_por_defecto_advierte_fuera_de_pruebas(monkeypatch, caplog):
+    monkeypatch.delenv("SECRET_KEY", raising=False)
+    monkeypatch.delenv("FLASK_DEBUG", raising=False)
+    app_module.create_app({"VERSION_DESPLIEGUE": "v1"})
+    assert "SECRET_KEY no está definida" in caplog.text
+
+    caplog.clear()
+    app_module.create_app({"VERSION_DESPLIEGUE": "v1", "TESTING": True})
+    app_module.create_app({"VERSION_DESPLIEGUE": "v1", "SECRET_KEY": "propia"})
+    assert "SECRET_KEY" not in caplog.text
+
+
+def test_importar_no_carga_dependencias_pesadas():
+    codigo = (
+        "import sys, app; app.app; "
+        "print(','.join(m for m in ('numpy', 'bleach') if m in sys.modules))"
+    )
+    salida = subprocess.run(
+        [sys.executable, "-c", codigo], cwd=RAIZ, capture_output=True, text=True, check=True
+    ).stdout.strip()
+    assert salida == ""
+
+
+def test_precargar_importa_los_modulos_diferidos():
+    codigo = (
+        "import sys, app; app.precargar(); "
+        "print(all(m in sys.modules for m in ('numpy', 'bleach')))"
+    )
+    salida = subprocess.run(
+        [sys.executable, "-c", codigo], cwd=RAIZ, capture_output=True, text=True, check=True
+    ).stdout.strip()
+    assert salida == "True"
+
+
+def test_gunicorn_con_preload_arranca_sin_directorio_de_metricas(tmp_path):
+    with socket.socket() as libre:
+        libre.bind(("127.0.0.1", 0))
+        puerto = libre.getsockname()[1]
+    metricas = tmp_path / "metricas"  # no existe todavía
+    entorno = dict(
+        os.environ,
+        DB_BACKEND="sqlite",
+        DB_SQLITE_PATH=str(tmp_path / "app.db"),
+        PROMETHEUS_MULTIPROC_DIR=str(metricas),
+        GUNICORN_BIND=f"127.0.0.1:{puerto}",
+        GUNICORN_WORKERS="1",
+        GUNICORN_PRELOAD="1",
+    )
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"],
+        cwd=RAIZ,
+        env=entorno,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        limite = time.monotonic() + 30
+        estado = None
+        while estado is None and proceso.poll() is None and time.monotonic() < limite:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{puerto}/", timeout=2) as r:
+                    estado = r.status
+            except OSError:
+                time.sleep(0.2)
+        assert proceso.poll() is None, proceso.stderr.read()
+        assert estado == 200
+    finally:
+        proceso.terminate()
+        proceso.wait(timeout=30)
+    assert any(p.suffix == ".db" for p in metricas.iterdir())
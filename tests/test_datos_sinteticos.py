@@ -0,0 +1,72 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import datos_sinteticos
+import db_sqlite
+import ranking
+
+
+@pytest.fixture
+def conexion():
+    pool = db_sqlite.PoolSQLite(":memory:")
+    conn = pool.get_connection()
+    yield conn
+    conn.close()
+
+
+def contar(cursor, tabla):
+    cursor.execute(f"SELECT COUNT(*) AS n FROM {tabla}")
+    return cursor.fetchone()["n"]
+
+
+def huella(cursor):
+    cursor.execute(
+        "SELECT id_respuesta, id_factor, valor_usuario FROM respuesta_detalle"
+        " ORDER BY id_respuesta, id_factor"
+    )
+    return [tuple(fila.values()) for fila in cursor.fetchall()]
+
+
+def test_respeta_restricciones_y_reconstruye_resumen(conexion, monkeypatch):
+    monkeypatch.setattr(datos_sinteticos, "USUARIOS_POR_BLOQUE", 7)
+    cursor = conexion.cursor(dictionary=True)
+    totales = datos_sinteticos.generar(
+        conexion, cursor, usuarios=30, formularios=10, densidad=0.3,
+        completadas=0.7, ponderadas=0.5, semilla=3,
+    )
+
+    assert totales["usuario"] == 30
+    assert totales["asignacion"] == 90
+    assert contar(cursor, "usuario") == 60 + 30
+    assert contar(cursor, "formulario") == 54 + 10
+    assert contar(cursor, "respuesta_detalle") == 10 * totales["respuesta"]
+    assert contar(cursor, "ponderacion_admin") == totales["ponderacion_admin"]
+
+    cursor.execute(
+        "SELECT COUNT(DISTINCT valor_usuario) AS distintos, MIN(valor_usuario) AS minimo,"
+        " MAX(valor_usuario) AS maximo FROM respuesta_detalle GROUP BY id_respuesta"
+    )
+    assert {tuple(f.values()) for f in cursor.fetchall()} == {(10, 1, 10)}
+    assert ranking.verificar(cursor) == []
+
+
+def test_semilla_fija_es_reproducible():
+    huellas = []
+    for _ in range(2):
+        conn = db_sqlite.PoolSQLite(":memory:").get_connection()
+        cursor = conn.cursor(dictionary=True)
+        datos_sinteticos.generar(conn, cursor, usuarios=5, formularios=4, semilla=11)
+        huellas.append(huella(cursor))
+        conn.close()
+    assert huellas[0] == huellas[1] and huellas[0]
+
+
+def test_parametros_fuera_de_rango(conexion):
+    with pytest.raises(datos_sinteticos.ParametrosInvalidos):
+        datos_sinteticos.generar(
+            conexion, conexion.cursor(dictionary=True), 1, 1, densidad=2
+        )
@@ -0,0 +1,222 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import db
+
+
+class FakeConnection:
+    def __init__(self, pool):
+        self.pool = pool
+
+    def close(self):
+        self.pool.devueltas += 1
+
+
+class FakeMySQLPool:
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.pool_name = kwargs["pool_name"]
+        self.pool_size = kwargs["pool_size"]
+        self.devueltas = 0
+
+    def get_connection(self):
+        return FakeConnection(self)
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    for nombre, valor in {
+        "DB_HOST": "localhost",
+        "DB_USER": "u",
+        "DB_PASSWORD": "p",
+        "DB_NAME": "sistema_formularios",
+        "DB_POOL_SIZE": "2",
+        "DB_POOL_NAME": "pool_prueba",
+        "DB_POOL_TIMEOUT": "0.05",
+        "DB_POOL_MAX_WAITERS": "1",
+    }.items():
+        monkeypatch.setenv(nombre, valor)
+    monkeypatch.setattr(db.pooling, "MySQLConnectionPool", FakeMySQLPool)
+    monkeypatch.setattr(db, "_pool", None)
+    monkeypatch.setattr(db, "_replica", None)
+    db.init_pool()
+    return db._pool
+
+
+def test_configuracion_desde_entorno(pool):
+    assert pool._pool.kwargs["pool_size"] == 2
+    assert pool._pool.kwargs["pool_name"] == "pool_prueba"
+    assert pool.espera == 0.05
+
+
+def test_espera_y_estadisticas(pool):
+    primera = db.get_connection()
+    segunda = db.get_connection()
+    assert db.estadisticas_pool()["en_uso"] == 2
+
+    # El pool agotado espera en lugar de fallar de inmediato
+    threading.Timer(0.01, primera.close).start()
+    tercera = db.get_connection()
+    estadisticas = db.estadisticas_pool()
+    assert estadisticas["agotado"] == 1
+    assert estadisticas["espera_max"] > 0
+    assert estadisticas["prestamos"] == 3
+
+    with pytest.raises(db.PoolAgotado):
+        db.get_connection()
+    assert db.estadisticas_pool()["timeouts"] == 1
+
+    segunda.close()
+    segunda.close()  # cerrar dos veces no libera dos lugares
+    tercera.close()
+    estadisticas = db.estadisticas_pool()
+    assert estadisticas["en_uso"] == 0
+    assert estadisticas["libres"] == 2
+    assert pool._pool.devueltas == 3
+
+
+def test_cola_de_espera_acotada(pool):
+    ocupadas = [db.get_connection(), db.get_connection()]
+    errores = []
+    esperando = threading.Thread(
+        target=lambda: errores.append(pytest.raises(db.PoolAgotado, db.get_connection))
+    )
+    esperando.start()
+    limite = time.monotonic() + 2
+    while db.estadisticas_pool()["esperando"] == 0 and time.monotonic() < limite:
+        time.sleep(0.001)
+    with pytest.raises(db.PoolAgotado, match="Cola de espera"):
+        db.get_connection()
+    esperando.join()
+    assert db.estadisticas_pool()["rechazos"] == 1
+    for conexion in ocupadas:
+        conexion.close()
+
+
+def test_pool_agotado_responde_503(monkeypatch):
+    import app as app_module
+
+    def agotado():
+        raise db.PoolAgotado("sin conexiones")
+
+    monkeypatch.setattr(app_module, "get_connection", agotado)
+    with app_module.app.test_client() as client:
+        resp = client.get("/formulario/1")
+    assert resp.status_code == 503
+    assert resp.headers["Retry-After"] == "1"
+
+
+def test_error_de_configuracion_se_registra_sin_importar_app(monkeypatch, caplog):
+    monkeypatch.setenv("DB_BACKEND", "oracle")
+    monkeypatch.setattr(db, "_pool", None)
+    with pytest.raises(SystemExit):
+        db.init_pool()
+    assert "DB_BACKEND desconocido: oracle" in caplog.text
+
+
+def test_reiniciar_pool_descarta_el_heredado(pool):
+    heredado = db._pool
+    db.reiniciar_pool()
+    assert db._pool is not heredado
+    assert db._pool._pool.kwargs["pool_name"] == "pool_prueba"
+
+
+def test_preparadas_desactivan_reset_session(pool, monkeypatch):
+    assert pool._pool.kwargs["pool_reset_session"] is True
+    monkeypatch.setenv("DB_PREPARADAS", "1")
+    db.reiniciar_pool()
+    assert db._pool._pool.kwargs["pool_reset_session"] is False
+    assert db.get_connection().preparadas
+
+
+class FisicaFalsa:
+    def __init__(self):
+        self.connection_id = 7
+        self.preparaciones = []
+        self.cerrados = 0
+
+
+class CursorFalso:
+    def __init__(self, fisica, preparado):
+        self.fisica = fisica
+        self.preparado = preparado
+        self.ejecutada = None
+
+    def execute(self, query, params=None):
+        # Como MySQLCursorPrepared: otro objeto str vuelve a preparar
+        if self.preparado and query is not self.ejecutada:
+            self.fisica.preparaciones.append(query)
+        self.ejecutada = query
+
+    def fetchall(self):
+        return [{"preparado": self.preparado}]
+
+    def close(self):
+        self.fisica.cerrados += 1
+
+
+class PrestadaFalsa:
+    preparadas = True
+
+    def __init__(self, fisica):
+        self._cnx = fisica
+
+    @property
+    def connection_id(self):
+        return self._cnx.connection_id
+
+    def cursor(self, prepared=False, dictionary=False):
+        assert dictionary
+        return CursorFalso(self._cnx, prepared)
+
+
+def test_cursor_preparado_reutiliza_sentencias_entre_prestamos(monkeypatch):
+    monkeypatch.setenv("DB_PREPARADAS_MAX", "2")
+    fisica = FisicaFalsa()
+    tabla = "factor"
+
+    for _ in range(3):
+        cursor = db.cursor_diccionario(PrestadaFalsa(fisica))
+        # Texto igual en objetos distintos, como en cada llamada a una vista
+        cursor.execute(f"SELECT * FROM {tabla} WHERE id = %s", (1,))
+        assert cursor.fetchall() == [{"preparado": True}]
+        cursor.execute("SELECT * FROM factor WHERE id IN (%s, %s)", (1, 2))
+        assert cursor.fetchall() == [{"preparado": False}]
+        cursor.close()
+    assert fisica.preparaciones == ["SELECT * FROM factor WHERE id = %s"]
+    assert fisica.cerrados == 3  # solo los cursores de texto
+
+    cursor = db.cursor_diccionario(PrestadaFalsa(fisica))
+    cursor.execute("SELECT 1 FROM usuario WHERE id = %s", (1,))
+    cursor.execute("SELECT 1 FROM respuesta WHERE id = %s", (1,))
+    assert fisica.cerrados == 4  # la menos usada sale de la caché
+    assert len(db.cache_sentencias(cursor._conexion)) == 2
+
+    fisica.connection_id = 8  # el pool reconectó: los handles ya no existen
+    cursor = db.cursor_diccionario(PrestadaFalsa(fisica))
+    cursor.execute("SELECT 1 FROM respuesta WHERE id = %s", (1,))
+    assert len(fisica.preparaciones) == 4
+    assert fisica.cerrados == 4
+
+
+def test_replica_mysql_hereda_la_configuracion(pool, monkeypatch):
+    assert not db.hay_replica()
+    monkeypatch.setenv("DB_REPLICA_HOST", "replica.local")
+    monkeypatch.setenv("DB_REPLICA_PORT", "3307")
+    db.reiniciar_pool()
+    assert db.hay_replica()
+    conexion = db.get_connection(solo_lectura=True)
+    assert conexion.solo_lectura
+    conexion.close()
+    kwargs = db._replica.pool._pool.kwargs
+    assert kwargs["host"] == "replica.local" and kwargs["port"] == 3307
+    assert kwargs["user"] == "u" and kwargs["database"] == "sistema_formularios"
+    assert kwargs["pool_name"] == "pool_prueba_replica"
+    assert db._pool._pool.kwargs["host"] == "localhost"
+    assert not db.get_connection().solo_lectura
@@ -0,0 +1,129 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import db
+import ranking
+import app as app_module
+import conftest
+from conftest import consultar
+
+
+def responder(client, id_usuario, dependencia, cargo):
+    # Los usuarios impares ordenan los factores al revés que los pares
+    valores = range(10, 0, -1) if id_usuario % 2 else range(1, 11)
+    return conftest.responder(
+        client, id_usuario, valores=valores, dependencia=dependencia, cargo=cargo
+    )
+
+
+def ponderar(client, id_usuario, peso):
+    id_respuesta = consultar(
+        "SELECT id FROM respuesta WHERE id_usuario = %s", (id_usuario,)
+    )[0]["id"]
+    datos = {"id_respuesta": id_respuesta}
+    datos.update({f"ponderacion_{i}": str(peso) for i in range(1, 11)})
+    resp = client.post("/admin/ponderar", data=datos)
+    # Un flash pendiente desactiva el ETag hasta que una página lo muestra
+    with client.session_transaction() as sesion:
+        sesion.pop("_flashes", None)
+    return resp
+
+
+def desglose(client, consulta=""):
+    return client.get("/admin/ranking/desglose" + consulta).get_json()
+
+
+def totales(datos):
+    return {fila["nombre"]: fila["total"] for fila in datos["ranking"]}
+
+
+def sin_diferencias():
+    conn = db.get_connection()
+    try:
+        return ranking.verificar(conn.cursor(dictionary=True)) == []
+    finally:
+        conn.close()
+
+
+def test_porciones_suman_el_ranking_global(cliente):
+    responder(cliente, 1, "Finanzas", "Jefa")
+    responder(cliente, 2, "Finanzas", "Analista")
+    responder(cliente, 3, "Obras", "Jefa")
+    for id_usuario, peso in ((1, 1), (2, 2), (3, 3)):
+        ponderar(cliente, id_usuario, peso)
+
+    completo = desglose(cliente)
+    assert completo["respuestas"] == 3
+    assert completo["filtros"] == {}
+    assert completo["opciones"]["dependencia"] == ["Finanzas", "Obras"]
+    assert completo["opciones"]["cargo"] == ["Analista", "Jefa"]
+    assert [f["id"] for f in completo["opciones"]["formulario"]] == [1, 2, 3]
+    global_ = {
+        fila["nombre"]: fila["total"]
+        for fila in consultar(
+            "SELECT f.nombre, rf.total FROM ranking_factor rf JOIN factor f ON f.id = rf.id_factor"
+        )
+    }
+    assert totales(completo) == pytest.approx(global_)
+
+    finanzas = desglose(cliente, "?dependencia=Finanzas")
+    obras = desglose(cliente, "?dependencia=Obras")
+    assert finanzas["respuestas"] == 2 and obras["respuestas"] == 1
+    for nombre, total in global_.items():
+        assert totales(finanzas)[nombre] + totales(obras)[nombre] == pytest.approx(total)
+
+    jefas = desglose(cliente, "?cargo=Jefa&dependencia=Finanzas")
+    assert jefas["respuestas"] == 1
+    assert jefas["filtros"] == {"dependencia": "Finanzas", "cargo": "Jefa"}
+    assert totales(jefas) == totales(desglose(cliente, "?formulario=1"))
+    assert desglose(cliente, "?dependencia=")["ranking"] == []
+    assert sin_diferencias()
+
+
+def test_editar_dependencia_mueve_la_respuesta(cliente):
+    responder(cliente, 1, "Finanzas", "Jefa")
+    ponderar(cliente, 1, 2)
+    antes = totales(desglose(cliente, "?dependencia=Finanzas"))
+
+    responder(cliente, 1, "Obras", "Jefa")
+    assert desglose(cliente, "?dependencia=Finanzas")["ranking"] == []
+    assert totales(desglose(cliente, "?dependencia=Obras")) == pytest.approx(antes)
+    assert sin_diferencias()
+
+
+def test_desglose_etag_y_validacion(cliente):
+    responder(cliente, 1, "Finanzas", "Jefa")
+    ponderar(cliente, 1, 1)
+    resp = cliente.get("/admin/ranking/desglose?cargo=Jefa")
+    etag = resp.headers["ETag"]
+    assert cliente.get(
+        "/admin/ranking/desglose?cargo=Jefa", headers={"If-None-Match": etag}
+    ).status_code == 304
+    # Otro filtro es otro recurso
+    assert cliente.get(
+        "/admin/ranking/desglose?cargo=Analista", headers={"If-None-Match": etag}
+    ).status_code == 200
+
+    ponderar(cliente, 1, 2)
+    assert cliente.get(
+        "/admin/ranking/desglose?cargo=Jefa", headers={"If-None-Match": etag}
+    ).status_code == 200
+
+    assert cliente.get("/admin/ranking/desglose?formulario=x").status_code == 400
+    assert b'id="desglose"' in cliente.get("/admin/ranking").data
+
+
+def test_respuesta_incompleta_toma_la_dependencia_al_completarse(cliente):
+    responder(cliente, 1, "Finanzas", "Jefa")
+    # Sin ponderar no aporta al cubo: editarla no toca respuesta_estado
+    responder(cliente, 1, "Obras", "Analista")
+    ponderar(cliente, 1, 2)
+    assert desglose(cliente, "?dependencia=Finanzas")["ranking"] == []
+    obras = desglose(cliente, "?dependencia=Obras&cargo=Analista")
+    assert obras["respuestas"] == 1
+    assert consultar("SELECT COUNT(*) AS n FROM respuesta_estado")[0]["n"] == 1
+    assert sin_diferencias()
@@ -0,0 +1,147 @@
+import csv
+import io
+import os
+import sys
+import zipfile
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import db
+import app as app_module
+import exportacion
+
+app = app_module.app
+
+FACTORES = [{"id": 1, "nombre": "F1"}, {"id": 2, "nombre": "F2"}]
+
+
+class DummyCursor:
+    def __init__(self, fetchall_results, filas):
+        self.queries = []
+        self.fetchall_results = fetchall_results
+        self.filas = filas
+
+    def execute(self, query, params=None):
+        self.queries.append((query, params))
+
+    def fetchall(self):
+        return self.fetchall_results.pop(0)
+
+    def fetchmany(self, size):
+        lote, self.filas = self.filas[:size], self.filas[size:]
+        return lote
+
+    def close(self):
+        pass
+
+
+class DummyConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def cursor(self, dictionary=True):
+        return self._cursor
+
+    def close(self):
+        pass
+
+
+def filas_largas(ids):
+    filas = []
+    for i in ids:
+        for id_factor in (1, 2):
+            filas.append(
+                {
+                    "id_respuesta": i,
+                    "fecha_respuesta": datetime(2025, 3, 1, 12, 0),
+                    "id_usuario": 100 + i,
+                    "nombre": "José",
+                    "apellidos": "Pérez",
+                    "cargo": "Jefe",
+                    "dependencia": "Finanzas",
+                    "id_formulario": 1,
+                    "formulario": "Formulario 01",
+                    "id_factor": id_factor,
+                    "valor_usuario": id_factor,
+                    "peso_admin": None if i == 3 else 10 - id_factor,
+                }
+            )
+    return filas
+
+
+def exportar(monkeypatch, url, filas):
+    cursor = DummyCursor([FACTORES], filas)
+    conn = DummyConnection(cursor)
+    monkeypatch.setattr(db, "get_connection", lambda: conn)
+    monkeypatch.setattr(app_module, "get_connection", lambda: conn)
+    app_module.cache.clear()
+    with app.test_client() as client:
+        with client.session_transaction() as sess:
+            sess["is_admin"] = True
+        resp = client.get(url)
+        assert resp.is_streamed
+        datos = resp.get_data()
+    return resp, datos, cursor
+
+
+def test_filas_anchas_une_respuestas_partidas_entre_lotes(monkeypatch):
+    monkeypatch.setattr(exportacion, "TAM_LOTE", 3)
+    cursor = DummyCursor([], filas_largas([1, 2, 3]))
+    lotes = list(exportacion.filas_anchas(cursor, FACTORES))
+    filas = [fila for lote in lotes for fila in lote]
+    assert [fila[0] for fila in filas] == [1, 2, 3]
+    assert filas[0][-4:] == [1, 2, 9, 8]
+    assert filas[2][-4:] == [1, 2, None, None]
+
+
+def test_construir_consulta_aplica_filtros():
+    sql, params = exportacion.construir_consulta(
+        id_formulario=2,
+        dependencia="Finanzas",
+        desde=datetime(2025, 1, 1),
+        hasta=datetime(2025, 1, 31),
+    )
+    assert "r.id_formulario = %s AND u.dependencia = %s" in sql
+    assert "r.fecha_respuesta < %s" in sql
+    assert params == (2, "Finanzas", datetime(2025, 1, 1), datetime(2025, 2, 1))
+
+    sql, params = exportacion.construir_consulta()
+    assert "WHERE" not in sql and params == ()
+
+
+def test_exportar_csv(monkeypatch):
+    resp, datos, cursor = exportar(
+        monkeypatch, "/admin/exportar?formato=csv&dependencia=Finanzas", filas_largas([1, 2, 3])
+    )
+    assert resp.status_code == 200
+    assert resp.mimetype == "text/csv"
+    assert "attachment" in resp.headers["Content-Disposition"]
+    texto = datos.decode("utf-8-sig")
+    filas = list(csv.reader(io.StringIO(texto)))
+    assert filas[0][-4:] == ["valor_1", "valor_2", "peso_1", "peso_2"]
+    assert len(filas) == 4
+    assert filas[1][3] == "José"
+    assert filas[3][-2:] == ["", ""]
+    query, params = cursor.queries[-1]
+    assert "ORDER BY r.id" in query
+    assert params == ("Finanzas",)
+
+
+def test_exportar_xlsx(monkeypatch):
+    resp, datos, _ = exportar(monkeypatch, "/admin/exportar?formato=xlsx", filas_largas([1, 2]))
+    assert resp.status_code == 200
+    with zipfile.ZipFile(io.BytesIO(datos)) as libro:
+        assert libro.testzip() is None
+        hoja = libro.read("xl/worksheets/sheet1.xml").decode("utf-8")
+    assert hoja.count("<row>") == 3
+    assert "José" in hoja and "valor_2" in hoja
+
+
+def test_exportar_formato_invalido(monkeypatch):
+    monkeypatch.setattr(db, "get_connection", lambda: None)
+    with app.test_client() as client:
+        with client.session_transaction() as sess:
+            sess["is_admin"] = True
+        assert client.get("/admin/exportar?formato=pdf").status_code == 400
+        assert client.get("/admin/exportar?desde=ayer").status_code == 400
@@ -0,0 +1,85 @@
+import multiprocessing
+import os
+import sys
+
+from cachelib import SimpleCache
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from generaciones import Generaciones
+
+
+def _worker(ruta, tubo):
+    """Simula un worker de gunicorn con su propia caché en memoria."""
+    generaciones = Generaciones(ruta)
+    cache = SimpleCache()
+    calculos = 0
+    while True:
+        orden = tubo.recv()
+        if orden == "fin":
+            break
+        if orden == "invalidar":
+            generaciones.incrementar("ranking")
+            tubo.send(None)
+            continue
+        clave = generaciones.clave("ranking_cache", "ranking")
+        valor = cache.get(clave)
+        if valor is None:
+            calculos += 1
+            valor = calculos
+            cache.set(clave, valor)
+        tubo.send(valor)
+
+
+def _pedir(tubo, orden="leer"):
+    tubo.send(orden)
+    return tubo.recv()
+
+
+def test_invalidacion_visible_en_otros_procesos(tmp_path):
+    ruta = str(tmp_path / "generaciones")
+    ctx = multiprocessing.get_context("fork")
+    tubos, procesos = [], []
+    for _ in range(2):
+        padre, hijo = ctx.Pipe()
+        proceso = ctx.Process(target=_worker, args=(ruta, hijo))
+        proceso.start()
+        tubos.append(padre)
+        procesos.append(proceso)
+    worker_a, worker_b = tubos
+    try:
+        # Cada worker calcula una vez y después sirve desde su caché
+        assert _pedir(worker_a) == 1
+        assert _pedir(worker_a) == 1
+        assert _pedir(worker_b) == 1
+        assert _pedir(worker_b) == 1
+
+        # Una escritura en A invalida la caché de B sin esperar al TTL
+        _pedir(worker_a, "invalidar")
+        assert _pedir(worker_b) == 2
+        assert _pedir(worker_a) == 2
+    finally:
+        for tubo in tubos:
+            tubo.send("fin")
+        for proceso in procesos:
+            proceso.join(timeout=5)
+
+
+def test_archivo_nuevo_inicia_contadores(tmp_path):
+    ruta = str(tmp_path / "generaciones")
+    primero = Generaciones(ruta)
+    segundo = Generaciones(ruta)
+    inicial = primero.actual("factores")
+    assert inicial > 0
+    assert segundo.incrementar("factores") == inicial + 1
+    assert primero.actual("factores") == inicial + 1
+    assert primero.actual("ranking") == inicial
+
+
+def test_tras_fork_reabre_el_archivo(tmp_path):
+    generaciones = Generaciones(str(tmp_path / "generaciones"))
+    inicial = generaciones.incrementar("ranking")
+    generaciones.tras_fork()
+    assert generaciones._fd is None and generaciones._mmap is None
+    assert generaciones.incrementar("ranking") == inicial + 1
+    assert generaciones._fd is not None
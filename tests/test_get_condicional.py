@@ -0,0 +1,142 @@
+import os
+import re
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import app as app_module
+from conftest import ejecutar, responder
+
+
+@pytest.fixture
+def cliente(cliente_anonimo):
+    return cliente_anonimo
+
+
+def consultas(resp):
+    return int(re.search(r'desc="(\d+) queries"', resp.headers["Server-Timing"]).group(1))
+
+
+def test_formulario_304_con_una_consulta(cliente):
+    primera = cliente.get("/formulario/5")
+    etag = primera.headers["ETag"]
+    assert primera.headers["Cache-Control"] == "private, no-cache"
+
+    resp = cliente.get("/formulario/5", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.data == b""
+    assert resp.headers["ETag"] == etag
+    assert consultas(resp) == 1
+
+    # El ETag débil que deja la compresión también se acepta
+    resp = cliente.get("/formulario/5", headers={"If-None-Match": "W/" + etag})
+    assert resp.status_code == 304
+
+
+def test_formulario_etag_cambia_con_los_datos(cliente):
+    etag = cliente.get("/formulario/5").headers["ETag"]
+
+    responder(cliente, 5, 5)
+    resp = cliente.get("/formulario/5", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    etag = resp.headers["ETag"]
+
+    # Editar la respuesta actualiza fecha_respuesta
+    ejecutar(
+        "UPDATE respuesta SET fecha_respuesta = '2030-01-01 00:00:00' WHERE id_usuario = %s",
+        (5,),
+    )
+    resp = cliente.get("/formulario/5", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    etag = resp.headers["ETag"]
+
+    app_module.invalidate_factores_cache()
+    assert cliente.get("/formulario/5", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_reenviar_en_el_mismo_segundo_cambia_el_etag(cliente):
+    responder(cliente, 5, 5, range(1, 11))
+    # fecha_respuesta no cambia dentro del mismo segundo
+    ejecutar("UPDATE respuesta SET fecha_respuesta = '2030-01-01 00:00:00'")
+    previa = cliente.get("/formulario/5")
+    etag = previa.headers["ETag"]
+
+    responder(cliente, 5, 5, range(10, 0, -1))
+    ejecutar("UPDATE respuesta SET fecha_respuesta = '2030-01-01 00:00:00'")
+    resp = cliente.get("/formulario/5", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.headers["ETag"] != etag
+    assert resp.data != previa.data
+
+
+def test_formulario_con_flash_no_se_revalida(cliente):
+    etag = cliente.get("/formulario/5").headers["ETag"]
+    with cliente.session_transaction() as sesion:
+        sesion["_flashes"] = [("message", "Faltan datos para el factor 1.")]
+    resp = cliente.get("/formulario/5", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert "ETag" not in resp.headers
+    assert b"Faltan datos" in resp.data
+
+
+def test_ranking_304_sin_consultas(cliente):
+    with cliente.session_transaction() as sesion:
+        sesion["is_admin"] = True
+    primera = cliente.get("/admin/ranking")
+    etag = primera.headers["ETag"]
+    assert primera.headers["Cache-Control"] == "private, no-cache, must-revalidate"
+
+    resp = cliente.get("/admin/ranking", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert consultas(resp) == 0
+    assert resp.headers["Cache-Control"] == "private, no-cache, must-revalidate"
+
+    app_module.invalidate_ranking_cache()
+    resp = cliente.get("/admin/ranking", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.headers["ETag"] != etag
+
+
+def test_ranking_sin_sesion_no_revalida(cliente):
+    with cliente.session_transaction() as sesion:
+        sesion["is_admin"] = True
+    etag = cliente.get("/admin/ranking").headers["ETag"]
+    with cliente.session_transaction() as sesion:
+        sesion.clear()
+    resp = cliente.get("/admin/ranking", headers={"If-None-Match": etag})
+    assert resp.status_code == 302
+
+
+def test_otras_paginas_admin_siguen_sin_cache(cliente):
+    with cliente.session_transaction() as sesion:
+        sesion["is_admin"] = True
+    resp = cliente.get("/admin")
+    assert resp.headers["Cache-Control"] == "no-store, no-cache, must-revalidate"
+
+
+def test_detalle_respuesta_usa_el_ranking_cacheado(cliente):
+    with cliente.session_transaction() as sesion:
+        sesion["is_admin"] = True
+    responder(cliente, 1, 1)
+    responder(cliente, 2, 2)
+    datos = {"id_respuesta": 1}
+    datos.update({f"ponderacion_{i}": "1" for i in range(1, 11)})
+    cliente.post("/admin/ponderar", data=datos)
+    # Solo una ponderación en la respuesta 2: no cuenta en el ranking
+    cliente.post("/admin/ponderar", data={"id_respuesta": 2, "ponderacion_1": "10"})
+
+    resp = cliente.get("/admin/respuesta/2")
+    assert consultas(resp) == 2
+    pagina = resp.get_data(as_text=True)
+    assert 'data-url="/admin/ranking/datos"' in pagina
+    assert "Ponderaciones guardadas correctamente." in pagina
+
+    resp = cliente.get("/admin/ranking/datos")
+    panel = resp.get_json()
+    assert panel["respuestas"] == 2 and panel["incompletas"] == 1
+    assert panel["ranking"][0] == {"nombre": "Factor 1", "total": 10.0}
+    resp = cliente.get("/admin/ranking/datos", headers={"If-None-Match": resp.headers["ETag"]})
+    assert resp.status_code == 304
+    assert consultas(resp) == 0
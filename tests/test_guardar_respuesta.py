@@ -0,0 +1,180 @@
+import os
+import sqlite3
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import db
+import app as app_module
+
+app = app_module.app
+cache = app_module.cache
+
+
+class DummyCursor:
+    def __init__(self, rowcounts, fetchone_results=None):
+        self.queries = []
+        self.rowcounts = rowcounts
+        self.fetchone_results = fetchone_results or []
+        self.rowcount = -1
+        self.lastrowid = 99
+
+    def execute(self, query, params=None):
+        self.queries.append((query, params))
+        self.rowcount = self.rowcounts.pop(0) if self.rowcounts else 1
+
+    def fetchone(self):
+        return self.fetchone_results.pop(0)
+
+    def close(self):
+        pass
+
+
+class DummyConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.commit_called = False
+
+    def cursor(self, dictionary=True):
+        return self._cursor
+
+    def commit(self):
+        self.commit_called = True
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def formulario():
+    data = {
+        "usuario_id": "5",
+        "formulario_id": "3",
+        "nombre": "Ana",
+        "apellidos": "López",
+        "cargo": "Jefa",
+        "dependencia": "Planeación",
+    }
+    for i in range(1, 11):
+        data[f"factor_id_{i}"] = str(i)
+        data[f"valor_{i}"] = str(11 - i)
+    return data
+
+
+def enviar(monkeypatch, cursor):
+    conn = DummyConnection(cursor)
+    monkeypatch.setattr(db, "get_connection", lambda: conn)
+    monkeypatch.setattr(app_module, "get_connection", lambda: conn)
+    with app.test_client() as client:
+        resp = client.post("/guardar_respuesta", data=formulario())
+    assert resp.status_code == 200
+    assert conn.commit_called
+    return [q for q, _ in cursor.queries]
+
+
+def test_respuesta_nueva(monkeypatch):
+    # UPDATE usuario, upsert respuesta (rowcount 1: insertada), estado, detalles
+    cursor = DummyCursor(rowcounts=[1, 1, 1, 10])
+    clave = app_module.ranking_cache_key()
+    cache.set(clave, {"ranking": []})
+
+    queries = enviar(monkeypatch, cursor)
+
+    assert len(queries) == 4
+    assert "ON DUPLICATE KEY UPDATE id = LAST_INSERT_ID(id)" in queries[1]
+    assert "INSERT INTO respuesta_estado" in queries[2]
+    assert cursor.queries[2][1] == (99, "Planeación", "Jefa")
+    assert queries[3].count("(%s, %s, %s)") == 10
+    assert not any("DELETE" in q or "FOR UPDATE" in q for q in queries)
+    detalles = cursor.queries[3][1]
+    assert detalles[:3] == [99, 1, 10]
+    assert cache.get(clave) is None
+
+
+def test_reenvio_incompleto_no_invalida_ranking(monkeypatch):
+    # La respuesta ya existía (rowcount 2) y no está ponderada por completo:
+    # ni ajustes del ranking ni actualización de dimensiones
+    cursor = DummyCursor(
+        rowcounts=[1, 2],
+        fetchone_results=[{"ponderaciones": 4, "dependencia": "Otra", "cargo": "Jefa"}],
+    )
+    clave = app_module.ranking_cache_key()
+    cache.set(clave, {"ranking": []})
+
+    queries = enviar(monkeypatch, cursor)
+
+    assert len(queries) == 4
+    assert "FOR UPDATE" in queries[2]
+    assert "REPLACE INTO respuesta_detalle" in queries[3]
+    assert cache.get(clave) == {"ranking": []}
+
+
+def test_reenvio_sin_cambios_en_el_mismo_segundo(monkeypatch):
+    # MySQL informa 0 filas si el upsert no cambió nada: la respuesta existía
+    cursor = DummyCursor(
+        rowcounts=[1, 0],
+        fetchone_results=[{"ponderaciones": 0, "dependencia": "", "cargo": ""}],
+    )
+    queries = enviar(monkeypatch, cursor)
+    assert not any("INSERT INTO respuesta_estado" in q for q in queries)
+
+
+def test_reenvio_completo_ajusta_ranking(monkeypatch):
+    cursor = DummyCursor(
+        rowcounts=[1, 2],
+        fetchone_results=[{"ponderaciones": 10, "dependencia": "Otra", "cargo": "Jefa"}],
+    )
+    clave = app_module.ranking_cache_key()
+    cache.set(clave, {"ranking": []})
+
+    queries = enviar(monkeypatch, cursor)
+
+    # Se retira la aportación anterior, se reemplazan los valores y se vuelve
+    # a sumar; las ponderaciones del administrador se conservan.
+    assert "INSERT INTO ranking_factor" in queries[3]
+    assert cursor.queries[3][1] == (-1, -1, 10, 99)
+    assert "INSERT INTO ranking_cubo" in queries[4]
+    assert cursor.queries[4][1] == (-1, -1, 10, 99)
+    # La respuesta cambia de celda del cubo entre la resta y la suma
+    assert "UPDATE respuesta_estado SET dependencia" in queries[5]
+    assert "REPLACE INTO respuesta_detalle" in queries[6]
+    assert cursor.queries[7][1] == (1, 1, 10, 99)
+    assert "INSERT INTO ranking_cubo" in queries[8]
+    assert len(queries) == 9
+    assert not any("ponderacion_admin WHERE" in q for q in queries)
+    assert cache.get(clave) is None
+
+
+def test_reenvio_completo_sin_cambiar_dimensiones(monkeypatch):
+    cursor = DummyCursor(
+        rowcounts=[1, 2],
+        fetchone_results=[
+            {"ponderaciones": 10, "dependencia": "Planeación", "cargo": "Jefa"}
+        ],
+    )
+    queries = enviar(monkeypatch, cursor)
+    assert len(queries) == 8
+    assert not any("UPDATE respuesta_estado" in q for q in queries)
+
+
+def test_clave_foranea_invalida(monkeypatch):
+    class CursorSinFactor(DummyCursor):
+        def execute(self, query, params=None):
+            super().execute(query, params)
+            if "REPLACE INTO respuesta_detalle" in query:
+                raise sqlite3.IntegrityError("FOREIGN KEY constraint failed")
+
+    cursor = CursorSinFactor(rowcounts=[1, 1, 1])
+    conn = DummyConnection(cursor)
+    monkeypatch.setattr(app_module, "get_connection", lambda: conn)
+    with app.test_client() as client:
+        resp = client.post("/guardar_respuesta", data=formulario(), follow_redirects=False)
+        assert resp.status_code == 302
+        with client.session_transaction() as sesion:
+            mensajes = [mensaje for _, mensaje in sesion["_flashes"]]
+    assert not conn.commit_called
+    assert mensajes == [
+        "Los datos del formulario no son válidos. Recarga la página e intenta nuevamente."
+    ]
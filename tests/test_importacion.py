@@ -0,0 +1,179 @@
+import io
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import db
+import app as app_module
+import importacion
+
+app = app_module.app
+
+
+class DummyCursor:
+    def __init__(self, fetchall_results=None):
+        self.queries = []
+        self.fetchall_results = fetchall_results or []
+
+    def execute(self, query, params=None):
+        self.queries.append((query, params))
+
+    def fetchall(self):
+        return self.fetchall_results.pop(0)
+
+    def close(self):
+        pass
+
+
+class DummyConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self, dictionary=True):
+        return self._cursor
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        pass
+
+
+def test_usuarios_en_lotes_con_errores(monkeypatch):
+    monkeypatch.setattr(importacion, "TAM_LOTE", 2)
+    archivo = io.StringIO(
+        "ID,Nombre,Apellidos,Cargo,Dependencia\n"
+        "1,Ana,López,Jefa,Finanzas\n"
+        ",Luis,Ruiz,,\n"
+        "x,Mal,Id,,\n"
+        "4,,SinNombre,,\n"
+        "5,Eva,Soto,,Obras\n"
+    )
+    cursor = DummyCursor()
+    conn = DummyConnection(cursor)
+    avances = []
+    resultado = importacion.importar(
+        conn, cursor, archivo, "usuarios", lambda r: avances.append(r.procesadas)
+    )
+
+    assert resultado.procesadas == 5
+    assert resultado.importadas == 3
+    assert resultado.errores == [
+        (4, "id no es un entero: 'x'"),
+        (5, "falta nombre"),
+    ]
+    assert len(cursor.queries) == 2
+    primera, params = cursor.queries[0]
+    assert "ON DUPLICATE KEY UPDATE" in primera
+    assert params == [1, "Ana", "López", "Jefa", "Finanzas", None, "Luis", "Ruiz", None, None]
+    assert conn.commits == 2
+    assert avances == [2, 5]
+
+
+def test_usuarios_sin_html():
+    archivo = io.StringIO(
+        "id,nombre,apellidos,cargo,dependencia\n"
+        '1,<script>alert(1)</script>Ana,<b>López</b>,"<img src=x onerror=alert(1)>Jefa",'
+        "Obras & Servicios\n"
+        "2,<i></i>,Ruiz,,\n"
+    )
+    cursor = DummyCursor()
+    resultado = importacion.importar(DummyConnection(cursor), cursor, archivo, "usuarios")
+
+    assert resultado.errores == [(3, "falta nombre")]
+    _, params = cursor.queries[0]
+    assert params == [1, "alert(1)Ana", "López", "Jefa", "Obras &amp; Servicios"]
+    # El mismo resultado que el formulario de respuesta
+    crudos = ("<script>alert(1)</script>Ana", "<b>López</b>", "<img src=x onerror=alert(1)>Jefa")
+    assert params[1:4] == [app_module.sanitize(valor) for valor in crudos]
+
+
+def test_columnas_faltantes():
+    cursor = DummyCursor()
+    try:
+        importacion.importar(
+            DummyConnection(cursor), cursor, io.StringIO("nombre\nAna\n"), "usuarios"
+        )
+    except importacion.ErrorImportacion as exc:
+        assert "apellidos" in str(exc)
+    else:
+        raise AssertionError("Se esperaba ErrorImportacion")
+
+
+def test_asignaciones_validan_referencias():
+    archivo = io.StringIO(
+        "id_usuario,id_formulario\n1,1\n2,1\n1,9\n1,1\n"
+    )
+    cursor = DummyCursor([[{"id": 1}, {"id": 2}], [{"id": 1}]])
+    conn = DummyConnection(cursor)
+    resultado = importacion.importar(conn, cursor, archivo, "asignaciones")
+
+    assert resultado.importadas == 2
+    assert resultado.errores == [
+        (3, "el usuario 2 no existe"),
+        (4, "el formulario 9 no existe"),
+    ]
+    insert, params = cursor.queries[-1]
+    assert "INSERT INTO asignacion" in insert
+    assert params == [1, 1, 1, 1]
+
+
+def test_error_de_base_de_datos_revierte_el_lote():
+    class CursorFallido(DummyCursor):
+        def execute(self, query, params=None):
+            raise RuntimeError("fallo")
+
+    cursor = CursorFallido()
+    conn = DummyConnection(cursor)
+    try:
+        importacion.importar(
+            conn, cursor, io.StringIO("nombre,apellidos\nAna,López\n"), "usuarios"
+        )
+    except RuntimeError:
+        pass
+    assert conn.rollbacks == 1 and conn.commits == 0
+
+
+def test_subida_desde_el_panel(monkeypatch):
+    cursor = DummyCursor([[{"id": 1}], [{"id": 1}]])
+    conn = DummyConnection(cursor)
+    monkeypatch.setattr(db, "get_connection", lambda: conn)
+    monkeypatch.setattr(app_module, "get_connection", lambda: conn)
+    invalidaciones = []
+    monkeypatch.setattr(
+        app_module, "invalidate_ranking_cache", lambda: invalidaciones.append(1)
+    )
+    with app.test_client() as client:
+        with client.session_transaction() as sess:
+            sess["is_admin"] = True
+        resp = client.post(
+            "/admin/importar",
+            data={
+                "tipo": "asignaciones",
+                "archivo": (io.BytesIO(b"\xef\xbb\xbfid_usuario,id_formulario\n1,1\n"), "a.csv"),
+            },
+            content_type="multipart/form-data",
+        )
+    assert resp.status_code == 200
+    assert "Importadas 1 de 1 filas".encode() in resp.data
+    assert invalidaciones == [1]
+
+
+def test_importar_command(monkeypatch, tmp_path):
+    ruta = tmp_path / "usuarios.csv"
+    ruta.write_text("nombre,apellidos\nAna,López\n,Sin\n", encoding="utf-8")
+    cursor = DummyCursor()
+    conn = DummyConnection(cursor)
+    monkeypatch.setattr(db, "get_connection", lambda: conn)
+    monkeypatch.setattr(app_module, "get_connection", lambda: conn)
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=["importar", "usuarios", str(ruta)])
+    assert result.exit_code == 1
+    assert "Importadas 1 de 2 filas." in result.stdout
+    assert "Línea 3: falta nombre" in result.stderr
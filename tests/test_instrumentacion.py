@@ -0,0 +1,88 @@
+import logging
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import db
+import app as app_module
+from instrumentacion import CursorInstrumentado, normalizar
+
+app = app_module.app
+
+
+class DummyCursor:
+    def __init__(self):
+        self.queries = []
+        self.fetchone_results = [{"total": 3}, {"total": 2}]
+        self.fetchall_results = [[{"id_respuesta": 4}], [{"nombre": "F", "total": 1}]]
+
+    def execute(self, query, params=None):
+        self.queries.append((query, params))
+
+    def fetchone(self):
+        return self.fetchone_results.pop(0)
+
+    def fetchall(self):
+        return self.fetchall_results.pop(0)
+
+    def close(self):
+        pass
+
+
+class DummyConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def cursor(self, dictionary=True):
+        return self._cursor
+
+    def close(self):
+        pass
+
+
+def pedir_ranking(monkeypatch):
+    cursor = DummyCursor()
+    conn = DummyConnection(cursor)
+    monkeypatch.setattr(db, "get_connection", lambda: conn)
+    monkeypatch.setattr(app_module, "get_connection", lambda: conn)
+    app_module.invalidate_ranking_cache()
+    with app.test_client() as client:
+        with client.session_transaction() as sess:
+            sess["is_admin"] = True
+        return client.get("/admin/ranking"), cursor
+
+
+def test_server_timing_cuenta_consultas(monkeypatch):
+    resp, cursor = pedir_ranking(monkeypatch)
+    assert resp.status_code == 200
+    encabezado = resp.headers["Server-Timing"]
+    assert encabezado.startswith("db;dur=")
+    assert 'desc="4 queries"' in encabezado
+    assert "app;dur=" in encabezado
+    # Las consultas llegan intactas al cursor real
+    assert len(cursor.queries) == 4
+
+
+def test_instrumentacion_desactivada(monkeypatch):
+    monkeypatch.setattr(app_module, "SQL_INSTRUMENTACION", False)
+    resp, _ = pedir_ranking(monkeypatch)
+    assert resp.status_code == 200
+    assert "Server-Timing" not in resp.headers
+
+
+def test_registro_y_consultas_lentas(caplog):
+    registro = []
+    cursor = CursorInstrumentado(DummyCursor(), registro, umbral_lento_ms=0)
+    with caplog.at_level(logging.WARNING, logger="instrumentacion"):
+        cursor.execute("SELECT  *\n FROM respuesta WHERE id IN (%s, %s, %s)", (1, 2, 3))
+        cursor.fetchall()
+    assert registro[0].parametros == 3
+    assert registro[0].filas == 1
+    assert "Consulta lenta" in caplog.text
+    assert "SELECT * FROM respuesta WHERE id IN (%s, …)" in caplog.text
+
+
+def test_normalizar_agrupa_filas_multiples():
+    sql = "REPLACE INTO t (a, b) VALUES (%s, %s), (%s, %s), (%s, %s)"
+    assert normalizar(sql) == "REPLACE INTO t (a, b) VALUES (%s, …), …"
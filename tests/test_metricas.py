@@ -0,0 +1,136 @@
+import os
+import runpy
+import subprocess
+import sys
+import textwrap
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import db
+import app as app_module
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+app = app_module.app
+
+
+class DummyCursor:
+    def __init__(self):
+        self.fetchone_results = [{"total": 1}, {"total": 1}]
+        self.fetchall_results = [[], [{"nombre": "Factor X", "total": 5}]]
+
+    def execute(self, query, params=None):
+        pass
+
+    def fetchone(self):
+        return self.fetchone_results.pop(0)
+
+    def fetchall(self):
+        return self.fetchall_results.pop(0)
+
+    def close(self):
+        pass
+
+
+class DummyConnection:
+    def cursor(self, dictionary=True):
+        return DummyCursor()
+
+    def close(self):
+        pass
+
+
+def test_metrics_expone_latencia_y_cache(monkeypatch):
+    monkeypatch.setattr(app, "testing", True)
+    conn = DummyConnection()
+    monkeypatch.setattr(db, "get_connection", lambda: conn)
+    monkeypatch.setattr(app_module, "get_connection", lambda: conn)
+    app_module.invalidate_ranking_cache()
+
+    with app.test_client() as client:
+        with client.session_transaction() as sess:
+            sess["is_admin"] = True
+        client.get("/admin/ranking")
+        client.get("/admin/ranking")
+        resp = client.get("/metrics")
+
+    assert resp.status_code == 200
+    assert resp.content_type.startswith("text/plain")
+    texto = resp.get_data(as_text=True)
+    assert (
+        'formularios_request_duration_seconds_count{endpoint="vista_ranking",status="200"}'
+        in texto
+    )
+    assert 'formularios_cache_requests_total{cache="ranking",resultado="hit"}' in texto
+    assert 'formularios_ranking_recalculos_total{resultado="calculos"}' in texto
+
+
+def test_metrics_con_token(monkeypatch):
+    monkeypatch.setenv("METRICS_TOKEN", "secreto")
+    with app.test_client() as client:
+        assert client.get("/metrics").status_code == 401
+        resp = client.get("/metrics", headers={"Authorization": "Bearer secreto"})
+        assert resp.status_code == 200
+
+
+def test_metrics_sin_token_fuera_de_pruebas(monkeypatch):
+    monkeypatch.delenv("METRICS_TOKEN", raising=False)
+    monkeypatch.setattr(app, "testing", False)
+    monkeypatch.setattr(app, "debug", False)
+    with app.test_client() as client:
+        assert client.get("/metrics").status_code == 404
+    monkeypatch.setattr(app, "testing", True)
+    with app.test_client() as client:
+        assert client.get("/metrics").status_code == 200
+
+
+def test_pool_sin_conexiones_en_uso_tras_la_peticion(cliente, monkeypatch):
+    monkeypatch.setattr(app, "testing", True)
+    assert cliente.get("/admin").status_code == 200
+
+    texto = cliente.get("/metrics").get_data(as_text=True)
+    assert 'formularios_db_pool_connections{estado="en_uso"} 0.0' in texto
+    libres = float(db.estadisticas_pool()["libres"])
+    assert f'formularios_db_pool_connections{{estado="libres"}} {libres}' in texto
+
+
+def test_metricas_agregadas_entre_procesos(tmp_path):
+    entorno = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(tmp_path))
+    worker = textwrap.dedent(
+        """
+        import metricas
+        metricas.TRANSACCIONES.labels("guardar_respuesta", "commit").inc()
+        metricas.POOL_CONEXIONES.labels("en_uso").set(2)
+        """
+    )
+    procesos = [
+        subprocess.Popen([sys.executable, "-c", worker], cwd=RAIZ, env=entorno)
+        for _ in range(3)
+    ]
+    for proceso in procesos:
+        assert proceso.wait(timeout=30) == 0
+
+    salida = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import metricas; print(metricas.exportar()[0].decode())",
+        ],
+        cwd=RAIZ,
+        env=entorno,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    assert (
+        'formularios_transacciones_total{resultado="commit",vista="guardar_respuesta"} 3.0'
+        in salida
+    )
+
+
+def test_arranque_de_gunicorn_solo_borra_las_metricas(monkeypatch, tmp_path):
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    (tmp_path / "counter_123.db").write_bytes(b"")
+    (tmp_path / "otro.txt").write_text("no es de prometheus")
+    runpy.run_path(os.path.join(RAIZ, "gunicorn.conf.py"))
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["otro.txt"]
@@ -0,0 +1,101 @@
+import json
+import os
+import re
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import app as app_module
+from conftest import ejecutar, responder
+
+
+@pytest.fixture
+def cliente(cliente_anonimo):
+    return cliente_anonimo
+
+
+def consultas(resp):
+    return int(re.search(r'desc="(\d+) queries"', resp.headers["Server-Timing"]).group(1))
+
+
+def formulario_mostrado(resp):
+    return int(re.search(rb'name="formulario_id" value="(\d+)"', resp.data).group(1))
+
+
+def test_una_consulta_y_cache_por_usuario(cliente):
+    ejecutar("INSERT INTO asignacion (id_usuario, id_formulario) VALUES (%s, %s)", (1, 2))
+
+    resp = cliente.get("/formulario/1")
+    assert resp.status_code == 200
+    assert formulario_mostrado(resp) == 1
+    # Formulario asignado con usuario y respuestas previas, más los factores
+    assert consultas(resp) == 2
+
+    resp = cliente.get("/formulario/1")
+    assert formulario_mostrado(resp) == 1
+    assert consultas(resp) == 1
+
+    # Responder invalida la caché del usuario: ahora toca el formulario 2
+    assert responder(cliente, 1, 1).status_code == 200
+    resp = cliente.get("/formulario/1")
+    assert formulario_mostrado(resp) == 2
+    assert b'value="Ana"' in resp.data
+
+
+def previas(resp):
+    blob = re.search(
+        rb'<script type="application/json" id="respuestas-previas">(.*?)</script>',
+        resp.data,
+    ).group(1)
+    return {int(k): v for k, v in json.loads(blob).items()}
+
+
+def test_respuestas_previas_con_cache(cliente):
+    assert responder(cliente, 2, 2).status_code == 200
+    for _ in range(2):
+        resp = cliente.get("/formulario/2")
+        assert formulario_mostrado(resp) == 2
+        assert previas(resp) == {i: 11 - i for i in range(1, 11)}
+        # La tabla cacheada no lleva selecciones de ningún usuario
+        assert b"selected" not in resp.data
+
+
+def test_tabla_de_factores_cacheada_e_invalidada(cliente, monkeypatch):
+    renderizados = []
+    original = app_module.render_template
+
+    def contar(nombre, **contexto):
+        renderizados.append(nombre)
+        return original(nombre, **contexto)
+
+    monkeypatch.setattr(app_module, "render_template", contar)
+    cliente.get("/formulario/1")
+    cliente.get("/formulario/2")
+    assert renderizados.count("_tabla_factores.html") == 1
+
+    with cliente.session_transaction() as sess:
+        sess["is_admin"] = True
+    datos = {f"nombre_{i}": f"Factor {i}" for i in range(1, 11)}
+    datos.update({f"descripcion_{i}": f"Descripción {i}" for i in range(1, 11)})
+    datos["nombre_3"] = "Factor renombrado"
+    assert cliente.post("/admin/factores", data=datos).status_code == 302
+
+    resp = cliente.get("/formulario/1")
+    assert renderizados.count("_tabla_factores.html") == 2
+    assert "Factor renombrado".encode() in resp.data
+
+
+def test_usuario_sin_asignacion(cliente):
+    resp = cliente.get("/formulario/60")
+    assert b"No se encontr" in resp.data
+    assert app_module.cache.get(app_module.asignacion_cache_key(60)) is None
+
+
+def test_invalidacion_global(cliente):
+    cliente.get("/formulario/3")
+    clave = app_module.asignacion_cache_key(3)
+    assert app_module.cache.get(clave) is not None
+    app_module.invalidate_asignacion_cache()
+    assert app_module.asignacion_cache_key(3) != clave
@@ -0,0 +1,111 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import db
+import app as app_module
+from paginacion import codificar_cursor, decodificar_cursor
+
+app = app_module.app
+
+
+class DummyCursor:
+    def __init__(self, fetchall_results):
+        self.queries = []
+        self.fetchall_results = fetchall_results
+
+    def execute(self, query, params=None):
+        self.queries.append((query, params))
+
+    def fetchall(self):
+        return self.fetchall_results.pop(0)
+
+    def close(self):
+        pass
+
+
+class DummyConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def cursor(self, dictionary=True):
+        return self._cursor
+
+    def close(self):
+        pass
+
+
+BASE = datetime(2025, 3, 1, 12, 0)
+
+
+def filas(ids):
+    return [
+        {
+            "id_respuesta": i,
+            "nombre": f"Nombre{i}",
+            "apellidos": "X",
+            "formulario": "Formulario 01",
+            "fecha_respuesta": BASE + timedelta(minutes=i),
+            "fecha_respuesta_fmt": "",
+        }
+        for i in ids
+    ]
+
+
+def get_admin(monkeypatch, url, resultados):
+    cursor = DummyCursor([resultados])
+    conn = DummyConnection(cursor)
+    monkeypatch.setattr(db, "get_connection", lambda: conn)
+    monkeypatch.setattr(app_module, "get_connection", lambda: conn)
+    with app.test_client() as client:
+        with client.session_transaction() as sess:
+            sess["is_admin"] = True
+        resp = client.get(url)
+    return resp, cursor
+
+
+def test_primera_pagina_sin_offset(monkeypatch):
+    resp, cursor = get_admin(monkeypatch, "/admin", filas(range(20, 9, -1)))
+    assert resp.status_code == 200
+    query, params = cursor.queries[0]
+    assert "OFFSET" not in query
+    assert "WHERE" not in query
+    assert "ORDER BY r.fecha_respuesta DESC, r.id DESC" in query
+    assert params == (11,)
+
+    siguiente = codificar_cursor(BASE + timedelta(minutes=11), 11)
+    assert f"despues={siguiente}".encode() in resp.data
+    assert b"antes=" not in resp.data
+
+
+def test_pagina_siguiente_usa_cursor(monkeypatch):
+    cursor_url = codificar_cursor(BASE + timedelta(minutes=11), 11)
+    resp, cursor = get_admin(
+        monkeypatch, f"/admin?despues={cursor_url}", filas(range(10, 5, -1))
+    )
+    assert resp.status_code == 200
+    query, params = cursor.queries[0]
+    assert "r.fecha_respuesta < %s" in query
+    assert params == (BASE + timedelta(minutes=11), BASE + timedelta(minutes=11), 11, 11)
+    # Hay página anterior pero no siguiente
+    assert b"antes=" in resp.data
+    assert b"despues=" not in resp.data
+
+
+def test_pagina_anterior_invierte_orden(monkeypatch):
+    cursor_url = codificar_cursor(BASE + timedelta(minutes=5), 5)
+    resp, cursor = get_admin(
+        monkeypatch, f"/admin?antes={cursor_url}", filas(range(6, 17))
+    )
+    query, params = cursor.queries[0]
+    assert "ORDER BY r.fecha_respuesta ASC, r.id ASC" in query
+    # Las filas se muestran de nuevo en orden descendente
+    assert resp.data.index(b"Nombre15") < resp.data.index(b"Nombre6")
+    assert b"Nombre16" not in resp.data
+
+
+def test_cursor_invalido():
+    assert decodificar_cursor("no-es-un-cursor", (datetime, int)) is None
+    assert decodificar_cursor(codificar_cursor(1), (datetime, int)) is None
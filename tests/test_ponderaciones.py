@@ -0,0 +1,119 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import db
+import ponderaciones
+import ranking
+import app as app_module
+from conftest import consultar, responder
+
+
+@pytest.fixture
+def cliente(cliente):
+    for id_usuario in (1, 2, 3):
+        responder(cliente, id_usuario, valores=range(1, 11))
+    return cliente
+
+
+def pesos():
+    return {
+        (fila["id_respuesta"], fila["id_factor"]): fila["peso_admin"]
+        for fila in consultar("SELECT id_respuesta, id_factor, peso_admin FROM ponderacion_admin")
+    }
+
+
+def sin_diferencias():
+    conn = db.get_connection()
+    try:
+        return ranking.verificar(conn.cursor(dictionary=True)) == []
+    finally:
+        conn.close()
+
+
+def test_cuadricula_paginada_por_id(cliente, monkeypatch):
+    monkeypatch.setattr(ponderaciones, "POR_PAGINA", 2)
+    primera = cliente.get("/admin/ponderaciones").get_data(as_text=True)
+    assert 'name="peso_1_1"' in primera and 'name="peso_2_10"' in primera
+    assert 'name="peso_3_1"' not in primera
+    assert "Anterior" not in primera
+
+    siguiente = primera.split('href="/admin/ponderaciones?despues=')[1].split('"')[0]
+    segunda = cliente.get(f"/admin/ponderaciones?despues={siguiente}").get_data(as_text=True)
+    assert 'name="peso_3_1"' in segunda and 'name="peso_2_1"' not in segunda
+    assert "Siguiente" not in segunda
+
+
+def test_guardar_varias_respuestas_en_un_envio(cliente):
+    generacion = app_module.generaciones.actual("ranking")
+    datos = {f"peso_1_{i}": "2" for i in range(1, 11)}
+    datos.update({"peso_2_1": "1.25", "peso_2_2": "", "peso_3_1": "3"})
+    resp = cliente.post("/admin/ponderaciones?incompletas=1", data=datos)
+    assert resp.status_code == 302
+    assert resp.headers["Location"].endswith("/admin/ponderaciones?incompletas=1")
+    assert app_module.generaciones.actual("ranking") == generacion + 1
+
+    guardados = pesos()
+    assert len(guardados) == 12
+    assert guardados[(2, 1)] == pytest.approx(1.2)
+    assert (2, 2) not in guardados
+    assert consultar(
+        "SELECT total FROM ranking_factor WHERE id_factor = %s", (10,)
+    )[0]["total"] == 20
+
+    # Cambiar una respuesta completa la resta y la vuelve a sumar
+    cliente.post("/admin/ponderaciones", data={"peso_1_10": "5"})
+    assert consultar(
+        "SELECT total FROM ranking_factor WHERE id_factor = %s", (10,)
+    )[0]["total"] == 50
+    assert sin_diferencias()
+
+    incompletas = cliente.get("/admin/ponderaciones?incompletas=1").get_data(as_text=True)
+    assert 'name="peso_1_1"' not in incompletas and 'name="peso_2_1"' in incompletas
+
+
+def test_peso_invalido_no_guarda_nada(cliente):
+    resp = cliente.post(
+        "/admin/ponderaciones", data={"peso_1_1": "2", "peso_2_1": "11"}, follow_redirects=True
+    )
+    assert "Cada ponderación debe estar entre 0 y 10." in resp.get_data(as_text=True)
+    assert pesos() == {}
+    cliente.post("/admin/ponderaciones", data={"peso_1_99": "2"})
+    assert pesos() == {}
+
+
+def test_plantilla_llena_solo_los_pesos_que_faltan(cliente):
+    datos = {f"plantilla_{i}": "1" for i in range(1, 11)}
+    datos["nombre"] = "Uniforme"
+    cliente.post("/admin/ponderaciones/plantillas", data=datos)
+    # Con el mismo nombre se reemplaza
+    datos["plantilla_1"] = "4"
+    cliente.post("/admin/ponderaciones/plantillas", data=datos)
+    filas = consultar("SELECT id FROM plantilla_ponderacion")
+    assert len(filas) == 1
+    id_plantilla = filas[0]["id"]
+
+    cliente.post("/admin/ponderaciones", data={"peso_1_1": "9", "peso_1_2": "8"})
+    completa = {f"peso_3_{i}": "2" for i in range(1, 11)}
+    cliente.post("/admin/ponderaciones", data=completa)
+
+    resp = cliente.post(
+        f"/admin/ponderaciones/plantillas/{id_plantilla}/aplicar", follow_redirects=True
+    )
+    assert "Se agregaron 18 ponderaciones en 2 respuestas incompletas." in resp.get_data(
+        as_text=True
+    )
+    guardados = pesos()
+    assert guardados[(1, 1)] == 9 and guardados[(1, 2)] == 8 and guardados[(1, 3)] == 1
+    assert guardados[(2, 1)] == 4
+    assert guardados[(3, 1)] == 2
+    assert consultar("SELECT COUNT(*) AS n FROM respuesta_estado WHERE ponderaciones < 10")[0][
+        "n"
+    ] == 0
+    assert sin_diferencias()
+
+    cliente.post(f"/admin/ponderaciones/plantillas/{id_plantilla}/eliminar")
+    assert consultar("SELECT COUNT(*) AS n FROM plantilla_peso")[0]["n"] == 0
@@ -10,7 +10,6 @@ import app as app_module
 
 app = app_module.app
 cache = app_module.cache
-RANKING_CACHE_KEY = app_module.RANKING_CACHE_KEY
 
 class DummyCursor:
     def __init__(self, fetchone_results=None, fetchall_results=None):
@@ -66,7 +65,7 @@ def test_vista_ranking_parametrized(monkeypatch):
     monkeypatch.setattr(app_module, "get_connection", lambda: conn)
 
     # reset cache
-    cache.delete(RANKING_CACHE_KEY)
+    app_module.invalidate_ranking_cache()
 
     with app.test_client() as client:
         with client.session_transaction() as sess:
@@ -75,15 +74,16 @@ def test_vista_ranking_parametrized(monkeypatch):
         assert resp.status_code == 200
         assert b"Factor X" in resp.data
 
-    # verify queries used placeholders
+    # verify queries used placeholders and read the summary tables
     # queries: total_asignados, total_respuestas, incompletas, ranking
     incompletas_query, incompletas_params = cursor.queries[2]
     ranking_query, ranking_params = cursor.queries[3]
-    assert "HAVING COUNT(p.id_factor) < %s" in incompletas_query
+    assert "FROM respuesta_estado" in incompletas_query
+    assert "ponderaciones < %s" in incompletas_query
     assert incompletas_params == (10,)
-    assert "JOIN (" in ranking_query
-    assert "HAVING COUNT(id_factor) = %s" in ranking_query
-    assert ranking_params == (10,)
+    assert "FROM ranking_factor" in ranking_query
+    assert "ponderacion_admin" not in ranking_query
+    assert ranking_params == (0,)
 
 
 def test_vista_ranking_incompletas(monkeypatch):
@@ -101,7 +101,7 @@ def test_vista_ranking_incompletas(monkeypatch):
     monkeypatch.setattr(db, "get_connection", lambda: conn)
     monkeypatch.setattr(app_module, "get_connection", lambda: conn)
 
-    cache.delete(RANKING_CACHE_KEY)
+    app_module.invalidate_ranking_cache()
 
     with app.test_client() as client:
         with client.session_transaction() as sess:
@@ -115,7 +115,7 @@ def test_vista_ranking_incompletas(monkeypatch):
 def test_ranking_cache_invalidation_after_ponderacion(monkeypatch):
     fetchone_results = [
         {"total": 1}, {"total": 1},
-        {"total": 1}, {"total": 1},
+        {"ponderaciones": 9},
         {"total": 1}, {"total": 1},
     ]
     fetchall_results = [
@@ -127,7 +127,7 @@ def test_ranking_cache_invalidation_after_ponderacion(monkeypatch):
     monkeypatch.setattr(db, "get_connection", lambda: conn)
     monkeypatch.setattr(app_module, "get_connection", lambda: conn)
 
-    cache.delete(RANKING_CACHE_KEY)
+    app_module.invalidate_ranking_cache()
 
     with app.test_client() as client:
         with client.session_transaction() as sess:
@@ -138,10 +138,11 @@ def test_ranking_cache_invalidation_after_ponderacion(monkeypatch):
         assert resp.status_code == 200
         assert cursor.execute_count == 4
 
+        # Con caché no se consulta la base de datos
         cursor.reset()
         resp = client.get("/admin/ranking")
         assert resp.status_code == 200
-        assert cursor.execute_count == 2
+        assert cursor.execute_count == 0
 
         cursor.reset()
         resp = client.post("/admin/ponderar", data={"id_respuesta": "1", "ponderacion_1": "1"})
@@ -151,3 +152,54 @@ def test_ranking_cache_invalidation_after_ponderacion(monkeypatch):
         resp = client.get("/admin/ranking")
         assert resp.status_code == 200
         assert cursor.execute_count == 4
+
+
+def test_ponderacion_actualiza_resumen(monkeypatch):
+    cursor = DummyCursor(fetchone_results=[{"ponderaciones": 10}])
+    conn = DummyConnection(cursor)
+    monkeypatch.setattr(db, "get_connection", lambda: conn)
+    monkeypatch.setattr(app_module, "get_connection", lambda: conn)
+
+    with app.test_client() as client:
+        with client.session_transaction() as sess:
+            sess["is_admin"] = True
+        resp = client.post(
+            "/admin/ponderar", data={"id_respuesta": "7", "ponderacion_3": "2.5"}
+        )
+        assert resp.status_code == 302
+
+    queries = [q for q, _ in cursor.queries]
+    assert "FOR UPDATE" in queries[0]
+    # la respuesta estaba completa: se retira, se pondera y se vuelve a sumar
+    assert "INSERT INTO ranking_factor" in queries[1]
+    assert cursor.queries[1][1] == (-1, -1, 10, 7)
+    assert "INSERT INTO ranking_cubo" in queries[2]
+    assert "INSERT INTO ponderacion_admin" in queries[3]
+    assert cursor.queries[3][1] == [(7, 3, 2.5)]
+    assert "INSERT INTO respuesta_estado" in queries[4]
+    assert "INSERT INTO ranking_factor" in queries[5]
+    assert cursor.queries[5][1] == (1, 1, 10, 7)
+    assert "INSERT INTO ranking_cubo" in queries[6]
+
+
+def test_ranking_resumen_command_reporta_diferencias(monkeypatch):
+    cursor = DummyCursor(
+        fetchone_results=[],
+        fetchall_results=[
+            [{"id_respuesta": 1}],  # incompletas (consulta completa)
+            [],  # incompletas (resumen)
+            [],  # respuestas sin estado
+            [{"id_factor": 1, "nombre": "Factor 1", "total": 30}],  # ranking completo
+            [{"id_factor": 1, "total": 25}],  # ranking resumido
+            [],  # cubo completo
+            [],  # cubo resumido
+        ],
+    )
+    conn = DummyConnection(cursor)
+    monkeypatch.setattr(db, "get_connection", lambda: conn)
+    monkeypatch.setattr(app_module, "get_connection", lambda: conn)
+
+    result = app.test_cli_runner().invoke(args=["ranking-resumen"])
+    assert result.exit_code == 1
+    assert "Respuesta 1 debería figurar como incompleta" in result.output
+    assert "Factor 1: resumen 25.0000 != consulta 30.0000" in result.output
@@ -0,0 +1,80 @@
+import os
+import sqlite3
+import sys
+import time
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import db
+import app as app_module
+
+
+@pytest.fixture
+def cliente(cliente, monkeypatch, tmp_path):
+    monkeypatch.setenv("DB_REPLICA_SQLITE_PATH", str(tmp_path / "replica.db"))
+    return cliente
+
+
+def insertar_formulario(nombre, solo_lectura):
+    # Las dos bases son independientes: lo que se escribe en una no aparece en
+    # la otra, así que el nombre indica de cuál leyó cada página
+    conn = db.get_connection(solo_lectura=solo_lectura)
+    try:
+        assert conn.solo_lectura is solo_lectura
+        conn.cursor().execute("INSERT INTO formulario (nombre) VALUES (%s)", (nombre,))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def test_reportes_leen_de_la_replica_salvo_tras_escribir(cliente):
+    insertar_formulario("Solo en la réplica", solo_lectura=True)
+    assert "Solo en la réplica" in cliente.get("/admin/formularios").get_data(as_text=True)
+    assert cliente.get("/admin").status_code == 200
+
+    # La escritura va al primario y la sesión lee lo propio en el primario
+    resp = cliente.post("/admin/formularios", data={"nombre": "Nuevo en el primario"},
+                        follow_redirects=True)
+    pagina = resp.get_data(as_text=True)
+    assert "Nuevo en el primario" in pagina and "Solo en la réplica" not in pagina
+
+    with cliente.session_transaction() as sesion:
+        assert sesion[app_module.ESCRITURA_SESION] > time.time()
+        sesion[app_module.ESCRITURA_SESION] = time.time() - 1
+    pagina = cliente.get("/admin/formularios").get_data(as_text=True)
+    assert "Solo en la réplica" in pagina and "Nuevo en el primario" not in pagina
+
+
+def test_replica_caida_usa_el_primario(cliente, monkeypatch):
+    db.init_pool()
+    intentos = []
+
+    def caida():
+        intentos.append(1)
+        raise sqlite3.OperationalError("unable to open database file")
+
+    monkeypatch.setattr(db._replica.pool, "get_connection", caida)
+    insertar_formulario("Solo en el primario", solo_lectura=False)
+    for _ in range(2):
+        pagina = cliente.get("/admin/formularios").get_data(as_text=True)
+        assert "Solo en el primario" in pagina
+    # Marcada como caída: la segunda lectura ni siquiera la intenta
+    assert len(intentos) == 1 and db._replica.fallos == 1
+
+    monkeypatch.setattr(db._replica, "_caida_hasta", 0.0)
+    assert db.get_connection(solo_lectura=True).solo_lectura is False
+    assert len(intentos) == 2
+
+
+def test_replica_inaccesible_al_arrancar(cliente, monkeypatch, tmp_path):
+    monkeypatch.setenv("DB_REPLICA_SQLITE_PATH", str(tmp_path / "no_existe" / "replica.db"))
+    monkeypatch.setenv("DB_REPLICA_REINTENTO", "0")
+    db.reiniciar_pool()
+    assert db.hay_replica() and db._replica.pool is None
+    conn = db.get_connection(solo_lectura=True)
+    assert conn.solo_lectura is False
+    conn.close()
+    assert cliente.get("/admin").status_code == 200
+    assert db._replica.fallos == 3  # al arrancar y en cada lectura (reintento 0)
@@ -0,0 +1,105 @@
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+from cachelib import FileSystemCache, SimpleCache
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from singleflight import SingleFlight
+
+
+def test_un_solo_calculo_con_peticiones_concurrentes(tmp_path):
+    vuelo = SingleFlight(SimpleCache(), directorio=str(tmp_path), gracia=0)
+    calculos = []
+
+    def calcular():
+        calculos.append(1)
+        time.sleep(0.1)
+        return {"ranking": [1, 2, 3]}
+
+    resultados = []
+    hilos = [
+        threading.Thread(
+            target=lambda: resultados.append(
+                vuelo.obtener("ranking", "ranking:1", calcular)
+            )
+        )
+        for _ in range(8)
+    ]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert len(calculos) == 1
+    assert resultados == [{"ranking": [1, 2, 3]}] * 8
+    estadisticas = vuelo.estadisticas()
+    assert estadisticas["calculos"] == 1
+    assert estadisticas["ahorrados"] == 7
+
+
+def test_valor_anterior_durante_ventana_de_gracia(tmp_path):
+    vuelo = SingleFlight(SimpleCache(), directorio=str(tmp_path), gracia=5)
+    vuelo.obtener("ranking", "ranking:1", lambda: "viejo", clave_anterior="ranking:ant")
+
+    empezado = threading.Event()
+    liberar = threading.Event()
+
+    def calcular_lento():
+        empezado.set()
+        liberar.wait(5)
+        return "nuevo"
+
+    hilo = threading.Thread(
+        target=vuelo.obtener,
+        args=("ranking", "ranking:2", calcular_lento),
+        kwargs={"clave_anterior": "ranking:ant"},
+    )
+    hilo.start()
+    empezado.wait(5)
+    # Mientras se recalcula, las demás peticiones reciben el valor anterior
+    assert vuelo.obtener("ranking", "ranking:2", lambda: "otro", "ranking:ant") == "viejo"
+    liberar.set()
+    hilo.join()
+
+    assert vuelo.obtener("ranking", "ranking:2", lambda: "otro", "ranking:ant") == "nuevo"
+    assert vuelo.estadisticas()["anteriores"] == 1
+
+
+def _worker(directorio, cache_dir, inicio, resultados):
+    vuelo = SingleFlight(FileSystemCache(cache_dir), directorio=directorio, gracia=0)
+
+    def calcular():
+        resultados.put("calculo")
+        time.sleep(0.2)
+        return "ranking"
+
+    inicio.wait(5)
+    vuelo.obtener("ranking", "ranking:1", calcular)
+
+
+def test_un_solo_calculo_entre_procesos(tmp_path):
+    ctx = multiprocessing.get_context("fork")
+    inicio = ctx.Event()
+    resultados = ctx.Queue()
+    procesos = [
+        ctx.Process(
+            target=_worker,
+            args=(str(tmp_path), str(tmp_path / "cache"), inicio, resultados),
+        )
+        for _ in range(4)
+    ]
+    for proceso in procesos:
+        proceso.start()
+    inicio.set()
+    for proceso in procesos:
+        proceso.join(timeout=10)
+
+    calculos = 0
+    while not resultados.empty():
+        resultados.get()
+        calculos += 1
+    assert calculos == 1
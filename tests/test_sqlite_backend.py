@@ -0,0 +1,104 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import db
+import db_sqlite
+import ranking
+import app as app_module
+from conftest import consultar, responder
+
+
+@pytest.fixture
+def cliente(cliente, monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "2")
+    return cliente
+
+
+def test_traducir_dialecto_mysql():
+    sql, columna = db_sqlite.traducir(
+        "INSERT INTO t (a, b) VALUES (%s, %s) "
+        "ON DUPLICATE KEY UPDATE id = LAST_INSERT_ID(id), b = b + VALUES(b)"
+    )
+    assert sql == (
+        "INSERT INTO t (a, b) VALUES (?, ?) "
+        "ON CONFLICT DO UPDATE SET id = id, b = b + excluded.b RETURNING id"
+    )
+    assert columna == "id"
+    assert db_sqlite.traducir("SELECT a FROM t WHERE b = %s FOR UPDATE")[0] == (
+        "SELECT a FROM t WHERE b = ?"
+    )
+    assert db_sqlite.traducir(
+        "SELECT DATE_FORMAT(f, '%Y-%m-%d %H:%i') AS x FROM t WHERE y = '%s'"
+    )[0] == "SELECT strftime('%Y-%m-%d %H:%M', f) AS x FROM t WHERE y = '%s'"
+
+
+def test_esquema_traducido(cliente):
+    assert consultar("SELECT COUNT(*) AS n FROM formulario")[0]["n"] == 54
+    assert consultar("SELECT COUNT(*) AS n FROM asignacion")[0]["n"] == 54
+    assert consultar("SELECT COUNT(*) AS n FROM ranking_factor")[0]["n"] == 10
+    assert consultar("SELECT nombre FROM formulario WHERE id = %s", (7,)) == [
+        {"nombre": "Formulario 07"}
+    ]
+
+
+def test_flujo_completo_y_ranking(cliente):
+    assert cliente.get("/formulario/1").status_code == 200
+    valores = list(range(1, 11))
+    assert responder(cliente, 1, 1, valores).status_code in (200, 302)
+    # Reenviar conserva la respuesta y reemplaza sus valores
+    assert responder(cliente, 1, 1, valores[::-1]).status_code in (200, 302)
+    filas = consultar("SELECT id FROM respuesta")
+    assert len(filas) == 1
+    id_respuesta = filas[0]["id"]
+
+    datos = {"id_respuesta": id_respuesta}
+    datos.update({f"ponderacion_{i}": str(i) for i in range(1, 11)})
+    assert cliente.post("/admin/ponderar", data=datos).status_code == 302
+
+    resp = cliente.get("/admin/ranking")
+    assert resp.status_code == 200
+    total = consultar(
+        "SELECT total FROM ranking_factor WHERE id_factor = %s", (1,)
+    )[0]["total"]
+    assert total == 1 * 10
+
+    conn = db.get_connection()
+    try:
+        assert ranking.verificar(conn.cursor(dictionary=True)) == []
+    finally:
+        conn.close()
+
+    assert cliente.get("/admin").status_code == 200
+    assert cliente.get(f"/admin/respuesta/{id_respuesta}").status_code == 200
+    assert cliente.get("/admin/formularios").status_code == 200
+    exportado = cliente.get("/admin/exportar?formato=csv").get_data(as_text=True)
+    assert exportado.count("\n") == 2
+
+
+def test_sentencias_preparadas_entre_peticiones(cliente, monkeypatch):
+    monkeypatch.setenv("DB_PREPARADAS", "1")
+    monkeypatch.setenv("DB_POOL_SIZE", "1")
+    monkeypatch.setattr(db, "_pool", None)
+    responder(cliente, 1, 1, range(1, 11))
+    responder(cliente, 1, 1, range(10, 0, -1))
+    assert len(consultar("SELECT id FROM respuesta_detalle")) == 10
+    pagina = cliente.get("/formulario/1")
+    assert pagina.status_code == 200
+
+    conexion = db.get_connection()
+    try:
+        cache = db.cache_sentencias(conexion)
+    finally:
+        conexion.close()
+    assert len(cache) > 0
+    cliente.get("/formulario/1", headers={"Cache-Control": "no-cache"})
+    preparadas = len(cache)
+    # Repetir la petición reutiliza las mismas sentencias
+    otra = cliente.get("/formulario/1", headers={"Cache-Control": "no-cache"})
+    assert otra.data == pagina.data
+    assert len(cache) == preparadas
+    assert cliente.get("/admin/ranking").status_code == 200